@@ -1,29 +1,51 @@
-from flask import Flask, request, jsonify, session, send_from_directory
-from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import func, case, desc
+from flask import Blueprint, Flask, current_app, g, request, jsonify, session, send_from_directory, send_file, Response, stream_with_context
+from flask.cli import with_appcontext
+from sqlalchemy import func, case, desc, inspect, text, update, select, insert, delete, event, literal, null, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
+import hashlib
+import json
+import re
+import click
 from functools import wraps
+from query_inspector import QueryInspector
+from request_profiler import RequestProfiler
+from compression import Compressor
+from deadline_scheduler import DeadlineScheduler
+from reminders import ReminderQueue
+from audit import AuditLog
+from cache import cache
+from db_routing import LazySQLAlchemy, RoutingSession, REPLICA_BIND, read_replica, mark_write, use_primary
+from scoring import CURRENT_RULE_SET, available_rule_sets, get_table, score_prediction
 
-app = Flask(__name__, static_folder='public', static_url_path='')
-app.secret_key = os.environ.get('SECRET_KEY', 'bolilla-garras-dev-key-change-in-prod')
+# The Flask app is built by create_app() (end of file). Importing this
+# module only declares models and routes; `from app import app` builds the
+# default app on first access.
+db = LazySQLAlchemy(session_options={'class_': RoutingSession})
+bp = Blueprint('bolilla', __name__)
 
-# Database Config
-# Vercel provides DATABASE_URL, local uses sqlite
-db_url = os.environ.get('DATABASE_URL')
-if not db_url:
-    # Local SQLite
-    db_path = os.path.join(os.path.dirname(__file__), 'bolilla.db')
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
-else:
-    # Fix postgres:// to postgresql:// if needed (Render/Vercel legacy)
-    app.config['SQLALCHEMY_DATABASE_URI'] = db_url.replace('postgres://', 'postgresql://')
+# Optional SQL instrumentation (SQL_INSPECT=1): N+1 and slow query logging
+query_inspector = QueryInspector()
 
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db = SQLAlchemy(app)
+# On-demand profiling for instance admins (PROFILING_ENABLED=1, header X-Profile)
+request_profiler = RequestProfiler()
 
-@app.after_request
+# gzip/brotli for JSON responses, compressed once per payload version (COMPRESS_*)
+compressor = Compressor()
+
+# Closes matches when their deadline passes (DEADLINE_SCHEDULER=1)
+deadline_scheduler = DeadlineScheduler()
+
+# Reminders for missing predictions, delivered by `flask reminders` (REMINDER_*)
+reminder_queue = ReminderQueue()
+
+# Admin and prediction actions, buffered and inserted in bulk (AUDIT_*)
+audit_log = AuditLog()
+
+@bp.after_app_request
 def add_header(response):
     # FORCE NO CACHE
     response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate, public, max-age=0"
@@ -45,17 +67,48 @@ def add_header(response):
 
 # ==================== MODELS ====================
 
+# Peña that owns every row created before tenancy existed (Peña Garras);
+# its admins also run instance-wide operations (seasons, tenants, profiles)
+DEFAULT_TENANT_ID = 1
+
+def tenant_column():
+    return db.Column(db.Integer, db.ForeignKey('tenants.id'), nullable=False,
+                     default=DEFAULT_TENANT_ID, server_default=str(DEFAULT_TENANT_ID), index=True)
+
+class Tenant(db.Model):
+    """A peña: its own users, matches, predictions, standings and caches"""
+    __tablename__ = 'tenants'
+    id = db.Column(db.Integer, primary_key=True)
+    slug = db.Column(db.String(50), unique=True, nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class User(db.Model):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
+    username = db.Column(db.String(80), unique=True, nullable=False) # Unique across peñas: login needs no peña
     password_hash = db.Column(db.String(255), nullable=False)
     display_name = db.Column(db.String(100), nullable=False)
-    is_admin = db.Column(db.Integer, default=0) # 0=User, 1=Admin
+    is_admin = db.Column(db.Integer, default=0) # 0=User, 1=Admin (of its peña)
+    tenant_id = tenant_column()
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     predictions = db.relationship('Prediction', backref='user', lazy=True)
 
+class Jornada(db.Model):
+    """Matchday grouping; its results are entered and scored together"""
+    __tablename__ = 'jornadas'
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = tenant_column()
+    season = db.Column(db.String(9), nullable=False)
+    number = db.Column(db.Integer, nullable=False)
+    label = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    matches = db.relationship('Match', backref='jornada', lazy=True)
+    
+    __table_args__ = (db.UniqueConstraint('tenant_id', 'season', 'number', name='_jornada_season_number_uc'),)
+
 class Match(db.Model):
     __tablename__ = 'matches'
     id = db.Column(db.Integer, primary_key=True)
@@ -67,9 +120,19 @@ class Match(db.Model):
     home_goals = db.Column(db.Integer, nullable=True)
     away_goals = db.Column(db.Integer, nullable=True)
     is_finished = db.Column(db.Integer, default=0) # 0=Pending, 1=Finished
+    jornada_id = db.Column(db.Integer, db.ForeignKey('jornadas.id'), nullable=True, index=True)
+    rule_set = db.Column(db.String(20), nullable=False, default=CURRENT_RULE_SET, server_default=CURRENT_RULE_SET)
+    predictions_closed = db.Column(db.Integer, nullable=False, default=0, server_default='0') # Set by the deadline scheduler
+    season = db.Column(db.String(9), nullable=True, index=True) # From match_date on insert (season_for)
+    tenant_id = tenant_column()
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     predictions = db.relationship('Prediction', backref='match', lazy=True, cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        db.Index('ix_matches_tenant_season', 'tenant_id', 'season', 'match_date'),
+        db.Index('ix_matches_date', 'match_date'),  # Latest match (current_season) across peñas
+    )
 
 class Prediction(db.Model):
     __tablename__ = 'predictions'
@@ -79,27 +142,432 @@ class Prediction(db.Model):
     home_goals = db.Column(db.Integer, nullable=False)
     away_goals = db.Column(db.Integer, nullable=False)
     points = db.Column(db.Integer, nullable=True)
+    season = db.Column(db.String(9), nullable=True) # Copied from the match on insert
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), nullable=False,
+                          server_default=str(DEFAULT_TENANT_ID)) # Copied from the match on insert
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Ensure one prediction per user per match
-    __table_args__ = (db.UniqueConstraint('user_id', 'match_id', name='_user_match_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'match_id', name='_user_match_uc'),
+        db.Index('ix_predictions_season_user', 'season', 'user_id'),
+        db.Index('ix_predictions_tenant_season', 'tenant_id', 'season'),
+        db.Index('ix_predictions_match', 'match_id'),
+    )
+
+@event.listens_for(Match, 'before_insert')
+def _set_match_season(mapper, connection, target):
+    if target.season is None:
+        target.season = season_for(target.match_date)
+
+@event.listens_for(Prediction, 'before_insert')
+def _set_prediction_season(mapper, connection, target):
+    if target.season is None or target.tenant_id is None:
+        season, tenant_id = connection.execute(
+            select(Match.season, Match.tenant_id).where(Match.id == target.match_id)).one()
+        target.season = target.season or season
+        target.tenant_id = target.tenant_id or tenant_id
+
+class Season(db.Model):
+    """Season state; rows exist only for seasons an admin activated or archived"""
+    __tablename__ = 'seasons'
+    label = db.Column(db.String(9), primary_key=True)
+    is_active = db.Column(db.Integer, default=0, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Cold storage for archived seasons: same columns as the hot tables, so an
+# archived season is read with the same queries (see season_models)
+
+class ArchivedMatch(db.Model):
+    __tablename__ = 'matches_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    team = db.Column(db.String(100), nullable=False)
+    opponent = db.Column(db.String(100), nullable=False)
+    is_home = db.Column(db.Integer, default=1)
+    match_date = db.Column(db.DateTime, nullable=False)
+    deadline = db.Column(db.DateTime, nullable=False)
+    home_goals = db.Column(db.Integer, nullable=True)
+    away_goals = db.Column(db.Integer, nullable=True)
+    is_finished = db.Column(db.Integer, default=0)
+    jornada_id = db.Column(db.Integer, nullable=True)
+    rule_set = db.Column(db.String(20), nullable=False, server_default=CURRENT_RULE_SET)
+    predictions_closed = db.Column(db.Integer, nullable=False, server_default='0')
+    season = db.Column(db.String(9), nullable=False, index=True)
+    tenant_id = db.Column(db.Integer, nullable=False, server_default=str(DEFAULT_TENANT_ID))
+    created_at = db.Column(db.DateTime)
+
+class ArchivedPrediction(db.Model):
+    __tablename__ = 'predictions_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    match_id = db.Column(db.Integer, nullable=False)
+    home_goals = db.Column(db.Integer, nullable=False)
+    away_goals = db.Column(db.Integer, nullable=False)
+    points = db.Column(db.Integer, nullable=True)
+    season = db.Column(db.String(9), nullable=False)
+    tenant_id = db.Column(db.Integer, nullable=False, server_default=str(DEFAULT_TENANT_ID))
+    created_at = db.Column(db.DateTime)
     
+    __table_args__ = (
+        db.Index('ix_predictions_archive_season_user', 'season', 'user_id'),
+        db.Index('ix_predictions_archive_tenant_season', 'tenant_id', 'season'),
+    )
 
-def init_db():
-    with app.app_context():
-        db.create_all()
-        
-        # Create admin user if not exists
-        if not User.query.filter_by(username='GARRAS').first():
-            admin = User(
-                username='GARRAS',
-                password_hash=generate_password_hash('GARRAS123'),
-                display_name='Admin Garras',
-                is_admin=1
-            )
-            db.session.add(admin)
+class LeaderboardSnapshot(db.Model):
+    """Cumulative standings of every user right after a match result was set"""
+    __tablename__ = 'leaderboard_snapshots'
+    id = db.Column(db.Integer, primary_key=True)
+    match_id = db.Column(db.Integer, db.ForeignKey('matches.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    total_points = db.Column(db.Integer, nullable=False)
+    exact_predictions = db.Column(db.Integer, nullable=False)
+    rank = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('match_id', 'user_id', name='_snapshot_match_user_uc'),
+        db.Index('ix_snapshot_user_match', 'user_id', 'match_id'),
+    )
+
+class LeaderboardMatrix(db.Model):
+    """Precomputed user x finished-match points grid of a peña's season (columnar JSON)"""
+    __tablename__ = 'tenant_leaderboard_matrix'
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id', ondelete='CASCADE'), primary_key=True)
+    season = db.Column(db.String(9), primary_key=True)
+    payload = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class LeaderboardStandings(db.Model):
+    """Materialized leaderboard rows of a peña's season ('all' = all-time), rebuilt on the first read after a change"""
+    __tablename__ = 'leaderboard_standings'
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id', ondelete='CASCADE'), primary_key=True)
+    season = db.Column(db.String(9), primary_key=True)
+    payload = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class MatchView(db.Model):
+    """Post-deadline payloads precomputed when a match closes"""
+    __tablename__ = 'match_views'
+    match_id = db.Column(db.Integer, db.ForeignKey('matches.id', ondelete='CASCADE'), primary_key=True)
+    kind = db.Column(db.String(20), primary_key=True) # 'predictions'
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class PredictionCount(db.Model):
+    """Predictions per (match, scoreline), kept in step with predictions"""
+    __tablename__ = 'prediction_counts'
+    match_id = db.Column(db.Integer, db.ForeignKey('matches.id', ondelete='CASCADE'), primary_key=True)
+    home_goals = db.Column(db.Integer, primary_key=True)
+    away_goals = db.Column(db.Integer, primary_key=True)
+    predictions = db.Column(db.Integer, default=0, nullable=False)
+
+class DataVersion(db.Model):
+    """Change counter of a resource that clients cache (see /api/version)"""
+    __tablename__ = 'data_versions'
+    resource = db.Column(db.String(30), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class SchedulerLease(db.Model):
+    """Leader election for background jobs across workers"""
+    __tablename__ = 'scheduler_leases'
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(50), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+class ReminderJob(db.Model):
+    """One reminder to send: a user still missing a prediction for a match"""
+    __tablename__ = 'reminder_jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    match_id = db.Column(db.Integer, db.ForeignKey('matches.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='pending') # pending/sending/sent/failed/skipped
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(32), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.String(500), nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('match_id', 'user_id', name='_reminder_match_user_uc'),
+        db.Index('ix_reminder_jobs_due', 'status', 'next_attempt_at'),
+    )
+
+class ChangeLog(db.Model):
+    """Append-only log of match/prediction writes and deletes, read by ?since= delta sync"""
+    __tablename__ = 'change_log'
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False) # 'match' / 'prediction'
+    entity_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=True) # Owner, for predictions
+    tenant_id = db.Column(db.Integer, nullable=False, server_default=str(DEFAULT_TENANT_ID))
+    deleted = db.Column(db.Integer, nullable=False, default=0)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_change_log_entity_user', 'entity', 'user_id', 'id'),
+        db.Index('ix_change_log_tenant_entity', 'tenant_id', 'entity', 'id'),
+        {'sqlite_autoincrement': True},  # Never reuse ids: they are client cursors
+    )
+
+class AuditEvent(db.Model):
+    """Append-only record of who did what (admin actions, predictions); written behind by audit_log"""
+    __tablename__ = 'audit_log'
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    tenant_id = db.Column(db.Integer, nullable=False, default=DEFAULT_TENANT_ID)
+    actor_id = db.Column(db.Integer, nullable=True) # None: no session (emergency reset)
+    actor_name = db.Column(db.String(80), nullable=True)
+    action = db.Column(db.String(40), nullable=False) # 'match.result', 'user.reset_password', ...
+    target_type = db.Column(db.String(20), nullable=True)
+    target_id = db.Column(db.Integer, nullable=True)
+    details = db.Column(db.Text, nullable=True) # JSON
+    ip = db.Column(db.String(45), nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_audit_log_tenant_time', 'tenant_id', 'created_at'),
+        db.Index('ix_audit_log_actor_time', 'tenant_id', 'actor_id', 'created_at'),
+        db.Index('ix_audit_log_action_time', 'tenant_id', 'action', 'created_at'),
+    )
+
+class IdempotencyKey(db.Model):
+    """First response to a write sent with an Idempotency-Key header, replayed to retries until it expires"""
+    __tablename__ = 'idempotency_keys'
+    user_id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(100), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False) # Method, path and body of the first request
+    status_code = db.Column(db.Integer, nullable=True) # None: first request still running
+    body = db.Column(db.Text, nullable=True)
+    mimetype = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+TRACKED_MODELS = {Match: 'match', Prediction: 'prediction'}
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _track_changes(session, flush_context):
+    """One change log row per match/prediction inserted, modified or deleted in this flush"""
+    now = datetime.utcnow()
+    rows = []
+    for objects, deleted in ((session.new, 0), (session.dirty, 0), (session.deleted, 1)):
+        for obj in objects:
+            entity = TRACKED_MODELS.get(type(obj))
+            if entity is None or (objects is session.dirty and not session.is_modified(obj)):
+                continue
+            rows.append({'entity': entity, 'entity_id': obj.id, 'user_id': getattr(obj, 'user_id', None),
+                         'tenant_id': obj.tenant_id, 'deleted': deleted, 'changed_at': now})
+    if rows:
+        session.connection().execute(ChangeLog.__table__.insert(), rows)
+
+def log_bulk_changes(model, condition, deleted=0):
+    """Change log rows for a bulk UPDATE/DELETE (they bypass the flush); call before a delete"""
+    user_id = model.user_id if model is Prediction else null()
+    source = select(literal(TRACKED_MODELS[model]), model.id, user_id, model.tenant_id,
+                    literal(deleted), literal(datetime.utcnow())).where(condition)
+    db.session.execute(insert(ChangeLog.__table__).from_select(
+        ['entity', 'entity_id', 'user_id', 'tenant_id', 'deleted', 'changed_at'], source))
+
+# ==================== MVP MODELS ====================
+
+MVP_TEAMS = ('Athletic Club', 'Athletic Femenino')
+# The squad (garras_players) and the season ranking are Peña Garras' own:
+# only its matches get MVP polls
+MVP_TENANT_ID = DEFAULT_TENANT_ID
+
+class GarrasPlayer(db.Model):
+    __tablename__ = 'garras_players'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    category = db.Column(db.String(10), nullable=False) # 'masculino' / 'femenino'
+    dorsal = db.Column(db.Integer, nullable=True)
+    active = db.Column(db.Integer, default=1)
+
+class MvpPoll(db.Model):
+    """MVP voting state of a match; winners are frozen here when it closes"""
+    __tablename__ = 'mvp_polls'
+    match_id = db.Column(db.Integer, db.ForeignKey('matches.id', ondelete='CASCADE'), primary_key=True)
+    season = db.Column(db.String(9), nullable=False)
+    is_open = db.Column(db.Integer, default=1, index=True)
+    total_votes = db.Column(db.Integer, default=0, nullable=False)
+    winner_votes = db.Column(db.Integer, nullable=True)
+    opened_at = db.Column(db.DateTime, default=datetime.utcnow)
+    closed_at = db.Column(db.DateTime, nullable=True)
+
+class MvpEligiblePlayer(db.Model):
+    """Players that can be voted in a femenino match (lineup chosen by admin)"""
+    __tablename__ = 'match_mvp_players'
+    match_id = db.Column(db.Integer, db.ForeignKey('matches.id', ondelete='CASCADE'), primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('garras_players.id'), primary_key=True)
+
+class MvpVote(db.Model):
+    # server.js keeps its votes by username in match_mvp_votes (see migrate_legacy_mvp_votes)
+    __tablename__ = 'mvp_votes'
+    id = db.Column(db.Integer, primary_key=True)
+    match_id = db.Column(db.Integer, db.ForeignKey('matches.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    player_id = db.Column(db.Integer, db.ForeignKey('garras_players.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (db.UniqueConstraint('match_id', 'user_id', name='_mvp_match_user_uc'),)
+
+class MvpVoteCount(db.Model):
+    """Votes per (match, player), kept in step with mvp_votes"""
+    __tablename__ = 'mvp_vote_counts'
+    match_id = db.Column(db.Integer, db.ForeignKey('matches.id', ondelete='CASCADE'), primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('garras_players.id'), primary_key=True)
+    votes = db.Column(db.Integer, default=0, nullable=False)
+    is_winner = db.Column(db.Integer, default=0, nullable=False)
+
+class MvpPlayerTotal(db.Model):
+    """Season ranking row per player, updated only when polls close/reopen"""
+    __tablename__ = 'mvp_player_totals'
+    season = db.Column(db.String(9), primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('garras_players.id'), primary_key=True)
+    matches_won = db.Column(db.Integer, default=0, nullable=False)
+    total_votes = db.Column(db.Integer, default=0, nullable=False)
+    
+    __table_args__ = (db.Index('ix_mvp_totals_rank', 'season', 'matches_won', 'total_votes'),)
+
+
+def upgrade_schema():
+    """
+    Adds model columns (and their indexes) missing from existing tables;
+    create_all only creates whole tables. New columns must be nullable or
+    have a server_default.
+    """
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c['name'] for c in inspector.get_columns(table.name)}
+        added = False
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=db.engine.dialect)}'
+            if column.server_default is not None:
+                default = column.server_default.arg
+                ddl += f" DEFAULT '{default}'" if isinstance(default, str) else f' DEFAULT {default.text}'
+            db.session.execute(text(ddl))
+            added = True
+            print(f'🔧 Columna añadida: {table.name}.{column.name}')
+        if added:
             db.session.commit()
-            print('✅ Usuario admin creado (user: GARRAS, pass: GARRAS123)')
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+
+def backfill_seasons():
+    """Fills the season of matches and predictions created before the column existed"""
+    pending = db.session.query(Match.id, Match.match_date).filter(Match.season.is_(None)).all()
+    if pending:
+        db.session.execute(update(Match), [{'id': i, 'season': season_for(d)} for i, d in pending])
+    predictions = Prediction.query.filter(Prediction.season.is_(None)).update(
+        {Prediction.season: select(Match.season).where(Match.id == Prediction.match_id).scalar_subquery()},
+        synchronize_session=False)
+    db.session.commit()
+    if pending or predictions:
+        print(f'🔧 Temporada asignada a {len(pending)} partidos y {predictions} pronósticos')
+
+def backfill_prediction_counts():
+    """Counts the scorelines of matches predicted before prediction_counts existed"""
+    counted = select(PredictionCount.match_id).where(PredictionCount.match_id == Prediction.match_id).exists()
+    source = select(Prediction.match_id, Prediction.home_goals, Prediction.away_goals, func.count())\
+        .where(~counted).group_by(Prediction.match_id, Prediction.home_goals, Prediction.away_goals)
+    added = db.session.execute(insert(PredictionCount.__table__).from_select(
+        ['match_id', 'home_goals', 'away_goals', 'predictions'], source)).rowcount
+    db.session.commit()
+    if added and added > 0:
+        print(f'🔧 {added} marcadores pronosticados contados')
+
+def migrate_legacy_mvp_votes():
+    """
+    Imports the MVP polls of server.js: votes by username in match_mvp_votes
+    and the open flag in matches.mvp_voting_open. Only matches without a poll
+    are imported, so it runs once per match; votes of unknown users are skipped.
+    """
+    inspector = inspect(db.engine)
+    if not inspector.has_table('match_mvp_votes') or \
+            'username' not in {c['name'] for c in inspector.get_columns('match_mvp_votes')}:
+        return
+    open_flags = {}
+    if 'mvp_voting_open' in {c['name'] for c in inspector.get_columns('matches')}:
+        open_flags = dict(db.session.execute(text(
+            'SELECT id, mvp_voting_open FROM matches WHERE mvp_voting_open = 1')).all())
+    votes = {}
+    skipped = 0
+    legacy = text('SELECT v.match_id, u.id, v.player_id, v.created_at FROM match_mvp_votes v '
+                  'LEFT JOIN users u ON u.username = v.username')\
+        .columns(match_id=db.Integer, id=db.Integer, player_id=db.Integer, created_at=db.DateTime)
+    for match_id, user_id, player_id, created_at in db.session.execute(legacy):
+        if user_id is None:
+            skipped += 1
+            continue
+        votes.setdefault(match_id, []).append((user_id, player_id, created_at))
+    
+    polled = {m for (m,) in db.session.query(MvpPoll.match_id)}
+    pending = (set(votes) | set(open_flags)) - polled
+    matches = Match.query.filter(Match.id.in_(pending)).all() if pending else []
+    for match in matches:
+        match_votes = votes.get(match.id, [])
+        poll = MvpPoll(match_id=match.id, season=match.season, is_open=1 if open_flags.get(match.id) else 0,
+                       total_votes=len(match_votes))
+        db.session.add(poll)
+        counts = {}
+        for user_id, player_id, created_at in match_votes:
+            db.session.add(MvpVote(match_id=match.id, user_id=user_id, player_id=player_id,
+                                   created_at=created_at or datetime.utcnow()))
+            counts[player_id] = counts.get(player_id, 0) + 1
+        db.session.add_all([MvpVoteCount(match_id=match.id, player_id=player_id, votes=n, is_winner=0)
+                            for player_id, n in counts.items()])
+        db.session.flush()
+        if not poll.is_open:
+            _freeze_winners(poll)
+            _apply_poll_totals(poll, 1)
+    db.session.commit()
+    if matches:
+        print(f'🔧 {len(matches)} votaciones MVP importadas de match_mvp_votes ({skipped} votos sin usuario)')
+
+def init_db():
+    """Creates/upgrades the schema and the admin user (needs an app context)"""
+    db.create_all()
+    upgrade_schema()
+    backfill_seasons()
+    backfill_prediction_counts()
+    migrate_legacy_mvp_votes()
+    
+    missing = set(VERSIONED_RESOURCES) - {r for (r,) in db.session.query(DataVersion.resource)}
+    if missing:
+        db.session.add_all([DataVersion(resource=r, version=0) for r in missing])
+        db.session.commit()
+    prune_change_log()
+    prune_idempotency_keys()
+    
+    # Existing rows default to tenant 1: it is the first tenant created
+    if not Tenant.query.get(DEFAULT_TENANT_ID):
+        db.session.add(Tenant(slug='garras', name='Peña Garras'))
+        db.session.commit()
+    
+    # Create admin user if not exists
+    if not User.query.filter_by(username='GARRAS').first():
+        admin = User(
+            username='GARRAS',
+            password_hash=generate_password_hash('GARRAS123'),
+            display_name='Admin Garras',
+            is_admin=1
+        )
+        db.session.add(admin)
+        db.session.commit()
+        print('✅ Usuario admin creado (user: GARRAS, pass: GARRAS123)')
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create missing tables and columns, backfill seasons, the default peña and the admin user."""
+    init_db()
+    print('✅ Esquema de base de datos al día')
 
 # ==================== AUTH HELPERS ====================
 
@@ -127,17 +595,147 @@ def require_admin(f):
             if user and user.is_admin == 1:
                 # Update session on the fly
                 session['user']['isAdmin'] = True
+                session.modified = True
                 return f(*args, **kwargs)
             
             return jsonify({'error': 'Acceso denegado: Se requiere administrador'}), 403
         return f(*args, **kwargs)
     return decorated
 
+def is_instance_admin(user):
+    """Session user administers the default peña (instance-wide operations)"""
+    return bool(user.get('isAdmin')) and user.get('tenantId', DEFAULT_TENANT_ID) == DEFAULT_TENANT_ID
+
+def require_instance_admin(f):
+    """Admin of the default peña: instance-wide operations (seasons, peñas, profiles)"""
+    @wraps(f)
+    @require_admin
+    def decorated(*args, **kwargs):
+        if current_tenant() != DEFAULT_TENANT_ID:
+            return jsonify({'error': 'Acceso denegado: Solo la administración de la instancia'}), 403
+        return f(*args, **kwargs)
+    return decorated
+
+def current_tenant():
+    """Peña of the logged-in user (sessions from before tenancy belong to the default one)"""
+    return session['user'].get('tenantId', DEFAULT_TENANT_ID)
+
+def tenant_match(match_id):
+    """Match of the current peña, or None (other peñas' matches do not exist for it)"""
+    return Match.query.filter_by(id=match_id, tenant_id=current_tenant()).first()
+
+# ==================== IDEMPOTENCY ====================
+
+# Writes sent with an Idempotency-Key header (fetchWithRetry adds one per
+# call) run once: retries with the same key get the stored first response.
+# Keys are per user; without a session the header is ignored. Expired keys
+# are pruned by the deadline scheduler and the CLI (prune_idempotency_keys).
+IDEMPOTENT_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+IDEMPOTENCY_EXEMPT = {'bolilla.login', 'bolilla.logout', 'bolilla.register'}  # They set the session cookie
+
+def _idempotency_fingerprint():
+    digest = hashlib.sha256(f'{request.method} {request.path}\n'.encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+def _replay(record):
+    response = current_app.response_class(record.body, status=record.status_code, mimetype=record.mimetype)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+@bp.before_request
+def claim_idempotency_key():
+    """Answers a retried write from storage, or records that its first attempt is running"""
+    key = request.headers.get('Idempotency-Key')
+    if not key or request.method not in IDEMPOTENT_METHODS or request.endpoint in IDEMPOTENCY_EXEMPT:
+        return None
+    if 'user' not in session:
+        return None  # Anonymous clients can't be told apart: no replays between them
+    if len(key) > 100:
+        return jsonify({'error': 'Idempotency-Key demasiado larga'}), 400
+    
+    user_id = session['user']['id']
+    fingerprint = _idempotency_fingerprint()
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=current_app.config['IDEMPOTENCY_TTL_SECONDS'])
+    try:
+        db.session.add(IdempotencyKey(user_id=user_id, key=key, fingerprint=fingerprint, expires_at=expires_at))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        # An expired key not pruned yet is taken over as if it were new
+        renewed = db.session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key, IdempotencyKey.expires_at < now)
+            .values(fingerprint=fingerprint, status_code=None, body=None, mimetype=None,
+                    created_at=now, expires_at=expires_at)
+        ).rowcount
+        db.session.commit()
+        if renewed:
+            g.idempotency_key = (user_id, key)
+            return None
+        record = IdempotencyKey.query.get((user_id, key))
+        if record is None:
+            return None  # Expired and pruned meanwhile: run it without a key
+        if record.fingerprint != fingerprint:
+            return jsonify({'error': 'La Idempotency-Key ya se usó con otra petición'}), 422
+        if record.status_code is None:
+            return jsonify({'error': 'La petición original sigue en curso'}), 409
+        return _replay(record)
+    
+    g.idempotency_key = (user_id, key)
+    return None
+
+@bp.after_request
+def store_idempotent_response(response):
+    """Keeps the first response of a keyed write; server errors are not kept, so a retry runs again"""
+    claimed = g.pop('idempotency_key', None)
+    if claimed is None:
+        return response
+    try:
+        # Only the key is saved here: changes the handler left uncommitted
+        # (e.g. before returning an error) are dropped, not committed with it
+        db.session.rollback()
+        record = IdempotencyKey.query.get(claimed)
+        if record is not None:
+            if response.status_code >= 500 or response.direct_passthrough or response.is_streamed:
+                db.session.delete(record)
+            else:
+                record.status_code = response.status_code
+                record.body = response.get_data(as_text=True)
+                record.mimetype = response.mimetype
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('Error storing idempotent response')
+    return response
+
+@bp.teardown_request
+def release_idempotency_key(exc):
+    """The write raised (no response to store): let a retry run it again"""
+    claimed = g.pop('idempotency_key', None)
+    if claimed is None:
+        return
+    try:
+        db.session.rollback()
+        IdempotencyKey.query.filter_by(user_id=claimed[0], key=claimed[1]).delete()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('Error releasing idempotency key')
+
+def prune_idempotency_keys():
+    """Deletes expired keys; run off the request path (scheduler, init-db, reminders)"""
+    pruned = IdempotencyKey.query.filter(IdempotencyKey.expires_at < datetime.utcnow())\
+        .delete(synchronize_session=False)
+    db.session.commit()
+    return pruned
+
 
 
 # ==================== AUTH ROUTES ====================
 
-@app.route('/api/login', methods=['POST'])
+@bp.route('/api/login', methods=['POST'])
 def login():
     data = request.get_json()
     username = data.get('username')
@@ -152,12 +750,13 @@ def login():
         'id': user.id,
         'username': user.username,
         'displayName': user.display_name,
-        'isAdmin': user.is_admin == 1
+        'isAdmin': user.is_admin == 1,
+        'tenantId': user.tenant_id
     }
     
     return jsonify({'success': True, 'user': session['user']})
 
-@app.route('/api/register', methods=['POST'])
+@bp.route('/api/register', methods=['POST'])
 def register():
     data = request.get_json()
     username = data.get('username')
@@ -170,6 +769,14 @@ def register():
     if len(password) < 4:
         return jsonify({'error': 'La contraseña debe tener al menos 4 caracteres'}), 400
     
+    # Peña to join (slug); the default one if not given
+    tenant_id = DEFAULT_TENANT_ID
+    if data.get('tenant'):
+        tenant = Tenant.query.filter_by(slug=data['tenant']).first()
+        if not tenant:
+            return jsonify({'error': 'Peña no encontrada'}), 404
+        tenant_id = tenant.id
+    
     if User.query.filter_by(username=username).first():
         return jsonify({'error': 'El usuario ya existe'}), 400
     
@@ -177,7 +784,8 @@ def register():
         username=username,
         password_hash=hash_password(password),
         display_name=display_name,
-        is_admin=0
+        is_admin=0,
+        tenant_id=tenant_id
     )
     
     try:
@@ -187,21 +795,24 @@ def register():
         db.session.rollback()
         return jsonify({'error': 'Error al registrar usuario'}), 500
     
+    invalidate_standings(tenant_id)
+    
     session['user'] = {
         'id': new_user.id,
         'username': new_user.username,
         'displayName': new_user.display_name,
-        'isAdmin': False
+        'isAdmin': False,
+        'tenantId': tenant_id
     }
     
     return jsonify({'success': True, 'user': session['user']})
 
-@app.route('/api/logout', methods=['POST'])
+@bp.route('/api/logout', methods=['POST'])
 def logout():
     session.pop('user', None)
     return jsonify({'success': True})
 
-@app.route('/api/change-password', methods=['POST'])
+@bp.route('/api/change-password', methods=['POST'])
 @require_auth
 def change_password():
     data = request.get_json()
@@ -225,7 +836,7 @@ def change_password():
     
     return jsonify({'success': True, 'message': 'Contraseña actualizada correctamente'})
 
-@app.route('/api/me')
+@bp.route('/api/me')
 def me():
     if 'user' not in session:
         return jsonify({'error': 'No autenticado'}), 401
@@ -233,15 +844,17 @@ def me():
 
 # ==================== ADMIN USER MANAGEMENT ====================
 
-@app.route('/api/admin/users')
+@bp.route('/api/admin/users')
 @require_admin
+@read_replica
 def get_all_users():
     """Get all users (admin only)"""
     results = db.session.query(
         User.id, User.username, User.display_name, User.is_admin,
         func.coalesce(func.sum(Prediction.points), 0).label('total_points'),
         func.count(case((Prediction.points == 5, 1))).label('exact_predictions')
-    ).outerjoin(Prediction).group_by(User.id).order_by(User.display_name).all()
+    ).outerjoin(Prediction).filter(User.tenant_id == current_tenant())\
+     .group_by(User.id).order_by(User.display_name).all()
     
     users = [
         {
@@ -258,11 +871,11 @@ def get_all_users():
     
     return jsonify(users)
 
-@app.route('/api/admin/users/<int:user_id>/reset-password', methods=['POST'])
+@bp.route('/api/admin/users/<int:user_id>/reset-password', methods=['POST'])
 @require_admin
 def admin_reset_password(user_id):
     """Reset a user's password to their username (admin only)"""
-    user = User.query.get(user_id)
+    user = User.query.filter_by(id=user_id, tenant_id=current_tenant()).first()
     
     if not user:
         return jsonify({'error': 'Usuario no encontrado'}), 404
@@ -271,10 +884,11 @@ def admin_reset_password(user_id):
     new_password = user.username.lower().replace(" ", "").replace(".", "")
     user.password_hash = hash_password(new_password)
     db.session.commit()
+    audit('user.reset_password', 'user', user.id, username=user.username)
     
     return jsonify({'success': True, 'message': f'Contraseña reseteada a: {new_password}'})
 
-@app.route('/api/admin/emergency-reset-garras')
+@bp.route('/api/admin/emergency-reset-garras')
 def emergency_reset_garras():
     """RESET DE EMERGENCIA PARA PROD (Usar solo si login falla)"""
     key = request.args.get('key')
@@ -300,75 +914,230 @@ def emergency_reset_garras():
         msg = "Usuario GARRAS creado. Pass: GARRAS123"
         
     db.session.commit()
+    audit('user.emergency_reset', 'user', user.id, tenant_id=user.tenant_id, username=user.username)
     return jsonify({'success': True, 'message': msg})
 
+# ==================== AUDIT LOG ====================
+
+def audit(action, target_type=None, target_id=None, tenant_id=None, **details):
+    """Queues an audit event by the logged-in user; audit_log writes it in bulk later"""
+    actor = session.get('user') or {}
+    audit_log.record(
+        action,
+        tenant_id=tenant_id or actor.get('tenantId', DEFAULT_TENANT_ID),
+        actor_id=actor.get('id'),
+        actor_name=actor.get('username'),
+        target_type=target_type,
+        target_id=target_id,
+        details=json.dumps(details, ensure_ascii=False, default=str) if details else None,
+        ip=request.remote_addr
+    )
+
+@bp.route('/api/admin/audit')
+@require_admin
+def get_audit_log():
+    """
+    Audit events of the peña, newest first. Filters: ?actor=<user id>,
+    ?action=match.result, ?since= / ?until= (ISO datetimes, UTC), ?limit=
+    (default 100, max 500). Page back with ?until=<created_at of the last>.
+    Only persisted events: the latest ones show up after the next flush
+    (AUDIT_FLUSH_SECONDS).
+    """
+    query = AuditEvent.query.filter(AuditEvent.tenant_id == current_tenant())
+    actor = request.args.get('actor', type=int)
+    if actor is not None:
+        query = query.filter(AuditEvent.actor_id == actor)
+    if request.args.get('action'):
+        query = query.filter(AuditEvent.action == request.args['action'])
+    try:
+        if request.args.get('since'):
+            query = query.filter(AuditEvent.created_at >= datetime.fromisoformat(request.args['since']))
+        if request.args.get('until'):
+            query = query.filter(AuditEvent.created_at < datetime.fromisoformat(request.args['until']))
+    except ValueError:
+        return jsonify({'error': 'Fecha inválida (formato ISO)'}), 400
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 500)
+    
+    events = query.order_by(AuditEvent.created_at.desc(), AuditEvent.id.desc()).limit(limit).all()
+    return jsonify([
+        {
+            'id': e.id,
+            'created_at': e.created_at.isoformat(),
+            'actor_id': e.actor_id,
+            'actor_name': e.actor_name,
+            'action': e.action,
+            'target_type': e.target_type,
+            'target_id': e.target_id,
+            'details': json.loads(e.details) if e.details else None,
+            'ip': e.ip
+        }
+        for e in events
+    ])
+
+# ==================== PEÑAS ====================
+
+TENANT_SLUG = re.compile(r'^[a-z0-9][a-z0-9-]{1,49}$')
+
+@bp.route('/api/admin/tenants')
+@require_instance_admin
+@read_replica
+def get_tenants():
+    """Peñas hosted by this instance with their user counts"""
+    rows = db.session.query(Tenant, func.count(User.id))\
+        .outerjoin(User, User.tenant_id == Tenant.id)\
+        .group_by(Tenant.id).order_by(Tenant.id).all()
+    return jsonify([
+        {'id': t.id, 'slug': t.slug, 'name': t.name, 'users': users, 'created_at': t.created_at.isoformat()}
+        for t, users in rows
+    ])
+
+@bp.route('/api/admin/tenants', methods=['POST'])
+@require_instance_admin
+def create_tenant():
+    """
+    New peña with its first admin:
+    {"slug": "pena-lezama", "name": "Peña Lezama", "adminUsername": "...", "adminPassword": "..."}
+    Its users register with {"tenant": "pena-lezama"}.
+    """
+    data = request.get_json()
+    slug = (data.get('slug') or '').strip().lower()
+    name = data.get('name')
+    admin_username = data.get('adminUsername')
+    admin_password = data.get('adminPassword')
+    
+    if not name or not admin_username or not admin_password:
+        return jsonify({'error': 'Faltan campos obligatorios'}), 400
+    if not TENANT_SLUG.match(slug):
+        return jsonify({'error': 'Identificador inválido (minúsculas, números y guiones)'}), 400
+    if len(admin_password) < 4:
+        return jsonify({'error': 'La contraseña debe tener al menos 4 caracteres'}), 400
+    if Tenant.query.filter_by(slug=slug).first():
+        return jsonify({'error': 'La peña ya existe'}), 400
+    if User.query.filter_by(username=admin_username).first():
+        return jsonify({'error': 'El usuario ya existe'}), 400
+    
+    try:
+        tenant = Tenant(slug=slug, name=name)
+        db.session.add(tenant)
+        db.session.flush()
+        db.session.add(User(
+            username=admin_username,
+            password_hash=hash_password(admin_password),
+            display_name=data.get('adminDisplayName') or f'Admin {name}',
+            is_admin=1,
+            tenant_id=tenant.id
+        ))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Error al crear la peña'}), 500
+    
+    audit('tenant.create', 'tenant', tenant.id, slug=slug, admin=admin_username)
+    return jsonify({'success': True, 'id': tenant.id, 'slug': tenant.slug})
+
 # ==================== MATCHES ROUTES ====================
 
-@app.route('/api/matches')
+@bp.route('/api/matches')
 @require_auth
+@read_replica
 def get_all_matches():
-    matches = Match.query.order_by(Match.match_date.desc()).all()
-    
-    matches_list = []
-    for m in matches:
-        matches_list.append({
-            'id': m.id,
-            'team': m.team,
-            'opponent': m.opponent,
-            'is_home': m.is_home,
-            'match_date': m.match_date.isoformat(),
-            'deadline': m.deadline.isoformat(),
-            'home_goals': m.home_goals,
-            'away_goals': m.away_goals,
-            'is_finished': m.is_finished,
-            'created_at': m.created_at.isoformat()
-        })
-    
-    return jsonify(matches_list)
+    """
+    Matches of the active season (?season=2024-25, ?season=all).
+    ?since=<cursor> returns only what changed after the cursor (see sync_payload).
+    """
+    season = requested_season()
+    M, _ = season_models(season)
+    query = M.query.filter(M.tenant_id == current_tenant())
+    if season:
+        query = query.filter(M.season == season)
+    
+    since = request.args.get('since', type=int)
+    if since is not None:
+        cursor = sync_cursor(since)
+        ids = changed_ids(since, 'match', tenant_id=current_tenant())
+        deleted = ()
+        if ids is not None:
+            query = query.filter(M.id.in_(ids))
+            deleted = deleted_ids(since, 'match', tenant_id=current_tenant())
+        matches = query.order_by(M.match_date.desc()).all()
+        return jsonify(sync_payload(cursor, ids, [_match_dict(m) for m in matches], deleted))
+    
+    matches = query.order_by(M.match_date.desc()).all()
+    return jsonify([_match_dict(m) for m in matches])
 
-@app.route('/api/matches/upcoming')
+def _match_dict(m):
+    return {
+        'id': m.id,
+        'team': m.team,
+        'opponent': m.opponent,
+        'is_home': m.is_home,
+        'match_date': m.match_date.isoformat(),
+        'deadline': m.deadline.isoformat(),
+        'home_goals': m.home_goals,
+        'away_goals': m.away_goals,
+        'is_finished': m.is_finished,
+        'jornada_id': m.jornada_id,
+        'rule_set': m.rule_set,
+        'season': m.season,
+        'created_at': m.created_at.isoformat() if m.created_at else None
+    }
+
+@bp.route('/api/matches/upcoming')
 @require_auth
+@read_replica
 def get_upcoming_matches():
-    matches = Match.query.filter_by(is_finished=0).order_by(Match.match_date.asc()).all()
-    
-    matches_data = []
+    matches_data = upcoming_matches_payload(current_tenant())
     user_id = session['user']['id']
-    print(f"DEBUG: get_upcoming_matches user={user_id} type={type(user_id)}")
-    
-    for match in matches:
-        match_dict = {
-            'id': match.id,
-            'team': match.team,
-            'opponent': match.opponent,
-            'is_home': match.is_home,
-            'match_date': match.match_date.isoformat(),
-            'deadline': match.deadline.isoformat(),
-            'home_goals': match.home_goals,
-            'away_goals': match.away_goals,
-            'is_finished': match.is_finished
-        }
-        
-        # User prediction
-        pred = Prediction.query.filter_by(user_id=user_id, match_id=match.id).first()
-        print(f"DEBUG: Match {match.id} - Pred: {pred}")
-        match_dict['userPrediction'] = {
-            'id': pred.id,
-            'home_goals': pred.home_goals,
-            'away_goals': pred.away_goals,
-            'points': pred.points
-        } if pred else None
-        
-        now = datetime.now()
-        match_dict['canPredict'] = now < match.deadline
-        
-        matches_data.append(match_dict)
     
-    return jsonify(matches_data)
+    # User predictions for all upcoming matches in one query
+    predictions = {}
+    if matches_data:
+        for pred in Prediction.query.filter(
+                Prediction.user_id == user_id,
+                Prediction.match_id.in_([m['id'] for m in matches_data])).all():
+            predictions[pred.match_id] = {
+                'id': pred.id,
+                'home_goals': pred.home_goals,
+                'away_goals': pred.away_goals,
+                'points': pred.points
+            }
+    
+    now = datetime.now()
+    result = []
+    for match in matches_data:
+        match_dict = dict(match)
+        match_dict['userPrediction'] = predictions.get(match['id'])
+        match_dict['canPredict'] = not match['predictions_closed'] and now < datetime.fromisoformat(match['deadline'])
+        result.append(match_dict)
+    
+    return jsonify(result)
 
-@app.route('/api/matches/<int:match_id>')
+def upcoming_matches_payload(tenant_id):
+    """Pending matches of a peña (shared by its users), cached until fixtures change"""
+    def build():
+        matches = Match.query.filter_by(tenant_id=tenant_id, is_finished=0).order_by(Match.match_date.asc()).all()
+        return [
+            {
+                'id': match.id,
+                'team': match.team,
+                'opponent': match.opponent,
+                'is_home': match.is_home,
+                'match_date': match.match_date.isoformat(),
+                'deadline': match.deadline.isoformat(),
+                'home_goals': match.home_goals,
+                'away_goals': match.away_goals,
+                'is_finished': match.is_finished,
+                'jornada_id': match.jornada_id,
+                'predictions_closed': match.predictions_closed
+            }
+            for match in matches
+        ]
+    return cached(f'upcoming_matches:{tenant_id}', build)
+
+@bp.route('/api/matches/<int:match_id>')
 @require_auth
 def get_match(match_id):
-    match = Match.query.get(match_id)
+    match = tenant_match(match_id)
     
     if not match:
         return jsonify({'error': 'Partido no encontrado'}), 404
@@ -382,12 +1151,13 @@ def get_match(match_id):
         'deadline': match.deadline.isoformat(),
         'home_goals': match.home_goals,
         'away_goals': match.away_goals,
-        'is_finished': match.is_finished
+        'is_finished': match.is_finished,
+        'jornada_id': match.jornada_id
     }
     
     return jsonify(match_dict)
 
-@app.route('/api/matches', methods=['POST'])
+@bp.route('/api/matches', methods=['POST'])
 @require_admin
 def create_match():
     data = request.get_json()
@@ -396,24 +1166,39 @@ def create_match():
     is_home = data.get('isHome', True)
     match_date = data.get('matchDate')
     deadline = data.get('deadline')
+    jornada_id = data.get('jornadaId')
+    rule_set = data.get('ruleSet') or CURRENT_RULE_SET
     
     if not team or not opponent or not match_date or not deadline:
         return jsonify({'error': 'Faltan campos obligatorios'}), 400
     
+    if rule_set not in available_rule_sets():
+        return jsonify({'error': 'Reglas de puntuación desconocidas'}), 400
+    
+    tenant_id = current_tenant()
+    if jornada_id is not None and not Jornada.query.filter_by(id=jornada_id, tenant_id=tenant_id).first():
+        return jsonify({'error': 'Jornada no encontrada'}), 404
+    
     new_match = Match(
         team=team,
         opponent=opponent,
         is_home=1 if is_home else 0,
         match_date=datetime.fromisoformat(match_date),
-        deadline=datetime.fromisoformat(deadline)
+        deadline=datetime.fromisoformat(deadline),
+        jornada_id=jornada_id,
+        rule_set=rule_set,
+        tenant_id=tenant_id
     )
     
     db.session.add(new_match)
     db.session.commit()
+    audit('match.create', 'match', new_match.id, team=team, opponent=opponent, match_date=match_date)
+    invalidate_fixtures(tenant_id)
+    deadline_scheduler.wake()
     
     return jsonify({'success': True, 'id': new_match.id})
 
-@app.route('/api/matches/<int:match_id>/result', methods=['PUT'])
+@bp.route('/api/matches/<int:match_id>/result', methods=['PUT'])
 @require_admin
 def set_match_result(match_id):
     data = request.get_json()
@@ -423,44 +1208,62 @@ def set_match_result(match_id):
     if home_goals is None or away_goals is None:
         return jsonify({'error': 'Faltan los goles'}), 400
     
-    match = Match.query.get(match_id)
+    match = tenant_match(match_id)
     if not match:
          return jsonify({'error': 'Partido no encontrado'}), 404
 
-    match.home_goals = home_goals
-    match.away_goals = away_goals
-    match.is_finished = 1
-    
-    db.session.commit()
-    
-    # Calculate points
-    calculate_points_for_match(match_id, home_goals, away_goals)
+    previous = [match.home_goals, match.away_goals] if match.is_finished else None
+    try:
+        apply_match_results([(match, home_goals, away_goals)])
+    except Exception as e:
+        return jsonify({'error': 'Error al guardar el resultado'}), 500
     
+    audit('match.result', 'match', match_id, result=[home_goals, away_goals], previous=previous)
     return jsonify({'success': True})
 
-@app.route('/api/matches/<int:match_id>', methods=['DELETE'])
+@bp.route('/api/matches/<int:match_id>', methods=['DELETE'])
 @require_admin
 def delete_match(match_id):
-    match = Match.query.get(match_id)
+    match = tenant_match(match_id)
     if match:
         # Cascade delete handles predictions deletion automatically via relationship
+        LeaderboardSnapshot.query.filter_by(match_id=match_id).delete()
+        delete_mvp_data(match_id)
+        MatchView.query.filter_by(match_id=match_id).delete()
+        PredictionCount.query.filter_by(match_id=match_id).delete()
+        ReminderJob.query.filter_by(match_id=match_id).delete()
+        season, was_finished, tenant_id = match.season, match.is_finished, match.tenant_id
+        position = (match.match_date, match.id)
+        predicted = [u for (u,) in db.session.query(Prediction.user_id).filter_by(match_id=match_id)]
         db.session.delete(match)
         db.session.commit()
+        audit('match.delete', 'match', match_id, team=match.team, opponent=match.opponent,
+              predictions=len(predicted))
+        if was_finished:
+            snapshot_leaderboard(tenant_id, season, since=position)  # Its points leave later totals
+            refresh_leaderboard_matrix(tenant_id, season)
+            invalidate_user_stats(predicted, {season})
+        invalidate_fixtures(tenant_id)
+        invalidate_standings(tenant_id)
     
     return jsonify({'success': True})
 
-@app.route('/api/admin/stats')
+@bp.route('/api/admin/stats')
 @require_admin
 def get_admin_stats():
+    tenant_id = current_tenant()
     # 1. Total Users
-    total_users = User.query.count()
+    total_users = User.query.filter_by(tenant_id=tenant_id).count()
     
     # 2. Upcoming matches participation
-    upcoming = Match.query.filter_by(is_finished=0).order_by(Match.match_date.asc()).all()
+    upcoming = Match.query.filter_by(tenant_id=tenant_id, is_finished=0).order_by(Match.match_date.asc()).all()
     upcoming_data = []
+    counts = dict(db.session.query(Prediction.match_id, func.count(Prediction.id))
+                  .filter(Prediction.match_id.in_([m.id for m in upcoming]))
+                  .group_by(Prediction.match_id).all()) if upcoming else {}
     
     for m in upcoming:
-        pred_count = Prediction.query.filter_by(match_id=m.id).count()
+        pred_count = counts.get(m.id, 0)
         part_percent = round((pred_count / total_users * 100) if total_users > 0 else 0)
         
         upcoming_data.append({
@@ -479,7 +1282,7 @@ def get_admin_stats():
         # Users who haven't predicted for the next match
         # Subquery of user IDs who DID predict
         subquery = db.session.query(Prediction.user_id).filter_by(match_id=next_match.id)
-        users_no_pred_query = User.query.filter(~User.id.in_(subquery)).limit(10).all()
+        users_no_pred_query = User.query.filter(User.tenant_id == tenant_id, ~User.id.in_(subquery)).limit(10).all()
         users_no_pred = [{'display_name': u.display_name} for u in users_no_pred_query]
 
     return jsonify({
@@ -488,20 +1291,20 @@ def get_admin_stats():
         'usersWithoutPredictions': users_no_pred
     })
 
-@app.route('/api/matches/<int:match_id>/predictions')
+@bp.route('/api/matches/<int:match_id>/predictions')
 @require_admin
 def get_match_predictions(match_id):
-    # ... logic continues ...
+    if not tenant_match(match_id):
+        return jsonify({'error': 'Partido no encontrado'}), 404
+    
     # Get all predictions for this match with user info
     predictions_results = db.session.query(Prediction, User.display_name)\
         .join(User).filter(Prediction.match_id == match_id)\
         .order_by(User.display_name).all()
         
     predictions_list = []
-    submitted_user_ids = []
     
     for pred, display_name in predictions_results:
-        submitted_user_ids.append(pred.user_id)
         predictions_list.append({
             'id': pred.id,
             'user_id': pred.user_id,
@@ -513,41 +1316,288 @@ def get_match_predictions(match_id):
         })
     
     # Get users who haven't submitted predictions
-    missing_users = User.query.filter(User.is_admin == 0)\
-        .filter(~User.id.in_(submitted_user_ids) if submitted_user_ids else True)\
+    missing_users = missing_predictions_query(Match.id == match_id)\
         .order_by(User.display_name).all()
         
-    missing_list = [{'id': u.id, 'display_name': u.display_name} for u in missing_users]
+    missing_list = [{'id': r.user_id, 'display_name': r.display_name} for r in missing_users]
     
     return jsonify({'predictions': predictions_list, 'missing': missing_list})
 
-# ==================== PREDICTIONS ROUTES ====================
+def open_for_predictions(now):
+    """Matches that still accept predictions"""
+    return (Match.is_finished == 0) & (Match.predictions_closed == 0) & (Match.deadline > now)
+
+def missing_predictions_query(*criteria):
+    """
+    (match_id, user_id, display_name) of every non-admin user of the match's
+    peña without a prediction for the matches selected by criteria: one
+    NOT EXISTS anti-join, whatever the number of users.
+    """
+    predicted = select(Prediction.id).where(
+        Prediction.match_id == Match.id, Prediction.user_id == User.id).exists()
+    return db.session.query(Match.id.label('match_id'), User.id.label('user_id'), User.display_name)\
+        .select_from(Match).join(User, (User.tenant_id == Match.tenant_id) & (User.is_admin == 0))\
+        .filter(*criteria, ~predicted)
+
+@bp.route('/api/admin/missing-predictions')
+@require_admin
+@read_replica
+def get_missing_predictions():
+    """Users without a prediction for every match still open, soonest deadline first"""
+    now = datetime.now()
+    tenant_id = current_tenant()
+    matches = Match.query.filter(Match.tenant_id == tenant_id, open_for_predictions(now))\
+        .order_by(Match.deadline.asc(), Match.id.asc()).all()
+    total_users = User.query.filter(User.tenant_id == tenant_id, User.is_admin == 0).count()
+    
+    missing = {m.id: [] for m in matches}
+    if matches:
+        for r in missing_predictions_query(Match.tenant_id == tenant_id, open_for_predictions(now))\
+                .order_by(User.display_name).all():
+            missing[r.match_id].append({'id': r.user_id, 'display_name': r.display_name})
+    
+    return jsonify({
+        'total_users': total_users,
+        'matches': [
+            {
+                'id': m.id,
+                'team': m.team,
+                'opponent': m.opponent,
+                'is_home': m.is_home,
+                'match_date': m.match_date.isoformat(),
+                'deadline': m.deadline.isoformat(),
+                'submitted': total_users - len(missing[m.id]),
+                'missing_count': len(missing[m.id]),
+                'missing': missing[m.id]
+            }
+            for m in matches
+        ]
+    })
+
+# ==================== REMINDERS ====================
+
+def enqueue_reminders(now=None, window_hours=None, tenant_id=None):
+    """
+    Queues a reminder for every user missing a prediction on a match whose
+    deadline is within the window (of one peña, or all), in one INSERT ...
+    SELECT. Already queued pairs are skipped, so it is safe to run repeatedly.
+    """
+    now = now or datetime.now()
+    if window_hours is None:
+        window_hours = current_app.config['REMINDER_WINDOW_HOURS']
+    queued = select(ReminderJob.id).where(
+        ReminderJob.match_id == Match.id, ReminderJob.user_id == User.id).exists()
+    criteria = [open_for_predictions(now), Match.deadline <= now + timedelta(hours=window_hours), ~queued]
+    if tenant_id is not None:
+        criteria.append(Match.tenant_id == tenant_id)
+    pairs = missing_predictions_query(*criteria).with_entities(Match.id, User.id, literal('pending'), literal(0), literal(datetime.utcnow()), literal(datetime.utcnow()))
+    
+    result = db.session.execute(insert(ReminderJob.__table__).from_select(
+        ['match_id', 'user_id', 'status', 'attempts', 'next_attempt_at', 'created_at'], pairs.statement))
+    db.session.commit()
+    return result.rowcount
+
+def describe_reminders(job_ids):
+    """Reminder payloads of the jobs that still apply (no prediction yet, match still open)"""
+    predicted = select(Prediction.id).where(
+        Prediction.match_id == ReminderJob.match_id, Prediction.user_id == ReminderJob.user_id).exists()
+    rows = db.session.query(ReminderJob.id, User.id, User.username, User.display_name,
+                            Match.id, Match.team, Match.opponent, Match.deadline)\
+        .join(User, User.id == ReminderJob.user_id)\
+        .join(Match, Match.id == ReminderJob.match_id)\
+        .filter(ReminderJob.id.in_(job_ids), open_for_predictions(datetime.now()), ~predicted).all()
+    return [
+        {
+            'job_id': job_id,
+            'user_id': user_id,
+            'username': username,
+            'display_name': display_name,
+            'match_id': match_id,
+            'team': team,
+            'opponent': opponent,
+            'deadline': deadline.isoformat()
+        }
+        for job_id, user_id, username, display_name, match_id, team, opponent, deadline in rows
+    ]
+
+@click.command('reminders')
+@click.option('--loop', is_flag=True, help='Keep polling instead of exiting when the queue is empty.')
+@click.option('--workers', type=int, default=None, help='Sender threads (REMINDER_WORKERS).')
+@click.option('--batch', type=int, default=None, help='Jobs per claimed batch (REMINDER_BATCH).')
+@click.option('--poll', type=int, default=30, help='Seconds between rounds with --loop.')
+@with_appcontext
+def reminders_command(loop, workers, batch, poll):
+    """Queue reminders for missing predictions and deliver them."""
+    prune_idempotency_keys()
+    if loop:
+        reminder_queue.run_forever(enqueue_reminders, poll_seconds=poll, workers=workers, batch=batch)
+    queued = enqueue_reminders()
+    handled = reminder_queue.deliver(workers, batch)
+    print(f'🔔 Recordatorios: {queued} en cola, {handled} procesados')
+
+@bp.route('/api/admin/reminders')
+@require_admin
+def get_reminder_status():
+    """Reminder queue counts by status (own peña)"""
+    counts = dict(db.session.query(ReminderJob.status, func.count(ReminderJob.id))
+                  .join(Match, Match.id == ReminderJob.match_id)
+                  .filter(Match.tenant_id == current_tenant())
+                  .group_by(ReminderJob.status).all())
+    return jsonify({status: counts.get(status, 0) for status in ('pending', 'sending', 'sent', 'failed', 'skipped')})
 
-@app.route('/api/predictions', methods=['POST'])
+@bp.route('/api/admin/reminders/enqueue', methods=['POST'])
+@require_admin
+def admin_enqueue_reminders():
+    """Queue reminders now (only inserts jobs; delivery runs in `flask reminders`)"""
+    data = request.get_json(silent=True) or {}
+    try:
+        window_hours = int(data['windowHours']) if data.get('windowHours') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'windowHours debe ser un número de horas'}), 400
+    
+    try:
+        queued = enqueue_reminders(window_hours=window_hours, tenant_id=current_tenant())
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Error al encolar los recordatorios'}), 500
+    return jsonify({'success': True, 'queued': queued})
+
+# ==================== JORNADAS ====================
+
+def _jornada_dict(j, matches):
+    return {
+        'id': j.id,
+        'season': j.season,
+        'number': j.number,
+        'label': j.label,
+        'matches': [
+            {
+                'id': m.id,
+                'team': m.team,
+                'opponent': m.opponent,
+                'is_home': m.is_home,
+                'match_date': m.match_date.isoformat(),
+                'home_goals': m.home_goals,
+                'away_goals': m.away_goals,
+                'is_finished': m.is_finished
+            }
+            for m in matches
+        ]
+    }
+
+@bp.route('/api/jornadas')
 @require_auth
-def save_prediction():
+@read_replica
+def get_jornadas():
+    query = Jornada.query.filter_by(tenant_id=current_tenant())
+    season = request.args.get('season')
+    if season:
+        query = query.filter_by(season=season)
+    jornadas = query.order_by(Jornada.season.desc(), Jornada.number.desc()).all()
+    
+    by_jornada = {}
+    if jornadas:
+        for m in Match.query.filter(Match.jornada_id.in_([j.id for j in jornadas]))\
+                .order_by(Match.match_date.asc()).all():
+            by_jornada.setdefault(m.jornada_id, []).append(m)
+    
+    return jsonify([_jornada_dict(j, by_jornada.get(j.id, [])) for j in jornadas])
+
+@bp.route('/api/jornadas', methods=['POST'])
+@require_admin
+def create_jornada():
+    """Create a jornada, optionally grouping existing matches (matchIds)"""
     data = request.get_json()
-    match_id = data.get('matchId')
-    home_goals = data.get('homeGoals')
-    away_goals = data.get('awayGoals')
+    number = data.get('number')
+    if number is None:
+        return jsonify({'error': 'Falta el número de jornada'}), 400
+    season = data.get('season') or current_season()
+    tenant_id = current_tenant()
     
-    if match_id is None or home_goals is None or away_goals is None:
-        return jsonify({'error': 'Faltan campos obligatorios'}), 400
+    if Jornada.query.filter_by(tenant_id=tenant_id, season=season, number=number).first():
+        return jsonify({'error': 'La jornada ya existe'}), 400
     
-    user_id = session['user']['id']
+    try:
+        jornada = Jornada(tenant_id=tenant_id, season=season, number=number, label=data.get('label'))
+        db.session.add(jornada)
+        db.session.flush()
+        match_ids = data.get('matchIds') or []
+        if match_ids:
+            own = Match.id.in_(match_ids) & (Match.tenant_id == tenant_id)
+            Match.query.filter(own).update({Match.jornada_id: jornada.id}, synchronize_session=False)
+            log_bulk_changes(Match, own)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Error al crear la jornada'}), 500
     
-    # Check if prediction already exists (users cannot modify once submitted)
-    existing = Prediction.query.filter_by(user_id=user_id, match_id=match_id).first()
-    if existing:
-        return jsonify({'error': 'Ya has enviado un pronóstico para este partido. No se puede modificar.'}), 400
+    invalidate_fixtures(tenant_id)
     
-    # Check deadline
-    match = Match.query.get(match_id)
+    return jsonify({'success': True, 'id': jornada.id})
+
+@bp.route('/api/jornadas/<int:jornada_id>/results', methods=['PUT'])
+@require_admin
+def set_jornada_results(jornada_id):
+    """
+    Set all results of a jornada at once:
+    {"results": [{"matchId": 1, "homeGoals": 2, "awayGoals": 0}, ...]}
+    Everything is saved and scored in one transaction; derived data is
+    refreshed once.
+    """
+    jornada = Jornada.query.filter_by(id=jornada_id, tenant_id=current_tenant()).first()
+    if not jornada:
+        return jsonify({'error': 'Jornada no encontrada'}), 404
+    
+    data = request.get_json()
+    entries = data.get('results') or []
+    if not entries:
+        return jsonify({'error': 'No hay resultados'}), 400
+    
+    matches = {m.id: m for m in Match.query.filter_by(jornada_id=jornada_id).all()}
+    results = []
+    for entry in entries:
+        match = matches.get(entry.get('matchId'))
+        if match is None:
+            return jsonify({'error': f"El partido {entry.get('matchId')} no pertenece a la jornada"}), 400
+        if entry.get('homeGoals') is None or entry.get('awayGoals') is None:
+            return jsonify({'error': 'Faltan los goles'}), 400
+        results.append((match, entry['homeGoals'], entry['awayGoals']))
+    
+    try:
+        apply_match_results(results)
+    except Exception as e:
+        return jsonify({'error': 'Error al guardar los resultados'}), 500
+    
+    audit('jornada.results', 'jornada', jornada_id, results=[[m.id, h, a] for m, h, a in results])
+    return jsonify({'success': True, 'updated': len(results)})
+
+# ==================== PREDICTIONS ROUTES ====================
+
+@bp.route('/api/predictions', methods=['POST'])
+@require_auth
+def save_prediction():
+    data = request.get_json()
+    match_id = data.get('matchId')
+    home_goals = data.get('homeGoals')
+    away_goals = data.get('awayGoals')
+    
+    if match_id is None or home_goals is None or away_goals is None:
+        return jsonify({'error': 'Faltan campos obligatorios'}), 400
+    
+    user_id = session['user']['id']
+    
+    # Check if prediction already exists (users cannot modify once submitted)
+    existing = Prediction.query.filter_by(user_id=user_id, match_id=match_id).first()
+    if existing:
+        return jsonify({'error': 'Ya has enviado un pronóstico para este partido. No se puede modificar.'}), 400
+    
+    # Check deadline
+    match = tenant_match(match_id)
     
     if not match:
         return jsonify({'error': 'Partido no encontrado'}), 404
     
-    if datetime.now() > match.deadline:
+    if match.predictions_closed or datetime.now() > match.deadline:
         return jsonify({'error': 'El plazo para enviar pronósticos ha terminado'}), 400
     
     # Save prediction
@@ -556,149 +1606,1761 @@ def save_prediction():
             user_id=user_id,
             match_id=match_id,
             home_goals=home_goals,
-            away_goals=away_goals
+            away_goals=away_goals,
+            season=match.season,
+            tenant_id=match.tenant_id
         )
         db.session.add(new_pred)
+        _bump_scoreline(match_id, home_goals, away_goals, 1)
         db.session.commit()
-    except Exception as e:
+    except IntegrityError:
+        # A concurrent request from the same user saved first
         db.session.rollback()
-        return jsonify({'error': str(e)}), 400
+        return jsonify({'error': 'Ya has enviado un pronóstico para este partido. No se puede modificar.'}), 400
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('Error saving prediction for match %s', match_id)
+        return jsonify({'error': 'Error al guardar el pronóstico'}), 500
     
+    audit('prediction.create', 'prediction', new_pred.id, match_id=match_id, goals=[home_goals, away_goals])
+    invalidate_title_odds(match.tenant_id)
+    mark_write()
     return jsonify({'success': True})
 
-@app.route('/api/predictions')
+@bp.route('/api/predictions')
 @require_auth
+@read_replica
 def get_user_predictions():
+    """
+    Own predictions of the active season (?season=2024-25, ?season=all).
+    ?since=<cursor> returns only what changed after the cursor, including
+    predictions whose match result changed.
+    """
     user_id = session['user']['id']
+    season = requested_season()
+    M, P = season_models(season)
     
     # Join Prediction and Match
-    results = db.session.query(Prediction, Match)\
-        .join(Match).filter(Prediction.user_id == user_id)\
-        .order_by(Match.match_date.desc()).all()
-        
-    predictions_list = []
-    
-    for pred, match in results:
-        predictions_list.append({
-            'id': pred.id,
-            'user_id': pred.user_id,
-            'match_id': pred.match_id,
-            'home_goals': pred.home_goals,
-            'away_goals': pred.away_goals,
-            'points': pred.points,
-            'team': match.team,
-            'opponent': match.opponent,
-            'is_home': match.is_home,
-            'match_date': match.match_date.isoformat(),
-            'real_home': match.home_goals,
-            'real_away': match.away_goals,
-            'is_finished': match.is_finished
-        })
-    
-    return jsonify(predictions_list)
+    query = db.session.query(P, M)\
+        .join(M, M.id == P.match_id).filter(P.user_id == user_id)
+    if season:
+        query = query.filter(P.season == season)
+    
+    since = request.args.get('since', type=int)
+    if since is not None:
+        cursor = sync_cursor(since)
+        ids = changed_ids(since, 'prediction', user_id)
+        deleted = ()
+        if ids is not None:
+            deleted = deleted_ids(since, 'prediction', user_id)
+            match_ids = changed_ids(since, 'match', tenant_id=current_tenant())
+            if match_ids:
+                ids |= {i for (i,) in db.session.query(P.id).filter(
+                    P.user_id == user_id, P.match_id.in_(match_ids))}
+            query = query.filter(P.id.in_(ids))
+        results = query.order_by(M.match_date.desc()).all()
+        return jsonify(sync_payload(cursor, ids, [_prediction_dict(p, m) for p, m in results], deleted))
+    
+    results = query.order_by(M.match_date.desc()).all()
+    return jsonify([_prediction_dict(pred, match) for pred, match in results])
+
+@bp.route('/api/admin/predictions/<int:prediction_id>', methods=['DELETE'])
+@require_admin
+def delete_prediction(prediction_id):
+    """Removes a prediction (e.g. entered for the wrong match) so its user can send it again"""
+    pred = Prediction.query.filter_by(id=prediction_id, tenant_id=current_tenant()).first()
+    if not pred:
+        return jsonify({'error': 'Pronóstico no encontrado'}), 404
+    
+    match = Match.query.get(pred.match_id)
+    user_id = pred.user_id
+    goals = [pred.home_goals, pred.away_goals]
+    try:
+        db.session.delete(pred)
+        db.session.flush()
+        rebuild_prediction_counts(match.id)
+        if MatchView.query.get((match.id, 'predictions')):
+            store_match_view(match)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('Error deleting prediction %s', prediction_id)
+        return jsonify({'error': 'Error al borrar el pronóstico'}), 500
+    
+    audit('prediction.delete', 'prediction', prediction_id, user_id=user_id, match_id=match.id, goals=goals)
+    cache.delete(f'match_view:{match.id}')
+    invalidate_title_odds(match.tenant_id)
+    if match.is_finished:
+        refresh_leaderboard_matrix(match.tenant_id, match.season)
+        invalidate_user_stats([user_id], {match.season})
+        invalidate_standings(match.tenant_id)
+    mark_write()
+    return jsonify({'success': True})
+
+def _prediction_dict(pred, match):
+    return {
+        'id': pred.id,
+        'user_id': pred.user_id,
+        'match_id': pred.match_id,
+        'home_goals': pred.home_goals,
+        'away_goals': pred.away_goals,
+        'points': pred.points,
+        'team': match.team,
+        'opponent': match.opponent,
+        'is_home': match.is_home,
+        'match_date': match.match_date.isoformat(),
+        'real_home': match.home_goals,
+        'real_away': match.away_goals,
+        'is_finished': match.is_finished
+    }
+
+# ==================== DELTA SYNC ====================
+
+# The returned cursor trails this far behind, so a transaction that commits
+# after a later one is not skipped; recent rows are just sent again
+SYNC_SETTLE_SECONDS = 5
+CHANGE_LOG_DAYS = 120
+
+def sync_cursor(since):
+    settled = db.session.query(ChangeLog.id)\
+        .filter(ChangeLog.changed_at <= datetime.utcnow() - timedelta(seconds=SYNC_SETTLE_SECONDS))\
+        .order_by(ChangeLog.id.desc()).limit(1).scalar()
+    return max(since, settled or 0)
+
+def _change_query(since, entity, user_id, tenant_id):
+    query = db.session.query(ChangeLog.entity_id).filter(ChangeLog.entity == entity, ChangeLog.id > since)
+    if user_id is not None:
+        query = query.filter(ChangeLog.user_id == user_id)
+    if tenant_id is not None:
+        query = query.filter(ChangeLog.tenant_id == tenant_id)
+    return query
+
+def changed_ids(since, entity, user_id=None, tenant_id=None):
+    """Ids written or deleted after the cursor; None when the client needs a full list"""
+    if since <= 0:
+        return None
+    oldest = db.session.query(func.min(ChangeLog.id)).scalar()
+    if oldest is not None and since + 1 < oldest:
+        return None  # Older changes were pruned
+    return {i for (i,) in _change_query(since, entity, user_id, tenant_id).distinct()}
+
+def deleted_ids(since, entity, user_id=None, tenant_id=None):
+    """Ids deleted after the cursor (call once changed_ids says the cursor is still valid)"""
+    query = _change_query(since, entity, user_id, tenant_id).filter(ChangeLog.deleted == 1)
+    return {i for (i,) in query.distinct()}
+
+def sync_payload(cursor, ids, rows, deleted=()):
+    """
+    {cursor, full, changed, deleted}. With full=true the client replaces its
+    list; otherwise it upserts `changed` and drops the `deleted` ids. Changed
+    ids outside the requested list (another season) are in neither.
+    """
+    found = {r['id'] for r in rows}
+    return {
+        'cursor': cursor,
+        'full': ids is None,
+        'changed': rows,
+        'deleted': sorted(set(deleted) - found) if ids is not None else []
+    }
+
+def prune_change_log(days=CHANGE_LOG_DAYS):
+    """Drops old entries (clients with older cursors get a full list); keeps the newest row"""
+    newest = db.session.query(func.max(ChangeLog.id)).scalar()
+    if newest is None:
+        return 0
+    pruned = ChangeLog.query.filter(ChangeLog.changed_at < datetime.utcnow() - timedelta(days=days),
+                                    ChangeLog.id < newest).delete(synchronize_session=False)
+    db.session.commit()
+    return pruned
 
 # ==================== LOGIC ====================
 
-def calculate_points_for_match(match_id, real_home, real_away):
+def calculate_points_for_matches(matches):
     """
-    Calculates points based on Official Rules 25/26:
-    1. Exact Score: 5 pts
-    2. Partial (Max 3 pts):
-       - Correct Sign: 1 pt
-       - Correct Goal Diff: 1 pt
-       - Correct Goals (Home OR Away): 2 pts
+    Scores every prediction of the given finished matches in one pass,
+    each under its own rule set. Does not commit.
     """
+    by_id = {m.id: m for m in matches}
+    predictions = Prediction.query.filter(Prediction.match_id.in_(list(by_id))).all()
+    for pred in predictions:
+        match = by_id[pred.match_id]
+        pred.points = get_table(match.rule_set or CURRENT_RULE_SET).points(
+            pred.home_goals, pred.away_goals, match.home_goals, match.away_goals)
+    return len(predictions)
+
+def calculate_points_for_match(match_id, real_home, real_away):
+    """Scores every prediction of a finished match (see scoring.py)"""
     try:
-        predictions = Prediction.query.filter_by(match_id=match_id).all()
-        
-        # Determine Real Stats
-        real_diff = real_home - real_away
-        real_sign = 0
-        if real_home > real_away: real_sign = 1
-        elif real_away > real_home: real_sign = -1
-        
-        for pred in predictions:
-            # 1. EXACT SCORE (PLENO) -> 5 PTS
-            if pred.home_goals == real_home and pred.away_goals == real_away:
-                pred.points = 5
-                continue
-                
-            puntos = 0
-            
-            # b. Correct Sign (+1)
-            pred_sign = 0
-            if pred.home_goals > pred.away_goals: pred_sign = 1
-            elif pred.away_goals > pred.home_goals: pred_sign = -1
-            
-            if pred_sign == real_sign:
-                puntos += 1
-                
-            # c. Correct Difference (+1)
-            pred_diff = pred.home_goals - pred.away_goals
-            if pred_diff == real_diff:
-                puntos += 1
-                
-            # a. Correct Goals (Home OR Away) (+2)
-            if pred.home_goals == real_home or pred.away_goals == real_away:
-                puntos += 2
-                
-            # CAP AT 3 POINTS (Max partial score)
-            if puntos > 3:
-                puntos = 3
-                
-            pred.points = puntos
-            
+        match = Match.query.get(match_id)
+        match.home_goals = real_home
+        match.away_goals = real_away
+        calculate_points_for_matches([match])
         db.session.commit()
         print(f"Points calculated for match {match_id}")
     except Exception as e:
         print(f"Error calculating points: {e}")
         db.session.rollback()
 
-# ==================== LEADERBOARD ====================
+def apply_match_results(results):
+    """
+    Sets the scores of several matches and rescores their predictions in a
+    single transaction, then refreshes derived data once.
+    results: list of (match, home_goals, away_goals).
+    """
+    try:
+        for match, home_goals, away_goals in results:
+            match.home_goals = home_goals
+            match.away_goals = away_goals
+            match.is_finished = 1
+            match.predictions_closed = 1
+        scored = calculate_points_for_matches([m for m, _, _ in results])
+        db.session.commit()
+        print(f"Points calculated for {len(results)} match(es), {scored} predictions")
+    except Exception as e:
+        print(f"Error saving results: {e}")
+        db.session.rollback()
+        raise
+    
+    refresh_after_results([m for m, _, _ in results])
+
+def refresh_after_results(matches):
+    """Leaderboard snapshot, detail matrix and caches, once per peña in a batch of results"""
+    tenants = {m.tenant_id for m in matches}
+    for tenant_id, season in {(m.tenant_id, m.season) for m in matches}:
+        batch = [m for m in matches if (m.tenant_id, m.season) == (tenant_id, season)]
+        first = min(batch, key=lambda m: (m.match_date, m.id))
+        last = max(batch, key=lambda m: (m.match_date, m.id))
+        # An earlier (or corrected) result changes every later snapshot too
+        snapshot_leaderboard(tenant_id, season, since=(first.match_date, first.id), match_ids=[last.id])
+    for match in matches:
+        store_match_view(match)  # Points are now known
+    db.session.commit()
+    cache.delete(*[f'match_view:{m.id}' for m in matches])
+    predicted = db.session.query(Prediction.user_id).filter(Prediction.match_id.in_([m.id for m in matches]))
+    invalidate_user_stats([u for (u,) in predicted.distinct()], {m.season for m in matches})
+    for tenant_id, season in {(m.tenant_id, m.season) for m in matches}:
+        refresh_leaderboard_matrix(tenant_id, season)
+    for tenant_id in tenants:
+        invalidate_fixtures(tenant_id)
+        invalidate_standings(tenant_id)
+
+def rescore_season(season, tenant_id):
+    """
+    Recomputes the points of every finished match of a peña's season under
+    each match's own rule set. Reads plain tuples and writes only changed rows.
+    """
+    rows = db.session.query(
+        Prediction.id, Prediction.user_id, Prediction.home_goals, Prediction.away_goals, Prediction.points,
+        Match.home_goals, Match.away_goals, Match.rule_set
+    ).join(Match, Match.id == Prediction.match_id)\
+     .filter(Match.is_finished == 1, Match.season == season, Match.tenant_id == tenant_id).all()
+    
+    changes = []
+    rescored_users = set()
+    for pred_id, user_id, pred_home, pred_away, points, real_home, real_away, rule_set in rows:
+        new_points = get_table(rule_set or CURRENT_RULE_SET).points(pred_home, pred_away, real_home, real_away)
+        if new_points != points:
+            changes.append({'id': pred_id, 'points': new_points})
+            rescored_users.add(user_id)
+    
+    if changes:
+        db.session.execute(update(Prediction), changes)
+        log_bulk_changes(Prediction, Prediction.id.in_([c['id'] for c in changes]))
+    db.session.commit()
+    invalidate_user_stats(rescored_users, {season})
+    return len(rows), len(changes)
+
+@bp.route('/api/admin/seasons/<season>/rescore', methods=['POST'])
+@require_admin
+def admin_rescore_season(season):
+    """Rescore a whole season (e.g. 2024-25) of the own peña under its matches' rule sets"""
+    if season in archived_seasons():
+        return jsonify({'error': 'La temporada está archivada'}), 400
+    tenant_id = current_tenant()
+    try:
+        checked, changed = rescore_season(season, tenant_id)
+    except (KeyError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    
+    audit('season.rescore', 'season', None, season=season, changed=changed)
+    if changed:
+        snapshot_leaderboard(tenant_id, season)
+        refresh_leaderboard_matrix(tenant_id, season)
+        invalidate_standings(tenant_id)
+    
+    return jsonify({'success': True, 'checked': checked, 'changed': changed})
 
+# ==================== SEASONS ====================
 
+SEASON_LABEL = re.compile(r'^\d{4}-\d{2}$')
 
-@app.route('/api/leaderboard')
+def current_season():
+    """Active season: the one an admin activated, else the season of the latest match"""
+    def find():
+        active = Season.query.filter_by(is_active=1).first()
+        if active:
+            return active.label
+        latest = db.session.query(func.max(Match.match_date)).scalar()
+        return season_for(latest or datetime.now())
+    return cached('active_season', find)
+
+def requested_season():
+    """?season= of the request, the active season by default; None for ?season=all"""
+    season = request.args.get('season') or current_season()
+    return None if season == 'all' else season
+
+def archived_seasons():
+    return cached('archived_seasons', lambda: {
+        s.label for s in Season.query.filter(Season.archived_at.isnot(None)).all()
+    })
+
+def season_models(season):
+    """(match model, prediction model) holding a season: hot tables or the archive"""
+    if season and season in archived_seasons():
+        return ArchivedMatch, ArchivedPrediction
+    return Match, Prediction
+
+def archive_season(season):
+    """
+    Moves a finished season's matches and predictions to the archive tables
+    in one transaction. Its detail matrix and MVP ranking are kept; rank
+    snapshots, match views and per-match MVP data are dropped.
+    """
+    match_ids = select(Match.id).where(Match.season == season).scalar_subquery()
+    moves = (
+        (Match, ArchivedMatch, Match.season == season),
+        (Prediction, ArchivedPrediction, Prediction.match_id.in_(match_ids)),
+    )
+    try:
+        for hot, cold, condition in moves:
+            columns = [c.name for c in cold.__table__.columns]
+            source = select(*[hot.__table__.c[name] for name in columns]).where(condition)
+            db.session.execute(insert(cold.__table__).from_select(columns, source))
+        
+        log_bulk_changes(Prediction, Prediction.match_id.in_(match_ids), deleted=1)
+        log_bulk_changes(Match, Match.season == season, deleted=1)
+        for model in (LeaderboardSnapshot, MatchView, PredictionCount, MvpVote, MvpVoteCount, MvpEligiblePlayer, MvpPoll, Prediction):
+            db.session.execute(delete(model).where(model.match_id.in_(match_ids)))
+        moved = db.session.execute(delete(Match).where(Match.season == season)).rowcount
+        
+        state = Season.query.get(season)
+        if state is None:
+            state = Season(label=season)
+            db.session.add(state)
+        state.archived_at = datetime.utcnow()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    cache.delete('archived_seasons')
+    cache.delete_prefix('match_view:')
+    invalidate_fixtures()
+    invalidate_standings()
+    return moved
+
+@bp.route('/api/seasons')
 @require_auth
-def get_leaderboard():
-    results = db.session.query(
+@read_replica
+def get_seasons():
+    """Known seasons, newest first, with the active and archived flags"""
+    labels = {s for (s,) in db.session.query(Match.season).filter(Match.tenant_id == current_tenant()).distinct() if s}
+    labels |= {s.label for s in Season.query.all()}
+    active = current_season()
+    archived = archived_seasons()
+    return jsonify([
+        {'season': label, 'active': label == active, 'archived': label in archived}
+        for label in sorted(labels | {active}, reverse=True)
+    ])
+
+@bp.route('/api/admin/seasons/<season>/activate', methods=['PUT'])
+@require_instance_admin
+def activate_season(season):
+    """Make a season the default scope of leaderboard, matches and predictions (every peña)"""
+    if not SEASON_LABEL.match(season):
+        return jsonify({'error': 'Temporada inválida (formato 2025-26)'}), 400
+    if season in archived_seasons():
+        return jsonify({'error': 'La temporada está archivada'}), 400
+    
+    Season.query.filter(Season.label != season).update({Season.is_active: 0}, synchronize_session=False)
+    state = Season.query.get(season)
+    if state is None:
+        db.session.add(Season(label=season, is_active=1))
+    else:
+        state.is_active = 1
+    db.session.commit()
+    
+    audit('season.activate', 'season', None, season=season)
+    invalidate_fixtures()
+    invalidate_standings()
+    return jsonify({'success': True, 'season': season})
+
+@bp.route('/api/admin/seasons/<season>/archive', methods=['POST'])
+@require_instance_admin
+def admin_archive_season(season):
+    """Move a closed season of every peña to the archive tables (still readable with ?season=)"""
+    if not SEASON_LABEL.match(season):
+        return jsonify({'error': 'Temporada inválida (formato 2025-26)'}), 400
+    if season in archived_seasons():
+        return jsonify({'error': 'La temporada ya está archivada'}), 400
+    if season == current_season():
+        return jsonify({'error': 'No se puede archivar la temporada activa'}), 400
+    if Match.query.filter(Match.season == season, Match.is_finished == 0).count():
+        return jsonify({'error': 'La temporada tiene partidos sin resultado'}), 400
+    
+    # The detail matrix of an archived season is never rebuilt, so make sure it is current
+    for (tenant_id,) in db.session.query(Match.tenant_id).filter(Match.season == season).distinct().all():
+        refresh_leaderboard_matrix(tenant_id, season)
+    try:
+        moved = archive_season(season)
+    except Exception as e:
+        return jsonify({'error': 'Error al archivar la temporada'}), 500
+    
+    audit('season.archive', 'season', None, season=season, matches=moved)
+    return jsonify({'success': True, 'season': season, 'matches': moved})
+
+# ==================== LEADERBOARD ====================
+
+def leaderboard_rows(tenant_id, season=None):
+    """Aggregated standings of a peña's season (all-time if None) ordered by points, then exact hits"""
+    _, P = season_models(season)
+    joined = P.user_id == User.id
+    if season:
+        joined = joined & (P.season == season)
+    return db.session.query(
         User.id,
+        User.username,
         User.display_name,
-        func.coalesce(func.sum(Prediction.points), 0).label('total_points'),
-        func.count(case((Prediction.points == 5, 1))).label('exact_predictions'),
-        func.count(Prediction.points).label('total_predictions')
-    ).outerjoin(Prediction)\
+        func.coalesce(func.sum(P.points), 0).label('total_points'),
+        func.count(case((P.points == 5, 1))).label('exact_predictions'),
+        func.count(P.points).label('total_predictions')
+    ).outerjoin(P, joined)\
+    .filter(User.tenant_id == tenant_id)\
     .group_by(User.id)\
     .order_by(desc('total_points'), desc('exact_predictions')).all()
 
+def snapshot_leaderboard(tenant_id, season, since=None, match_ids=()):
+    """
+    Stores every user's cumulative points, exact hits and rank right after
+    a result, so rank history is read back instead of re-aggregated.
+    Each snapshot holds the standings as of its own match (season matches
+    up to its date). Builds the snapshots of match_ids and rebuilds every
+    stored one from ``since`` (a (match_date, id) key; None: the whole
+    season) on, since an earlier result changes all later totals.
+    """
+    order = (Match.match_date, Match.id)
+    finished = (Match.tenant_id == tenant_id) & (Match.season == season) & (Match.is_finished == 1)
+    try:
+        targets = set(match_ids)
+        stored = db.session.query(LeaderboardSnapshot.match_id).distinct()\
+            .join(Match, Match.id == LeaderboardSnapshot.match_id).filter(finished)
+        if since is not None:
+            stored = stored.filter(tuple_(*order) >= since)
+        targets |= {i for (i,) in stored}
+        
+        matches = db.session.query(Match.id).filter(finished).order_by(*order).all()
+        last = max((position for position, (i,) in enumerate(matches) if i in targets), default=None)
+        if last is None:
+            return
+        matches = [i for (i,) in matches[:last + 1]]
+        
+        points_by_match = {}
+        for match_id, user_id, points in db.session.query(Prediction.match_id, Prediction.user_id, Prediction.points)\
+                .filter(Prediction.match_id.in_(matches), Prediction.points.isnot(None)):
+            points_by_match.setdefault(match_id, []).append((user_id, points))
+        
+        totals = {user_id: [0, 0] for (user_id,) in db.session.query(User.id).filter(User.tenant_id == tenant_id)}
+        rows = []
+        now = datetime.utcnow()
+        for match_id in matches:
+            for user_id, points in points_by_match.get(match_id, ()):
+                if user_id in totals:
+                    totals[user_id][0] += points
+                    totals[user_id][1] += points == 5
+            if match_id not in targets:
+                continue
+            rank = 0
+            previous = None
+            standings = sorted(totals.items(), key=lambda item: (-item[1][0], -item[1][1], item[0]))
+            for position, (user_id, (total, exact)) in enumerate(standings, start=1):
+                if (total, exact) != previous:
+                    rank = position  # Ties share rank: 1, 2, 2, 4
+                    previous = (total, exact)
+                rows.append({'match_id': match_id, 'user_id': user_id, 'total_points': total,
+                             'exact_predictions': exact, 'rank': rank, 'created_at': now})
+        
+        LeaderboardSnapshot.query.filter(LeaderboardSnapshot.match_id.in_(targets))\
+            .delete(synchronize_session=False)
+        if rows:
+            db.session.execute(LeaderboardSnapshot.__table__.insert(), rows)
+        db.session.commit()
+    except Exception as e:
+        current_app.logger.exception('Error saving leaderboard snapshots of %s (peña %s): %s', season, tenant_id, e)
+        db.session.rollback()
+
+# Column order of the detail export (same as server.js)
+TEAM_ORDER = {'Athletic Club': 1, 'Athletic Femenino': 2, 'Bilbao Athletic': 3}
+
+def season_for(date):
+    """Season label for a date; seasons start on July 1st (e.g. '2025-26')"""
+    start = date.year if date.month >= 7 else date.year - 1
+    return f"{start}-{str(start + 1)[-2:]}"
+
+def refresh_leaderboard_matrix(tenant_id, season):
+    """
+    Rebuilds a peña's user x finished-match points grid of a season in one
+    query. Stored as columnar JSON: users, matches and one row of cells per user.
+    Returns the stored payload (None if it could not be built).
+    """
+    try:
+        M, P = season_models(season)
+        rows = db.session.query(
+            P.user_id, P.match_id,
+            P.home_goals, P.away_goals, P.points,
+            User.username, User.display_name,
+            M.team, M.opponent, M.is_home, M.match_date,
+            M.home_goals.label('real_home'), M.away_goals.label('real_away')
+        ).join(M, M.id == P.match_id)\
+         .join(User, User.id == P.user_id)\
+         .filter(P.tenant_id == tenant_id, P.season == season,
+                 M.is_finished == 1, M.season == season, M.tenant_id == tenant_id).all()
+        
+        users = {}
+        matches = {}
+        cells = {}
+        for r in rows:
+            users.setdefault(r.user_id, {'id': r.user_id, 'username': r.username, 'display_name': r.display_name})
+            matches.setdefault(r.match_id, {
+                'id': r.match_id,
+                'team': r.team,
+                'opponent': r.opponent,
+                'is_home': r.is_home,
+                'match_date': r.match_date.isoformat(),
+                'home_goals': r.real_home,
+                'away_goals': r.real_away
+            })
+            cells[(r.user_id, r.match_id)] = (r.home_goals, r.away_goals, r.points or 0)
+        
+        user_list = sorted(users.values(), key=lambda u: u['display_name'])
+        match_list = sorted(matches.values(), key=lambda m: (TEAM_ORDER.get(m['team'], 4), m['match_date']))
+        
+        predictions = []
+        points = []
+        for u in user_list:
+            pred_row = []
+            points_row = []
+            for m in match_list:
+                cell = cells.get((u['id'], m['id']))
+                pred_row.append([cell[0], cell[1]] if cell else None)
+                points_row.append(cell[2] if cell else None)
+            predictions.append(pred_row)
+            points.append(points_row)
+        
+        payload = json.dumps({
+            'season': season,
+            'users': user_list,
+            'matches': match_list,
+            'predictions': predictions,
+            'points': points
+        }, separators=(',', ':'))
+        
+        matrix = LeaderboardMatrix.query.get((tenant_id, season))
+        if matrix:
+            matrix.payload = payload
+        else:
+            db.session.add(LeaderboardMatrix(tenant_id=tenant_id, season=season, payload=payload))
+        db.session.commit()
+        return payload
+    except Exception:
+        current_app.logger.exception('Error refreshing leaderboard matrix %s/%s', tenant_id, season)
+        db.session.rollback()
+        return None
+
+@bp.route('/api/leaderboard')
+@require_auth
+@read_replica
+def get_leaderboard():
+    """Standings of the active season (?season=2024-25, ?season=all)"""
+    return jsonify(leaderboard_payload(current_tenant(), requested_season()))
+
+def leaderboard_payload(tenant_id, season):
+    """
+    Leaderboard rows of a peña's season until results or users change: from
+    this worker's cache, else its materialized leaderboard_standings row,
+    else aggregated once and stored there for every worker.
+    """
+    label = season or 'all'
+    def build():
+        stored = LeaderboardStandings.query.get((tenant_id, label))
+        if stored:
+            return json.loads(stored.payload)
+        rows = [
+            {
+                'id': r.id,
+                'name': r.username,
+                'display_name': r.display_name,
+                'total_points': int(r.total_points),
+                'exact_predictions': r.exact_predictions,
+                'total_predictions': r.total_predictions
+            }
+            for r in leaderboard_rows(tenant_id, season)
+        ]
+        try:
+            db.session.add(LeaderboardStandings(tenant_id=tenant_id, season=label,
+                                                payload=json.dumps(rows, separators=(',', ':'))))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # Another worker stored it first
+        return rows
+    return cached(f'leaderboard:{tenant_id}:{label}', build)
+
+@bp.route('/api/leaderboard/detail')
+@require_auth
+@read_replica
+def get_leaderboard_detail():
+    """
+    Per-match points of every user as columnar JSON:
+    users[i] x matches[j] -> predictions[i][j] ([home, away] or null), points[i][j].
+    ?season=2025-26 (default: active season)
+    ?last_jornada=1 keeps only matches within 2 days of the latest one.
+    """
+    season = request.args.get('season') or current_season()
+    tenant_id = current_tenant()
+    
+    matrix = LeaderboardMatrix.query.get((tenant_id, season))
+    if matrix is not None:
+        payload = matrix.payload
+    else:
+        # Built from the primary and served as built: a lagging replica
+        # would not have the new row yet
+        with use_primary():
+            payload = refresh_leaderboard_matrix(tenant_id, season)
+    if payload is None:
+        return jsonify({'error': 'No se pudo generar la clasificación detallada'}), 500
+    
+    if request.args.get('last_jornada') != '1':
+        return current_app.response_class(payload, mimetype='application/json')
+    
+    data = json.loads(payload)
+    if data['matches']:
+        latest = max(datetime.fromisoformat(m['match_date']) for m in data['matches'])
+        cutoff = latest - timedelta(days=2)
+        keep = [j for j, m in enumerate(data['matches']) if datetime.fromisoformat(m['match_date']) >= cutoff]
+        data['matches'] = [data['matches'][j] for j in keep]
+        data['predictions'] = [[row[j] for j in keep] for row in data['predictions']]
+        data['points'] = [[row[j] for j in keep] for row in data['points']]
+    
+    return jsonify(data)
+
+@bp.route('/api/leaderboard/history')
+@require_auth
+@read_replica
+def get_leaderboard_history():
+    """
+    Points/rank series from stored snapshots, one query.
+    ?season=2024-25 (default: active season; archived seasons keep no snapshots)
+    ?user_id=<id> limits it to one user; otherwise the whole table.
+    """
+    query = db.session.query(
+        LeaderboardSnapshot.match_id,
+        LeaderboardSnapshot.user_id,
+        LeaderboardSnapshot.total_points,
+        LeaderboardSnapshot.exact_predictions,
+        LeaderboardSnapshot.rank,
+        Match.team,
+        Match.opponent,
+        Match.match_date,
+        User.display_name
+    ).join(Match, Match.id == LeaderboardSnapshot.match_id)\
+     .join(User, User.id == LeaderboardSnapshot.user_id)\
+     .filter(Match.tenant_id == current_tenant(),
+             Match.season == (request.args.get('season') or current_season()))
+    
+    user_id = request.args.get('user_id', type=int)
+    if user_id is not None:
+        query = query.filter(LeaderboardSnapshot.user_id == user_id)
+    
+    rows = query.order_by(Match.match_date.asc(), Match.id.asc(), LeaderboardSnapshot.rank.asc()).all()
+    
+    matches = []
+    match_index = {}
+    series = {}
+    for r in rows:
+        if r.match_id not in match_index:
+            match_index[r.match_id] = len(matches)
+            matches.append({
+                'id': r.match_id,
+                'team': r.team,
+                'opponent': r.opponent,
+                'match_date': r.match_date.isoformat()
+            })
+        entry = series.get(r.user_id)
+        if entry is None:
+            # Users registered later have no value (None) for earlier matches
+            entry = series[r.user_id] = {
+                'user_id': r.user_id,
+                'display_name': r.display_name,
+                'points': [None] * match_index[r.match_id],
+                'exact': [None] * match_index[r.match_id],
+                'rank': [None] * match_index[r.match_id]
+            }
+        gap = match_index[r.match_id] - len(entry['points'])
+        if gap > 0:
+            for key in ('points', 'exact', 'rank'):
+                entry[key].extend([None] * gap)
+        entry['points'].append(r.total_points)
+        entry['exact'].append(r.exact_predictions)
+        entry['rank'].append(r.rank)
+    
+    for entry in series.values():
+        gap = len(matches) - len(entry['points'])
+        if gap > 0:
+            for key in ('points', 'exact', 'rank'):
+                entry[key].extend([None] * gap)
+    
+    return jsonify({'matches': matches, 'series': list(series.values())})
+
+# ==================== USER STATS ====================
+
+def _outcome(home, away):
+    """1 / 0 / -1 for a home win / draw / away win, as SQL"""
+    return case((home > away, 1), (home < away, -1), else_=0)
+
+def user_stats_rows(user_id, season=None):
+    """
+    One row per finished match the user predicted, oldest first, from a
+    single window-function query: hit (right outcome), exact scoreline,
+    length of the hit/miss run the row belongs to (gaps and islands) and
+    per-team totals.
+    """
+    M, P = season_models(season)
+    order = (M.match_date, M.id)
+    hit = case((_outcome(P.home_goals, P.away_goals) == _outcome(M.home_goals, M.away_goals), 1), else_=0)
+    exact = case(((P.home_goals == M.home_goals) & (P.away_goals == M.away_goals), 1), else_=0)
+    played = select(
+        M.team, M.match_date, M.id.label('match_id'),
+        func.coalesce(P.points, 0).label('points'),
+        hit.label('hit'), exact.label('exact'),
+        # Consecutive rows with the same hit value share this number
+        (func.row_number().over(order_by=order)
+         - func.row_number().over(partition_by=hit, order_by=order)).label('island')
+    ).join(M, M.id == P.match_id).where(P.user_id == user_id, M.is_finished == 1)
+    if season:
+        played = played.where(P.season == season)
+    played = played.subquery()
+    
+    by_team = {'partition_by': played.c.team}
+    return db.session.execute(select(
+        played.c.team, played.c.points, played.c.hit, played.c.exact,
+        func.count().over(partition_by=(played.c.hit, played.c.island)).label('run'),
+        func.count().over(**by_team).label('team_predictions'),
+        func.sum(played.c.points).over(**by_team).label('team_points'),
+        func.sum(played.c.hit).over(**by_team).label('team_hits'),
+        func.sum(played.c.exact).over(**by_team).label('team_exact')
+    ).order_by(played.c.match_date, played.c.match_id)).all()
+
+def user_stats_payload(user_id, season):
+    """Stats of a user, cached until a result of a match they predicted changes"""
+    def build():
+        rows = user_stats_rows(user_id, season)
+        total = len(rows)
+        hits = sum(r.hit for r in rows)
+        exact = sum(r.exact for r in rows)
+        points = sum(r.points for r in rows)
+        teams = {}
+        for r in rows:
+            teams[r.team] = {
+                'team': r.team,
+                'predictions': r.team_predictions,
+                'points': int(r.team_points),
+                'hits': int(r.team_hits),
+                'exact': int(r.team_exact)
+            }
+        return {
+            'user_id': user_id,
+            'season': season or 'all',
+            'predictions': total,
+            'points': int(points),
+            'avg_points': round(points / total, 2) if total else 0,
+            'hits': hits,
+            'exact': exact,
+            'accuracy': round(hits / total, 4) if total else 0,
+            'exact_rate': round(exact / total, 4) if total else 0,
+            'current_streak': rows[-1].run if rows and rows[-1].hit else 0,
+            'best_streak': max((r.run for r in rows if r.hit), default=0),
+            'teams': sorted(teams.values(), key=lambda t: (TEAM_ORDER.get(t['team'], 4), t['team']))
+        }
+    return cached(f"user_stats:{user_id}:{season or 'all'}", build)
+
+def invalidate_user_stats(user_ids, seasons):
+    """Drops the cached stats of these users for these seasons (and all-time)"""
+    labels = set(seasons) | {'all'}
+    cache.delete(*[f'user_stats:{u}:{label}' for u in set(user_ids) for label in labels])
+
+@bp.route('/api/stats')
+@require_auth
+@read_replica
+def get_user_stats():
+    """
+    Accuracy (right outcome), exact-hit rate, current/best hit streak and
+    points per team of the logged-in user, or of ?user_id= from the same
+    peña. ?season=2024-25 (default: active season), ?season=all.
+    """
+    user_id = request.args.get('user_id', type=int) or session['user']['id']
+    user = User.query.filter_by(id=user_id, tenant_id=current_tenant()).first()
+    if not user:
+        return jsonify({'error': 'Usuario no encontrado'}), 404
+    
+    stats = dict(user_stats_payload(user_id, requested_season()))
+    stats['display_name'] = user.display_name
+    return jsonify(stats)
+
+# ==================== HEAD TO HEAD ====================
+
+def head_to_head_rows(user_id, rival_id, season=None):
+    """
+    Finished matches both users predicted, oldest first, with each one's
+    points and the running difference: one self-join on predictions.
+    """
+    M, P = season_models(season)
+    mine, theirs = aliased(P), aliased(P)
+    mine_points = func.coalesce(mine.points, 0)
+    theirs_points = func.coalesce(theirs.points, 0)
+    query = select(
+        M.id, M.match_date, M.team, M.opponent, M.is_home,
+        mine_points.label('points'), theirs_points.label('rival_points'),
+        func.sum(mine_points - theirs_points).over(order_by=(M.match_date, M.id)).label('diff')
+    ).select_from(mine)\
+     .join(theirs, (theirs.match_id == mine.match_id) & (theirs.user_id == rival_id))\
+     .join(M, M.id == mine.match_id)\
+     .where(mine.user_id == user_id, M.is_finished == 1)
+    if season:
+        query = query.where(mine.season == season)
+    return db.session.execute(query.order_by(M.match_date, M.id)).all()
+
+@bp.route('/api/head-to-head')
+@require_auth
+@read_replica
+def get_head_to_head():
+    """
+    ?user_id=X (&vs=Y, default the logged-in user) from the same peña:
+    aligned arrays over the matches both predicted, one entry per match.
+    """
+    rival_id = request.args.get('user_id', type=int)
+    user_id = request.args.get('vs', type=int) or session['user']['id']
+    if not rival_id:
+        return jsonify({'error': 'Falta el rival (user_id)'}), 400
+    
+    users = {u.id: u for u in User.query.filter(User.id.in_([user_id, rival_id]),
+                                                User.tenant_id == current_tenant())}
+    if user_id not in users or rival_id not in users:
+        return jsonify({'error': 'Usuario no encontrado'}), 404
+    
+    season = requested_season()
+    rows = head_to_head_rows(user_id, rival_id, season)
+    points = [r.points for r in rows]
+    rival_points = [r.rival_points for r in rows]
+    return jsonify({
+        'season': season or 'all',
+        'users': [{'id': i, 'display_name': users[i].display_name} for i in (user_id, rival_id)],
+        'matches': [r.id for r in rows],
+        'labels': [f"{r.team} - {r.opponent}" if r.is_home else f"{r.opponent} - {r.team}" for r in rows],
+        'dates': [r.match_date.isoformat() for r in rows],
+        'points': [points, rival_points],
+        'diff': [int(r.diff) for r in rows],
+        'wins': [sum(a > b for a, b in zip(points, rival_points)), sum(a < b for a, b in zip(points, rival_points))],
+        'ties': sum(a == b for a, b in zip(points, rival_points))
+    })
+
+def head_to_head_matrix(tenant_id, season=None):
+    """
+    All-pairs win matrix of a peña: wins[i][j] = matches both predicted
+    where i scored more than j. One points-by-level one-hot tensor and a
+    single matrix product instead of a query per pair.
+    """
+    import numpy as np
+    
+    users = leaderboard_rows(tenant_id, season)
+    user_index = {r.id: i for i, r in enumerate(users)}
+    M, P = season_models(season)
+    query = db.session.query(P.user_id, P.match_id, func.coalesce(P.points, 0))\
+        .join(M, M.id == P.match_id).filter(P.tenant_id == tenant_id, M.is_finished == 1)
+    if season:
+        query = query.filter(P.season == season)
+    rows = query.all()
+    match_index = {m: j for j, m in enumerate(sorted({m for _, m, _ in rows}))}
+    
+    shape = (len(users), len(match_index))
+    points = np.zeros(shape, dtype=np.int16)
+    has_pred = np.zeros(shape, dtype=bool)
+    for user_id, match_id, pts in rows:
+        i = user_index.get(user_id)
+        if i is not None:
+            points[i, match_index[match_id]] = pts
+            has_pred[i, match_index[match_id]] = True
+    
+    # level[u, m, k]: u scored exactly k on m; below[u, m, k]: u scored less than k
+    levels = np.arange(int(points.max(initial=0)) + 1)
+    level = ((points[:, :, None] == levels) & has_pred[:, :, None]).reshape(len(users), -1).astype(np.int32)
+    below = ((points[:, :, None] < levels) & has_pred[:, :, None]).reshape(len(users), -1).astype(np.int32)
+    wins = level @ below.T
+    ties = level @ level.T
+    common = has_pred.astype(np.int32) @ has_pred.T.astype(np.int32)
+    
+    return {
+        'season': season or 'all',
+        'users': [{'id': r.id, 'display_name': r.display_name} for r in users],
+        'wins': wins.tolist(),
+        'ties': ties.tolist(),
+        'common': common.tolist()
+    }
+
+@bp.route('/api/admin/head-to-head')
+@require_admin
+@read_replica
+def get_head_to_head_matrix():
+    """Pairwise win matrix of every user of the peña, in standings order"""
+    tenant_id = current_tenant()
+    season = requested_season()
+    return jsonify(cached(f"head_to_head:{tenant_id}:{season or 'all'}",
+                          lambda: head_to_head_matrix(tenant_id, season)))
+
+# ==================== CACHES & DEADLINES ====================
+
+def cached(key, compute):
+    """Shared cache entry; always filled from the primary database"""
+    def fill():
+        with use_primary():
+            return compute()
+    return cache.get_or_set(key, fill)
+
+# Cache keys carry the peña id; tenant_id=None invalidates every peña
+# (instance-wide changes: season activated or archived)
+
+def invalidate_fixtures(tenant_id=None):
+    """Pending match list changed (created, deleted, finished, regrouped)"""
+    if tenant_id is None:
+        cache.delete_prefix('upcoming_matches:')
+        cache.delete_prefix('title_odds:')
+    else:
+        cache.delete(f'upcoming_matches:{tenant_id}', f'title_odds:{tenant_id}')
+    cache.delete('active_season')
+    bump_data_versions('matches', tenant_id=tenant_id)
+
+def invalidate_standings(tenant_id=None):
+    """Points or users changed: drops the cached and materialized standings"""
+    if tenant_id is None:
+        cache.delete_prefix('leaderboard:')
+        cache.delete_prefix('title_odds:')
+        cache.delete_prefix('head_to_head:')
+        stale = LeaderboardStandings.query
+    else:
+        cache.delete_prefix(f'leaderboard:{tenant_id}:')
+        cache.delete(f'title_odds:{tenant_id}')
+        cache.delete_prefix(f'head_to_head:{tenant_id}:')
+        stale = LeaderboardStandings.query.filter_by(tenant_id=tenant_id)
+    try:
+        stale.delete(synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        print(f"Error dropping materialized standings: {e}")
+        db.session.rollback()
+    bump_data_versions('leaderboard', tenant_id=tenant_id)
+
+# Resources whose version clients (the service worker) compare before refetching.
+# Each has an instance-wide counter ('matches') and one per peña ('matches:3').
+VERSIONED_RESOURCES = ('matches', 'leaderboard')
+
+def bump_data_versions(*resources, tenant_id=None):
+    """Marks client-cached copies of these resources as stale (own small transaction)"""
+    if tenant_id is not None:
+        resources = [f'{r}:{tenant_id}' for r in resources]
+    try:
+        updated = DataVersion.query.filter(DataVersion.resource.in_(resources))\
+            .update({DataVersion.version: DataVersion.version + 1,
+                     DataVersion.updated_at: datetime.utcnow()}, synchronize_session=False)
+        if updated < len(resources):
+            existing = {r for (r,) in db.session.query(DataVersion.resource)
+                        .filter(DataVersion.resource.in_(resources))}
+            db.session.add_all([DataVersion(resource=r, version=1) for r in set(resources) - existing])
+        db.session.commit()
+    except Exception as e:
+        print(f"Error bumping data versions: {e}")
+        db.session.rollback()
+
+@bp.route('/api/version')
+@require_auth
+def get_data_versions():
+    """
+    Current version of each client-cached resource. The service worker serves
+    cached API responses and refetches one only when its versions changed.
+    Read from the primary: a lagging replica would keep stale data cached.
+    """
+    tenant_id = current_tenant()
+    keys = list(VERSIONED_RESOURCES) + [f'{r}:{tenant_id}' for r in VERSIONED_RESOURCES]
+    versions = {k: 0 for k in keys}
+    versions.update(dict(db.session.query(DataVersion.resource, DataVersion.version)
+                         .filter(DataVersion.resource.in_(keys)).all()))
+    matches = f"{versions['matches']}.{versions[f'matches:{tenant_id}']}"
+    leaderboard = f"{versions['leaderboard']}.{versions[f'leaderboard:{tenant_id}']}"
+    # canPredict flips when a deadline passes, even if nothing was written
+    due = Match.query.filter(Match.tenant_id == tenant_id, Match.is_finished == 0,
+                             Match.deadline <= datetime.now()).count()
+    own = Prediction.query.filter_by(user_id=session['user']['id']).count()
+    return jsonify({
+        'matches': f'{matches}.{due}',
+        'leaderboard': leaderboard,
+        'predictions': f'{matches}.{leaderboard}.{own}'
+    })
+
+def _increment(model, column, delta, **keys):
+    """
+    Adds delta to a counter row in a single INSERT ... ON CONFLICT DO UPDATE,
+    creating the row on first use. Unlike UPDATE-then-INSERT, two requests
+    creating the same row at once both count instead of one failing.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    counter = model.__table__.c[column]
+    db.session.execute(upsert(model.__table__).values(**keys, **{column: delta})
+                       .on_conflict_do_update(index_elements=list(keys), set_={column: counter + delta}))
+
+def _bump_scoreline(match_id, home_goals, away_goals, delta):
+    """Adds delta to the (match, scoreline) counter inside the current transaction"""
+    _increment(PredictionCount, 'predictions', delta, match_id=match_id, home_goals=home_goals,
+               away_goals=away_goals)
+
+def rebuild_prediction_counts(match_id):
+    """Recounts a match's scorelines from its predictions (after deletes); caller commits"""
+    PredictionCount.query.filter_by(match_id=match_id).delete(synchronize_session=False)
+    source = select(Prediction.match_id, Prediction.home_goals, Prediction.away_goals, func.count())\
+        .where(Prediction.match_id == match_id)\
+        .group_by(Prediction.match_id, Prediction.home_goals, Prediction.away_goals)
+    db.session.execute(insert(PredictionCount.__table__).from_select(
+        ['match_id', 'home_goals', 'away_goals', 'predictions'], source))
+
+def prediction_distribution(match_id):
+    """Crowd split and most predicted scorelines, read from the counters"""
+    counts = PredictionCount.query.filter(PredictionCount.match_id == match_id, PredictionCount.predictions > 0)\
+        .order_by(PredictionCount.predictions.desc(), PredictionCount.home_goals, PredictionCount.away_goals).all()
+    
+    split = {'home': 0, 'draw': 0, 'away': 0}
+    for c in counts:
+        split['home' if c.home_goals > c.away_goals else 'away' if c.away_goals > c.home_goals else 'draw'] += c.predictions
+    
+    return {
+        'total': sum(split.values()),
+        'split': split,
+        'scorelines': [
+            {'home_goals': c.home_goals, 'away_goals': c.away_goals, 'count': c.predictions}
+            for c in counts
+        ]
+    }
+
+def build_match_predictions_view(match):
+    """All predictions of a match plus the crowd distribution, as stored JSON"""
+    rows = db.session.query(Prediction.home_goals, Prediction.away_goals, Prediction.points, User.display_name)\
+        .join(User, User.id == Prediction.user_id)\
+        .filter(Prediction.match_id == match.id)\
+        .order_by(User.display_name).all()
+    
+    return {
+        'match_id': match.id,
+        'predictions': [
+            {'display_name': name, 'home_goals': home, 'away_goals': away, 'points': points}
+            for home, away, points, name in rows
+        ],
+        'distribution': prediction_distribution(match.id)
+    }
+
+def store_match_view(match):
+    payload = json.dumps(build_match_predictions_view(match), separators=(',', ':'))
+    view = MatchView.query.get((match.id, 'predictions'))
+    if view:
+        view.payload = payload
+        view.created_at = datetime.utcnow()
+    else:
+        db.session.add(MatchView(match_id=match.id, kind='predictions', payload=payload))
+    return payload
+
+def close_due_matches(now):
+    """
+    Marks matches past their deadline as closed and precomputes their views.
+    Also the scheduler leader's housekeeping: prunes expired idempotency keys.
+    """
+    prune_idempotency_keys()
+    due = Match.query.filter(Match.predictions_closed == 0, Match.deadline <= now).all()
+    for match in due:
+        match.predictions_closed = 1
+        store_match_view(match)
+    if due:
+        db.session.commit()
+        for tenant_id in {m.tenant_id for m in due}:
+            invalidate_fixtures(tenant_id)
+    return len(due)
+
+def next_deadline_after(now):
+    return db.session.query(func.min(Match.deadline))\
+        .filter(Match.predictions_closed == 0, Match.deadline > now).scalar()
+
+def warm_caches():
+    """Refill this worker's caches right after a deadline (peñas with matches awaiting a result)"""
+    recent = Match.query.filter(Match.predictions_closed == 1, Match.is_finished == 0).all()
+    season = current_season()
+    for tenant_id in {m.tenant_id for m in recent}:
+        cache.delete(f'upcoming_matches:{tenant_id}')
+        cache.delete_prefix(f'leaderboard:{tenant_id}:')
+        upcoming_matches_payload(tenant_id)
+        leaderboard_payload(tenant_id, season)
+        title_odds_payload(tenant_id)
+    cache.delete_prefix('match_view:')
+    for match in recent:
+        match_view_payload(match)
+
+def match_view_payload(match):
+    """Stored post-deadline view of a match (built on demand if the scheduler is off)"""
+    def load():
+        view = MatchView.query.get((match.id, 'predictions'))
+        if view:
+            return view.payload
+        payload = store_match_view(match)
+        db.session.commit()
+        return payload
+    return cached(f'match_view:{match.id}', load)
+
+@bp.route('/api/matches/<int:match_id>/all-predictions')
+@require_auth
+def get_match_all_predictions(match_id):
+    """Everyone's predictions and the crowd split, only once the deadline passed"""
+    match = tenant_match(match_id)
+    if not match:
+        return jsonify({'error': 'Partido no encontrado'}), 404
+    
+    if not match.predictions_closed and datetime.now() < match.deadline:
+        return jsonify({'error': 'Los pronósticos se muestran tras el cierre'}), 403
     
-    leaderboard = [
+    return current_app.response_class(match_view_payload(match), mimetype='application/json')
+
+@bp.route('/api/matches/<int:match_id>/distribution')
+@require_auth
+@read_replica
+def get_match_distribution(match_id):
+    """Crowd split and scoreline histogram only, once the deadline passed"""
+    match = tenant_match(match_id)
+    if not match:
+        return jsonify({'error': 'Partido no encontrado'}), 404
+    
+    if not match.predictions_closed and datetime.now() < match.deadline:
+        return jsonify({'error': 'Los pronósticos se muestran tras el cierre'}), 403
+    
+    return jsonify(dict(prediction_distribution(match.id), match_id=match.id))
+
+# ==================== TITLE ODDS ====================
+
+# Cached per peña until the next result or prediction change (see invalidate_title_odds)
+def invalidate_title_odds(tenant_id):
+    cache.delete(f'title_odds:{tenant_id}')
+
+def compute_title_odds(samples=200_000, workers=None, seed=None, tenant_id=DEFAULT_TENANT_ID):
+    """Win/podium probabilities of a peña projected over its pending matches"""
+    import numpy as np
+    import title_odds
+    
+    users = leaderboard_rows(tenant_id, current_season())
+    user_index = {r.id: i for i, r in enumerate(users)}
+    
+    pending = Match.query.filter_by(tenant_id=tenant_id, season=current_season(), is_finished=0)\
+        .order_by(Match.match_date.asc()).all()
+    match_index = {m.id: j for j, m in enumerate(pending)}
+    
+    shape = (len(pending), len(users))
+    pred_home = np.zeros(shape, dtype=np.int16)
+    pred_away = np.zeros(shape, dtype=np.int16)
+    has_pred = np.zeros(shape, dtype=bool)
+    if pending:
+        for user_id, match_id, home, away in db.session.query(
+                Prediction.user_id, Prediction.match_id, Prediction.home_goals, Prediction.away_goals)\
+                .filter(Prediction.tenant_id == tenant_id, Prediction.match_id.in_(list(match_index))).all():
+            i = user_index.get(user_id)
+            if i is None:
+                continue
+            j = match_index[match_id]
+            # Not clipped: a 7-0 is scored as 7-0 against the simulated scorelines
+            pred_home[j, i] = home
+            pred_away[j, i] = away
+            has_pred[j, i] = True
+    
+    result = title_odds.simulate(
+        [int(r.total_points) for r in users],
+        [r.exact_predictions for r in users],
+        pred_home, pred_away, has_pred,
+        [get_table(m.rule_set or CURRENT_RULE_SET).points for m in pending],
+        samples=samples, workers=workers, seed=seed
+    )
+    
+    odds = [
         {
             'id': r.id,
             'display_name': r.display_name,
             'total_points': int(r.total_points),
-            'exact_predictions': r.exact_predictions,
-            'total_predictions': r.total_predictions
+            'max_points': int(result['max_points'][i]),
+            'win': round(float(result['win'][i]), 4),
+            'podium': round(float(result['podium'][i]), 4)
         }
-        for r in results
+        for i, r in enumerate(users)
     ]
+    odds.sort(key=lambda u: (-u['win'], -u['podium'], -u['total_points']))
+    
+    return {
+        'generated_at': datetime.utcnow().isoformat(),
+        'method': result['method'],
+        'outcomes': result['outcomes'],
+        'pending_matches': [
+            {'id': m.id, 'team': m.team, 'opponent': m.opponent, 'match_date': m.match_date.isoformat()}
+            for m in pending
+        ],
+        'users': odds
+    }
+
+def title_odds_payload(tenant_id):
+    """
+    Cached odds for the web: in-process (no process pool inside a web worker)
+    and with TITLE_ODDS_SAMPLES samples; the CLI runs the full 200k.
+    """
+    samples = current_app.config['TITLE_ODDS_SAMPLES']
+    return cached(f'title_odds:{tenant_id}',
+                  lambda: compute_title_odds(samples=samples, workers=1, tenant_id=tenant_id))
+
+@bp.route('/api/title-odds')
+@require_auth
+@read_replica
+def get_title_odds():
+    return jsonify(title_odds_payload(current_tenant()))
+
+# ==================== MVP VOTING ====================
+
+def _mvp_category(team):
+    return 'masculino' if team == 'Athletic Club' else 'femenino'
+
+def _player_dict(p):
+    return {'id': p.id, 'name': p.name, 'dorsal': p.dorsal}
+
+def _bump_vote_count(match_id, player_id, delta):
+    """Adds delta to the (match, player) counter inside the current transaction"""
+    _increment(MvpVoteCount, 'votes', delta, match_id=match_id, player_id=player_id)
+
+def _apply_poll_totals(poll, sign):
+    """
+    Adds (sign=1) or removes (sign=-1) a closed poll's counts and frozen
+    winners from the season ranking.
+    """
+    counts = MvpVoteCount.query.filter(MvpVoteCount.match_id == poll.match_id, MvpVoteCount.votes > 0).all()
+    totals = {t.player_id: t for t in MvpPlayerTotal.query.filter(
+        MvpPlayerTotal.season == poll.season,
+        MvpPlayerTotal.player_id.in_([c.player_id for c in counts])
+    ).all()} if counts else {}
+    
+    for c in counts:
+        total = totals.get(c.player_id)
+        if total is None:
+            total = MvpPlayerTotal(season=poll.season, player_id=c.player_id, matches_won=0, total_votes=0)
+            db.session.add(total)
+        total.total_votes += sign * c.votes
+        total.matches_won += sign * c.is_winner
+
+def _freeze_winners(poll):
+    """Marks the most voted player(s) of a poll; ties share the win"""
+    counts = MvpVoteCount.query.filter_by(match_id=poll.match_id).all()
+    top = max((c.votes for c in counts), default=0)
+    for c in counts:
+        c.is_winner = 1 if top > 0 and c.votes == top else 0
+    poll.winner_votes = top if top > 0 else None
+
+def delete_mvp_data(match_id):
+    """Removes a match's poll, votes and counters (and its share of the ranking)"""
+    poll = MvpPoll.query.get(match_id)
+    if poll is None:
+        return
+    if not poll.is_open:
+        _apply_poll_totals(poll, -1)
+    MvpVote.query.filter_by(match_id=match_id).delete()
+    MvpVoteCount.query.filter_by(match_id=match_id).delete()
+    MvpEligiblePlayer.query.filter_by(match_id=match_id).delete()
+    db.session.delete(poll)
+
+@bp.route('/api/garras/players')
+@require_auth
+def get_garras_players():
+    query = GarrasPlayer.query.filter_by(active=1)
+    category = request.args.get('category')
+    if category in ('masculino', 'femenino'):
+        query = query.filter_by(category=category)
+    players = query.order_by(GarrasPlayer.category.asc(), GarrasPlayer.name.asc()).all()
+    return jsonify([
+        {'id': p.id, 'name': p.name, 'category': p.category, 'dorsal': p.dorsal, 'active': p.active}
+        for p in players
+    ])
+
+@bp.route('/api/mvp/active')
+@require_auth
+def get_mvp_active():
+    """Open polls with their candidates and the user's vote (fixed number of queries)"""
+    user_id = session['user']['id']
+    
+    matches = db.session.query(Match).join(MvpPoll, MvpPoll.match_id == Match.id)\
+        .filter(MvpPoll.is_open == 1, Match.tenant_id == current_tenant(), Match.team.in_(MVP_TEAMS))\
+        .order_by(Match.match_date.desc()).all()
+    if not matches:
+        return jsonify([])
+    match_ids = [m.id for m in matches]
+    
+    masculino = GarrasPlayer.query.filter_by(active=1, category='masculino')\
+        .order_by(GarrasPlayer.name.asc()).all()
+    
+    lineups = {}
+    for match_id, player in db.session.query(MvpEligiblePlayer.match_id, GarrasPlayer)\
+            .join(GarrasPlayer, GarrasPlayer.id == MvpEligiblePlayer.player_id)\
+            .filter(MvpEligiblePlayer.match_id.in_(match_ids))\
+            .order_by(GarrasPlayer.name.asc()).all():
+        lineups.setdefault(match_id, []).append(_player_dict(player))
+    
+    votes = {
+        vote.match_id: {'player_id': player.id, 'player_name': player.name, 'dorsal': player.dorsal}
+        for vote, player in db.session.query(MvpVote, GarrasPlayer)
+            .join(GarrasPlayer, GarrasPlayer.id == MvpVote.player_id)
+            .filter(MvpVote.user_id == user_id, MvpVote.match_id.in_(match_ids)).all()
+    }
+    
+    result = []
+    for m in matches:
+        category = _mvp_category(m.team)
+        result.append({
+            'id': m.id,
+            'team': m.team,
+            'opponent': m.opponent,
+            'is_home': m.is_home,
+            'match_date': m.match_date.isoformat(),
+            'category': category,
+            'players': [_player_dict(p) for p in masculino] if category == 'masculino' else lineups.get(m.id, []),
+            'userVote': votes.get(m.id)
+        })
+    
+    return jsonify(result)
+
+@bp.route('/api/mvp/<int:match_id>/vote', methods=['POST'])
+@require_auth
+def vote_mvp(match_id):
+    data = request.get_json()
+    player_id = data.get('player_id')
+    if not player_id:
+        return jsonify({'error': 'Falta player_id'}), 400
+    player_id = int(player_id)
+    user_id = session['user']['id']
+    
+    match = tenant_match(match_id)
+    if not match:
+        return jsonify({'error': 'Partido no encontrado'}), 404
+    
+    poll = MvpPoll.query.get(match_id)
+    if not poll or not poll.is_open:
+        return jsonify({'error': 'La votación no está abierta'}), 400
+    
+    player = GarrasPlayer.query.filter_by(id=player_id, active=1).first()
+    if not player:
+        return jsonify({'error': 'Jugador/a no válido/a'}), 400
+    
+    if match.team == 'Athletic Femenino':
+        if not MvpEligiblePlayer.query.get((match_id, player_id)):
+            return jsonify({'error': 'Jugadora no disponible para este partido'}), 400
+    
+    try:
+        existing = MvpVote.query.filter_by(match_id=match_id, user_id=user_id).first()
+        if existing:
+            if existing.player_id != player_id:
+                _bump_vote_count(match_id, existing.player_id, -1)
+                _bump_vote_count(match_id, player_id, 1)
+                existing.player_id = player_id
+        else:
+            db.session.add(MvpVote(match_id=match_id, user_id=user_id, player_id=player_id))
+            _bump_vote_count(match_id, player_id, 1)
+            poll.total_votes = MvpPoll.total_votes + 1
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Error al registrar el voto'}), 500
+    
+    return jsonify({'success': True})
+
+@bp.route('/api/mvp/history')
+@require_auth
+@read_replica
+def get_mvp_history():
+    """Last 20 closed polls with their frozen per-player counts"""
+    rows = db.session.query(Match, MvpPoll.total_votes)\
+        .join(MvpPoll, MvpPoll.match_id == Match.id)\
+        .filter(MvpPoll.is_open == 0, MvpPoll.total_votes > 0, Match.tenant_id == current_tenant(),
+                Match.team.in_(MVP_TEAMS))\
+        .order_by(Match.match_date.desc()).limit(20).all()
+    if not rows:
+        return jsonify([])
+    
+    results = {}
+    for count, player in db.session.query(MvpVoteCount, GarrasPlayer)\
+            .join(GarrasPlayer, GarrasPlayer.id == MvpVoteCount.player_id)\
+            .filter(MvpVoteCount.match_id.in_([m.id for m, _ in rows]), MvpVoteCount.votes > 0)\
+            .order_by(MvpVoteCount.votes.desc(), GarrasPlayer.name.asc()).all():
+        results.setdefault(count.match_id, []).append({
+            'id': player.id,
+            'name': player.name,
+            'dorsal': player.dorsal,
+            'votes': count.votes
+        })
+    
+    return jsonify([
+        {
+            'id': m.id,
+            'team': m.team,
+            'opponent': m.opponent,
+            'is_home': m.is_home,
+            'match_date': m.match_date.isoformat(),
+            'total_votes': total_votes,
+            'results': results.get(m.id, [])
+        }
+        for m, total_votes in rows
+    ])
+
+@bp.route('/api/mvp/ranking')
+@require_auth
+@read_replica
+def get_mvp_ranking():
+    """Season ranking by matches won, then total votes (?season=2025-26)"""
+    if current_tenant() != MVP_TENANT_ID:
+        return jsonify({'masculino': [], 'femenino': []})
+    season = request.args.get('season') or current_season()
+    rows = db.session.query(MvpPlayerTotal, GarrasPlayer)\
+        .join(GarrasPlayer, GarrasPlayer.id == MvpPlayerTotal.player_id)\
+        .filter(MvpPlayerTotal.season == season, MvpPlayerTotal.total_votes > 0)\
+        .order_by(MvpPlayerTotal.matches_won.desc(), MvpPlayerTotal.total_votes.desc(), GarrasPlayer.name.asc()).all()
+    
+    ranking = {'masculino': [], 'femenino': []}
+    for total, player in rows:
+        ranking.setdefault(player.category, []).append({
+            'id': player.id,
+            'name': player.name,
+            'category': player.category,
+            'dorsal': player.dorsal,
+            'partidos_ganados': total.matches_won,
+            'total_votes': total.total_votes
+        })
+    
+    return jsonify(ranking)
+
+@bp.route('/api/mvp/admin/matches')
+@require_admin
+def get_mvp_admin_matches():
+    rows = db.session.query(Match, MvpPoll.is_open, MvpPoll.total_votes)\
+        .outerjoin(MvpPoll, MvpPoll.match_id == Match.id)\
+        .filter(Match.tenant_id == current_tenant(), Match.team.in_(MVP_TEAMS))\
+        .order_by(Match.match_date.desc()).limit(30).all()
+    
+    return jsonify([
+        {
+            'id': m.id,
+            'team': m.team,
+            'opponent': m.opponent,
+            'is_home': m.is_home,
+            'match_date': m.match_date.isoformat(),
+            'mvp_voting_open': is_open or 0,
+            'vote_count': total_votes or 0
+        }
+        for m, is_open, total_votes in rows
+    ])
+
+@bp.route('/api/mvp/admin/<int:match_id>/open', methods=['PUT'])
+@require_admin
+def open_mvp_voting(match_id):
+    data = request.get_json(silent=True) or {}
+    match = tenant_match(match_id)
+    if not match:
+        return jsonify({'error': 'Partido no encontrado'}), 404
+    if match.tenant_id != MVP_TENANT_ID:
+        return jsonify({'error': 'Las votaciones MVP son solo de la Peña Garras'}), 400
+    
+    try:
+        if match.team == 'Athletic Femenino':
+            player_ids = data.get('player_ids')
+            if not isinstance(player_ids, list) or not player_ids:
+                return jsonify({'error': 'Selecciona al menos una jugadora'}), 400
+            parsed_ids = []
+            for pid in player_ids:
+                try:
+                    parsed_ids.append(int(pid))
+                except (TypeError, ValueError):
+                    pass
+            if not parsed_ids:
+                return jsonify({'error': 'IDs de jugadoras inválidos'}), 400
+            valid = GarrasPlayer.query.filter(GarrasPlayer.id.in_(parsed_ids),
+                                              GarrasPlayer.category == 'femenino',
+                                              GarrasPlayer.active == 1).count()
+            if valid != len(set(parsed_ids)):
+                return jsonify({'error': 'Una o más jugadoras no son válidas o no pertenecen al equipo femenino'}), 400
+            MvpEligiblePlayer.query.filter_by(match_id=match_id).delete()
+            for pid in set(parsed_ids):
+                db.session.add(MvpEligiblePlayer(match_id=match_id, player_id=pid))
+        
+        poll = MvpPoll.query.get(match_id)
+        if poll is None:
+            db.session.add(MvpPoll(match_id=match_id, season=match.season, is_open=1))
+        elif not poll.is_open:
+            # Reopening: take the frozen result back out of the season ranking
+            _apply_poll_totals(poll, -1)
+            MvpVoteCount.query.filter_by(match_id=match_id).update({MvpVoteCount.is_winner: 0})
+            poll.is_open = 1
+            poll.winner_votes = None
+            poll.closed_at = None
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('Error opening MVP poll %s', match_id)
+        return jsonify({'error': 'Error al abrir la votación'}), 500
+    
+    return jsonify({'success': True})
+
+@bp.route('/api/mvp/admin/<int:match_id>/close', methods=['PUT'])
+@require_admin
+def close_mvp_voting(match_id):
+    poll = MvpPoll.query.get(match_id) if tenant_match(match_id) else None
+    if poll and poll.is_open:
+        try:
+            _freeze_winners(poll)
+            _apply_poll_totals(poll, 1)
+            poll.is_open = 0
+            poll.closed_at = datetime.utcnow()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception('Error closing MVP poll %s', match_id)
+            return jsonify({'error': 'Error al cerrar la votación'}), 500
     
-    return jsonify(leaderboard)
+    return jsonify({'success': True})
+
+@bp.route('/api/mvp/admin/<int:match_id>/votes', methods=['DELETE'])
+@require_admin
+def reset_mvp_votes(match_id):
+    """Delete all votes of a match (admin)"""
+    if not tenant_match(match_id):
+        return jsonify({'error': 'Partido no encontrado'}), 404
+    
+    try:
+        poll = MvpPoll.query.get(match_id)
+        if poll and not poll.is_open:
+            _apply_poll_totals(poll, -1)
+            poll.winner_votes = None
+        deleted = MvpVote.query.filter_by(match_id=match_id).delete()
+        MvpVoteCount.query.filter_by(match_id=match_id).delete()
+        if poll:
+            poll.total_votes = 0
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('Error resetting MVP votes of match %s', match_id)
+        return jsonify({'error': 'Error al borrar los votos'}), 500
+    
+    return jsonify({'success': True, 'deleted': deleted})
+
+# ==================== ADMIN EXPORTS ====================
+
+EXPORT_BATCH = 1000
+
+def _season_filter(stmt, M, season):
+    return stmt.where(M.season == season) if season else stmt
+
+def _stream_rows(stmt):
+    """Rows from a server-side cursor, fetched EXPORT_BATCH at a time"""
+    result = db.session.execute(stmt.execution_options(yield_per=EXPORT_BATCH))
+    for row in result:
+        yield tuple(row)
+
+def _export_response(name, sheet, header, rows):
+    from exports import csv_stream, xlsx_stream
+    
+    fmt = request.args.get('format', 'csv')
+    stamp = datetime.now().strftime('%Y-%m-%d')
+    if fmt == 'xlsx':
+        body = xlsx_stream(sheet, header, rows)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        fmt = 'csv'
+        body = csv_stream(header, rows)
+        mimetype = 'text/csv'
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="bolilla-garras-{name}-{stamp}.{fmt}"',
+        'X-Accel-Buffering': 'no'
+    })
+
+@bp.route('/api/admin/export/predictions')
+@require_admin
+@read_replica
+def export_predictions():
+    """All predictions with user and match (?format=csv|xlsx, ?season=2025-26)"""
+    season = request.args.get('season')
+    M, P = season_models(season)
+    stmt = select(
+        M.match_date, M.team, M.opponent, M.is_home,
+        M.home_goals, M.away_goals,
+        User.username, User.display_name,
+        P.home_goals, P.away_goals, P.points, P.created_at
+    ).join(M, M.id == P.match_id)\
+     .join(User, User.id == P.user_id)\
+     .where(M.tenant_id == current_tenant())\
+     .order_by(M.match_date.asc(), M.id.asc(), User.display_name.asc())
+    
+    header = ['Fecha', 'Equipo', 'Rival', 'Local', 'Goles equipo real', 'Goles rival real',
+              'Usuario', 'Nombre', 'Pronóstico local', 'Pronóstico visitante', 'Puntos', 'Enviado']
+    rows = _stream_rows(_season_filter(stmt, M, season))
+    return _export_response('pronosticos', 'Pronósticos', header, rows)
+
+@bp.route('/api/admin/export/standings')
+@require_admin
+@read_replica
+def export_standings():
+    """Final standings (?format=csv|xlsx, ?season=2025-26)"""
+    season = request.args.get('season')
+    M, P = season_models(season)
+    tenant_id = current_tenant()
+    scored = select(P.user_id, P.points).join(M, M.id == P.match_id).where(M.tenant_id == tenant_id)
+    scored = _season_filter(scored, M, season).subquery()
+    
+    points = func.coalesce(func.sum(scored.c.points), 0).label('total_points')
+    exact = func.count(case((scored.c.points == 5, 1))).label('exact_predictions')
+    stmt = select(
+        User.username, User.display_name, points, exact,
+        func.count(scored.c.points).label('total_predictions')
+    ).select_from(User)\
+     .outerjoin(scored, scored.c.user_id == User.id)\
+     .where(User.tenant_id == tenant_id)\
+     .group_by(User.id).order_by(desc('total_points'), desc('exact_predictions'))
+    
+    def ranked(rows):
+        previous, rank = None, 0
+        for position, (username, display_name, total, exact_hits, played) in enumerate(rows, start=1):
+            if (total, exact_hits) != previous:
+                rank, previous = position, (total, exact_hits)
+            yield (rank, display_name, username, int(total), exact_hits, played)
+    
+    header = ['Pos', 'Nombre', 'Usuario', 'Puntos', 'Plenos', 'Pronósticos puntuados']
+    return _export_response('clasificacion', 'Clasificación', header, ranked(_stream_rows(stmt)))
+
+# ==================== ADMIN PROFILING ====================
+
+@bp.route('/api/admin/profiles')
+@require_instance_admin
+def list_profiles():
+    """List stored request profiles, newest first (admin only)"""
+    return jsonify({
+        'enabled': request_profiler.enabled,
+        'profiles': request_profiler.list_profiles()
+    })
+
+@bp.route('/api/admin/profiles/<name>')
+@require_instance_admin
+def download_profile(name):
+    """Download a stored profile; ?format=text renders cProfile stats"""
+    path = request_profiler.resolve(name)
+    if not path:
+        return jsonify({'error': 'Perfil no encontrado'}), 404
+    
+    if request.args.get('format') == 'text':
+        text = request_profiler.render_text(name)
+        if text is None:
+            return jsonify({'error': 'Solo disponible para perfiles cProfile'}), 400
+        return Response(text, mimetype='text/plain')
+    
+    return send_file(path, as_attachment=True, download_name=name)
 
 # ==================== STATIC FILES ====================
 
-@app.route('/')
+@bp.route('/')
 def index():
     return send_from_directory('public', 'index.html')
 
-@app.route('/<path:path>')
+@bp.route('/<path:path>')
 def static_files(path):
     return send_from_directory('public', path)
 
+# ==================== APP FACTORY ====================
+
+def create_app(config=None):
+    """
+    Builds the Flask app. Cheap: database engines are created on first use
+    and the schema is not touched (run `flask --app app init-db` on deploy).
+    """
+    app = Flask(__name__, static_folder='public', static_url_path='')
+    app.secret_key = os.environ.get('SECRET_KEY', 'bolilla-garras-dev-key-change-in-prod')
+    
+    # Database Config
+    # Vercel provides DATABASE_URL, local uses sqlite
+    db_url = os.environ.get('DATABASE_URL')
+    if not db_url:
+        # Local SQLite
+        db_path = os.path.join(os.path.dirname(__file__), 'bolilla.db')
+        app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    else:
+        # Fix postgres:// to postgresql:// if needed (Render/Vercel legacy)
+        app.config['SQLALCHEMY_DATABASE_URI'] = db_url.replace('postgres://', 'postgresql://')
+    
+    # Optional read replica for GET endpoints (see db_routing.py)
+    db_read_url = os.environ.get('DATABASE_READ_URL')
+    if db_read_url:
+        app.config['SQLALCHEMY_BINDS'] = {REPLICA_BIND: db_read_url.replace('postgres://', 'postgresql://')}
+    app.config['READ_YOUR_WRITES_SECONDS'] = int(os.environ.get('READ_YOUR_WRITES_SECONDS', 10))
+    # How long a write's first response is replayed to retries with its Idempotency-Key
+    app.config['IDEMPOTENCY_TTL_SECONDS'] = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 3600))
+    # Monte Carlo samples when /api/title-odds recomputes the odds in a request
+    app.config['TITLE_ODDS_SAMPLES'] = int(os.environ.get('TITLE_ODDS_SAMPLES', 20_000))
+    
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.update(config or {})
+    
+    db.init_app(app)
+    cache.init_app(app)
+    query_inspector.init_app(app)
+    request_profiler.init_app(app, is_allowed=is_instance_admin)
+    compressor.init_app(app)
+    deadline_scheduler.init_app(
+        app, db=db, lease_model=SchedulerLease,
+        next_deadline=next_deadline_after, close_due=close_due_matches, warm=warm_caches
+    )
+    reminder_queue.init_app(app, db=db, job_model=ReminderJob, describe=describe_reminders)
+    audit_log.init_app(app, db=db, model=AuditEvent)
+    app.register_blueprint(bp)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(reminders_command)
+    return app
+
+_default_app = None
+
+def get_app():
+    """Default app (gunicorn `app:app`, import scripts), built once per process"""
+    global _default_app
+    if _default_app is None:
+        _default_app = create_app()
+    return _default_app
+
+def __getattr__(name):
+    if name == 'app':
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # ==================== MAIN ====================
 
 if __name__ == '__main__':
-    init_db()
+    app = create_app()
+    with app.app_context():
+        init_db()
     print('''
 ╔═══════════════════════════════════════════════════════════╗
 ║                   🦁 BOLILLA GARRAS 🦁                    ║
@@ -0,0 +1,164 @@
+"""
+Write-behind audit log of admin and prediction actions.
+
+Request handlers call ``audit.record(...)``, which only appends the event
+to an in-process buffer: no database round trip on the write path. A
+daemon thread inserts the buffer in bulk every AUDIT_FLUSH_SECONDS, or
+sooner once AUDIT_BATCH_SIZE events are waiting.
+
+Nothing is lost when the database is unavailable: a failed flush keeps
+the events buffered (up to AUDIT_MAX_BUFFER), and at interpreter exit
+whatever cannot be inserted is appended to the AUDIT_SPOOL file as JSON
+lines. The next flush of any worker replays the spool.
+
+Disable with AUDIT_ENABLED=0 (events are dropped).
+"""
+import atexit
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+
+class AuditLog:
+    def __init__(self, app=None, **kwargs):
+        self.app = None
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        if app is not None:
+            self.init_app(app, **kwargs)
+
+    def init_app(self, app, db, model):
+        """model: table with the event columns (created_at, action, ...) and an autoincrement id"""
+        self.app = app
+        self.db = db
+        self.model = model
+        app.config.setdefault('AUDIT_ENABLED', os.environ.get('AUDIT_ENABLED', '1') == '1')
+        app.config.setdefault('AUDIT_FLUSH_SECONDS', float(os.environ.get('AUDIT_FLUSH_SECONDS', 5)))
+        app.config.setdefault('AUDIT_BATCH_SIZE', int(os.environ.get('AUDIT_BATCH_SIZE', 200)))
+        app.config.setdefault('AUDIT_MAX_BUFFER', int(os.environ.get('AUDIT_MAX_BUFFER', 10000)))
+        app.config.setdefault('AUDIT_SPOOL', os.environ.get('AUDIT_SPOOL') or
+                              os.path.join(app.root_path, 'audit-spool.jsonl'))
+        atexit.register(self.shutdown)
+
+    @property
+    def enabled(self):
+        return self.app is not None and self.app.config['AUDIT_ENABLED']
+
+    @property
+    def pending(self):
+        return len(self._buffer)
+
+    def record(self, action, **fields):
+        """Buffers one event; fields are model columns (actor_id, target_type, details...)."""
+        if not self.enabled:
+            return
+        event = dict(fields, action=action, created_at=datetime.utcnow())
+        with self._lock:
+            self._buffer.append(event)
+            size = len(self._buffer)
+        # Started lazily so the thread runs in each worker after gunicorn forks
+        self.start()
+        if size >= self.app.config['AUDIT_BATCH_SIZE']:
+            self._wake.set()
+
+    # ---------- flushing ----------
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='audit-log', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.app.config['AUDIT_FLUSH_SECONDS'])
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.app.logger.exception('Audit log flush error: %s', e)
+
+    def _take(self):
+        with self._lock:
+            events = list(self._buffer)
+            self._buffer.clear()
+        return events
+
+    def _requeue(self, events):
+        """Puts back events whose insert failed, oldest first; overflow goes to the spool."""
+        with self._lock:
+            self._buffer.extendleft(reversed(events))
+            overflow = len(self._buffer) - self.app.config['AUDIT_MAX_BUFFER']
+            dropped = [self._buffer.popleft() for _ in range(max(overflow, 0))]
+        if dropped:
+            self._spool(dropped)
+
+    def _insert(self, events):
+        with self.app.app_context():
+            try:
+                self.db.session.execute(self.model.__table__.insert(), events)
+                self.db.session.commit()
+            except Exception:
+                self.db.session.rollback()
+                raise
+
+    def flush(self):
+        """Inserts the buffered (and spooled) events in one bulk insert; returns how many."""
+        with self._flush_lock:
+            events = self._read_spool() + self._take()
+            if not events:
+                return 0
+            try:
+                self._insert(events)
+            except Exception:
+                self._requeue(events)
+                raise
+            return len(events)
+
+    def shutdown(self):
+        """Last flush at exit; what cannot be inserted is spooled to disk."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if not self._buffer:
+            return
+        try:
+            self.flush()
+        except Exception:
+            self._spool(self._take())
+
+    # ---------- spool file ----------
+
+    def _spool(self, events):
+        with open(self.app.config['AUDIT_SPOOL'], 'a', encoding='utf-8') as f:
+            for event in events:
+                f.write(json.dumps(dict(event, created_at=event['created_at'].isoformat()),
+                                   ensure_ascii=False) + '\n')
+
+    def _read_spool(self):
+        """Claims the spool file (rename is atomic, one worker wins) and loads its events."""
+        path = self.app.config['AUDIT_SPOOL']
+        if not os.path.exists(path):
+            return []
+        claimed = f'{path}.{os.getpid()}'
+        try:
+            os.replace(path, claimed)
+        except OSError:
+            return []
+        with open(claimed, encoding='utf-8') as f:
+            events = [json.loads(line) for line in f if line.strip()]
+        os.unlink(claimed)
+        for event in events:
+            event['created_at'] = datetime.fromisoformat(event['created_at'])
+        return events
@@ -0,0 +1,370 @@
+"""
+Cache for derived API payloads (leaderboard, upcoming matches, title
+odds...). Entries live until explicitly invalidated by the write paths that
+change their data, and at most CACHE_TTL seconds. Keys are ':'-separated ('leaderboard:3:2025-26') and
+delete_prefix() takes a prefix ending in ':'.
+
+Backends (CACHE_URL):
+  - memory (default): a dict per process. Each gunicorn worker keeps its
+    own copy and only sees its own invalidations: fine for one worker;
+    with several, another worker's copy can be CACHE_TTL seconds stale.
+  - redis://host:6379/0: shared by every worker and instance. Needs the
+    ``redis`` package; ``fakeredis`` works for local testing.
+
+The Redis backend:
+  - versioned keys: an entry is stored under its key plus the generation
+    of the key and of each of its prefixes. Deleting a key or a prefix
+    increments a generation (O(1), no SCAN), so a payload computed from
+    data read before the invalidation can never be stored as current.
+    Orphaned entries expire after CACHE_TTL seconds.
+  - pub/sub invalidation: each worker keeps hot entries in memory
+    (CACHE_LOCAL=1) and drops them when any worker publishes an
+    invalidation.
+  - single flight: on a miss, one worker (and one thread per worker)
+    computes the entry under a short Redis lock while the others wait for
+    it, instead of all of them querying the database at once.
+
+If Redis is unreachable, get_or_set computes the value without caching,
+get misses, set does nothing and invalidations only drop this worker's
+local copy (logged: other workers keep theirs until Redis is back).
+"""
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+_STRIPES = 64
+
+
+class _KeyLocks:
+    """Striped per-key locks: one thread per key computes a missing entry."""
+
+    def __init__(self):
+        self._locks = [threading.Lock() for _ in range(_STRIPES)]
+
+    def __call__(self, key):
+        return self._locks[hash(key) % _STRIPES]
+
+
+class LocalCache:
+    def __init__(self, ttl=None):
+        self.ttl = ttl  # Seconds; None keeps entries until invalidated
+        self._data = {}  # key -> (value, monotonic expiry or None)
+        self._lock = threading.Lock()
+        self._key_locks = _KeyLocks()
+        self._epoch = 0  # Bumped by every invalidation
+
+    def _lookup(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            with self._lock:
+                if self._data.get(key) is entry:
+                    del self._data[key]
+            return None
+        return value
+
+    def _entry(self, value):
+        return value, (time.monotonic() + self.ttl if self.ttl else None)
+
+    def store(self, key, value, epoch):
+        """Stores value unless the cache was invalidated since ``epoch``: it may predate the change."""
+        with self._lock:
+            if epoch == self._epoch:
+                self._data[key] = self._entry(value)
+
+    def get(self, key, default=None):
+        value = self._lookup(key)
+        return default if value is None else value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = self._entry(value)
+
+    def delete(self, *keys):
+        with self._lock:
+            self._epoch += 1
+            for key in keys:
+                self._data.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            self._epoch += 1
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._data.clear()
+
+    def get_or_set(self, key, compute):
+        """Cached value for key, computing and storing it on a miss (once per key at a time)."""
+        value = self._lookup(key)
+        if value is not None:
+            return value
+        with self._key_locks(key):
+            value = self._lookup(key)
+            if value is None:
+                epoch = self._epoch
+                value = compute()
+                self.store(key, value, epoch)
+        return value
+
+
+class RedisCache:
+    def __init__(self, url=None, client=None, namespace='bolilla', ttl=86400, local=True,
+                 lock_seconds=30, wait_seconds=10, poll_seconds=0.05):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ns = f'{namespace}:cache'
+        self.ttl = ttl
+        self.lock_ms = int(lock_seconds * 1000)
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+        self.channel = f'{self.ns}:invalidate'
+        self.local = LocalCache(ttl) if local else None
+        self._key_locks = _KeyLocks()
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    # ---------- versioned keys ----------
+
+    @staticmethod
+    def _scopes(key):
+        """'' (everything), each ':'-prefix of key, and key itself."""
+        parts = key.split(':')
+        return [''] + [':'.join(parts[:i]) + ':' for i in range(1, len(parts))] + [key]
+
+    def _generation_key(self, scope):
+        return f'{self.ns}:gen:{scope}'
+
+    def _physical(self, key):
+        generations = self.client.mget([self._generation_key(s) for s in self._scopes(key)])
+        return f'{self.ns}:val:{key}#' + '.'.join(g.decode() if g else '0' for g in generations)
+
+    def _invalidate(self, scopes, message):
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for scope in scopes:
+                pipe.incr(self._generation_key(scope))
+            if self.local is not None:
+                pipe.publish(self.channel, json.dumps(message))
+            pipe.execute()
+        except Exception as e:
+            # The caller's write is committed: don't fail it over the cache
+            logger.error('Cache invalidation %s not published: %s', message, e)
+
+    # ---------- local copy, kept coherent via pub/sub ----------
+
+    def _drop_local(self, message):
+        if message['op'] == 'keys':
+            self.local.delete(*message['keys'])
+        elif message['op'] == 'prefix':
+            self.local.delete_prefix(message['prefix'])
+        else:
+            self.local.clear()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Invalidations published while not subscribed are lost
+                self.local.clear()
+                for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        self._drop_local(json.loads(message['data']))
+            except Exception as e:
+                logger.warning('Cache invalidation listener error: %s', e)
+                self.local.clear()
+                time.sleep(1)
+
+    def _ensure_listener(self):
+        """Started lazily so the thread runs in each worker after gunicorn forks."""
+        if self._listener is not None and self._listener.is_alive():
+            return
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='cache-invalidation', daemon=True)
+                self._listener.start()
+
+    def _local_get(self, key):
+        if self.local is None:
+            return None
+        self._ensure_listener()
+        return self.local.get(key)
+
+    def _local_set(self, key, value, epoch):
+        if self.local is not None:
+            self.local.store(key, value, epoch)
+
+    def _epoch(self):
+        return self.local._epoch if self.local is not None else 0
+
+    # ---------- cache API ----------
+
+    def get(self, key, default=None):
+        value = self._local_get(key)
+        if value is not None:
+            return value
+        epoch = self._epoch()
+        try:
+            raw = self.client.get(self._physical(key))
+        except Exception as e:
+            logger.warning('Cache unavailable, %s missed: %s', key, e)
+            return default
+        if raw is None:
+            return default
+        value = pickle.loads(raw)
+        self._local_set(key, value, epoch)
+        return value
+
+    def set(self, key, value):
+        epoch = self._epoch()
+        try:
+            self.client.set(self._physical(key), pickle.dumps(value), ex=self.ttl)
+        except Exception as e:
+            logger.warning('Cache unavailable, %s not stored: %s', key, e)
+            return
+        self._local_set(key, value, epoch)
+
+    def delete(self, *keys):
+        if not keys:
+            return
+        if self.local is not None:
+            self.local.delete(*keys)
+        self._invalidate(keys, {'op': 'keys', 'keys': list(keys)})
+
+    def delete_prefix(self, prefix):
+        if not prefix.endswith(':'):
+            raise ValueError(f'Cache prefixes end with ":": {prefix!r}')
+        if self.local is not None:
+            self.local.delete_prefix(prefix)
+        self._invalidate([prefix], {'op': 'prefix', 'prefix': prefix})
+
+    def clear(self):
+        if self.local is not None:
+            self.local.clear()
+        self._invalidate([''], {'op': 'clear'})
+
+    def get_or_set(self, key, compute):
+        """Cached value for key; on a miss one worker computes it while the others wait."""
+        value = self._local_get(key)
+        if value is not None:
+            return value
+        with self._key_locks(key):
+            value = self._local_get(key)
+            if value is not None:
+                return value
+            epoch = self._epoch()
+            try:
+                physical = self._physical(key)
+                raw = self.client.get(physical)
+            except Exception as e:
+                logger.warning('Cache unavailable, computing %s: %s', key, e)
+                return compute()
+            if raw is not None:
+                value = pickle.loads(raw)
+            else:
+                value = self._fill(physical, compute)
+            self._local_set(key, value, epoch)
+            return value
+
+    def _release(self, lock, token):
+        """Deletes the single-flight lock only if this worker still holds it (WATCH/MULTI, no Lua)."""
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(lock)
+                if pipe.get(lock) == token.encode():
+                    pipe.multi()
+                    pipe.delete(lock)
+                    pipe.execute()
+            except Exception as e:  # WatchError: it expired and someone else took it
+                logger.debug('Cache lock %s not released: %s', lock, e)
+
+    def _fill(self, physical, compute):
+        lock = f'{physical}:lock'
+        token = uuid.uuid4().hex
+        give_up = time.monotonic() + self.wait_seconds
+        while True:
+            try:
+                acquired = self.client.set(lock, token, nx=True, px=self.lock_ms)
+            except Exception as e:
+                logger.warning('Cache unavailable, computing %s: %s', physical, e)
+                return compute()
+            if acquired:
+                try:
+                    value = compute()
+                    try:
+                        self.client.set(physical, pickle.dumps(value), ex=self.ttl)
+                    except Exception as e:
+                        logger.warning('Cache unavailable, %s not stored: %s', physical, e)
+                    return value
+                finally:
+                    self._release(lock, token)
+            time.sleep(self.poll_seconds)
+            try:
+                raw = self.client.get(physical)
+            except Exception as e:
+                logger.warning('Cache unavailable, computing %s: %s', physical, e)
+                return compute()
+            if raw is not None:
+                return pickle.loads(raw)
+            if time.monotonic() > give_up:
+                # The holder is slow or died with the lock: don't wait any longer
+                return compute()
+
+
+class Cache:
+    """The app's cache: a LocalCache until init_app picks the configured backend."""
+
+    def __init__(self, app=None):
+        self.backend = LocalCache()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_URL', os.environ.get('CACHE_URL', 'memory'))
+        app.config.setdefault('CACHE_TTL', int(os.environ.get('CACHE_TTL', 86400)))
+        app.config.setdefault('CACHE_LOCAL', os.environ.get('CACHE_LOCAL', '1') == '1')
+        app.config.setdefault('CACHE_LOCK_SECONDS', int(os.environ.get('CACHE_LOCK_SECONDS', 30)))
+        app.config.setdefault('CACHE_NAMESPACE', os.environ.get('CACHE_NAMESPACE', 'bolilla'))
+        url = app.config['CACHE_URL']
+        if not url or url == 'memory':
+            self.backend = LocalCache(app.config['CACHE_TTL'])
+        else:
+            self.backend = RedisCache(
+                url, namespace=app.config['CACHE_NAMESPACE'], ttl=app.config['CACHE_TTL'],
+                local=app.config['CACHE_LOCAL'], lock_seconds=app.config['CACHE_LOCK_SECONDS']
+            )
+
+    def get(self, key, default=None):
+        return self.backend.get(key, default)
+
+    def set(self, key, value):
+        self.backend.set(key, value)
+
+    def delete(self, *keys):
+        self.backend.delete(*keys)
+
+    def delete_prefix(self, prefix):
+        self.backend.delete_prefix(prefix)
+
+    def clear(self):
+        self.backend.clear()
+
+    def get_or_set(self, key, compute):
+        return self.backend.get_or_set(key, compute)
+
+
+cache = Cache()
@@ -0,0 +1,119 @@
+"""
+Negotiated gzip / brotli compression of API responses.
+
+A response is compressed when the client accepts it (Accept-Encoding), the
+body is at least COMPRESS_MIN_SIZE bytes and its mimetype is compressible
+(JSON, text, JS, SVG). Streamed and passthrough responses (exports, static
+files) and responses that already carry a Content-Encoding are left alone.
+
+Compressed bodies are kept in a small LRU keyed by (encoding, body digest).
+A payload served from the app cache (leaderboard, match views, title odds)
+produces the same bytes until its data changes, so it is compressed once
+per data version and served from memory afterwards.
+
+Brotli needs the optional ``brotli`` package; without it only gzip is
+offered. Disable everything with COMPRESS_ENABLED=0.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+COMPRESSIBLE = {
+    'application/json',
+    'application/javascript',
+    'application/manifest+json',
+    'application/xml',
+    'image/svg+xml',
+}
+
+
+def _is_compressible(mimetype):
+    return bool(mimetype) and (mimetype in COMPRESSIBLE or mimetype.startswith('text/'))
+
+
+class Compressor:
+    """Flask extension that compresses eligible responses after each request."""
+
+    def __init__(self, app=None):
+        self.min_size = 500
+        self.level = 6
+        self.br_level = 5
+        self.cache_size = 256
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_ENABLED', os.environ.get('COMPRESS_ENABLED', '1') == '1')
+        app.config.setdefault('COMPRESS_MIN_SIZE', int(os.environ.get('COMPRESS_MIN_SIZE', 500)))
+        app.config.setdefault('COMPRESS_LEVEL', int(os.environ.get('COMPRESS_LEVEL', 6)))
+        app.config.setdefault('COMPRESS_BR_LEVEL', int(os.environ.get('COMPRESS_BR_LEVEL', 5)))
+        app.config.setdefault('COMPRESS_CACHE_SIZE', int(os.environ.get('COMPRESS_CACHE_SIZE', 256)))
+        if not app.config['COMPRESS_ENABLED']:
+            return
+
+        self.min_size = app.config['COMPRESS_MIN_SIZE']
+        self.level = app.config['COMPRESS_LEVEL']
+        self.br_level = app.config['COMPRESS_BR_LEVEL']
+        self.cache_size = app.config['COMPRESS_CACHE_SIZE']
+        app.after_request(self._after_request)
+
+    @property
+    def encodings(self):
+        """Offered encodings, preferred first."""
+        return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def _after_request(self, response):
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers
+                or not _is_compressible(response.mimetype)):
+            return response
+
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+
+        response.set_data(self.compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def compress(self, body, encoding):
+        """Compressed bytes of body, from the LRU when the same body was seen before."""
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return data
+
+        if encoding == 'br':
+            data = brotli.compress(body, quality=self.br_level)
+        else:
+            data = gzip.compress(body, compresslevel=self.level, mtime=0)
+
+        with self._lock:
+            self.misses += 1
+            if self.cache_size > 0:
+                self._cache[key] = data
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return data
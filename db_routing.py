@@ -0,0 +1,105 @@
+"""
+Optional read-replica routing.
+
+When DATABASE_READ_URL is set, app.py registers it as the 'replica' bind.
+Endpoints decorated with ``@read_replica`` run their SELECTs against it.
+Writes, flushes and raw SQL always go to the primary.
+
+Shared caches are always filled from the primary (``use_primary``).
+
+Read-your-writes: after a user writes (``mark_write()``), their requests
+stay on the primary for READ_YOUR_WRITES_SECONDS. That hides replication
+lag right after e.g. saving a prediction.
+
+Local test: copy bolilla.db to bolilla_replica.db and set
+    DATABASE_URL=sqlite:////abs/path/bolilla.db
+    DATABASE_READ_URL=sqlite:////abs/path/bolilla_replica.db
+
+Engines (primary and replica) are created on first use, not in init_app
+(``LazySQLAlchemy``), so starting a worker does not load DB drivers.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from weakref import WeakKeyDictionary
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND = 'replica'
+
+
+class LazySQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy that builds each bind's engine the first time it is needed."""
+
+    def __init__(self, *args, **kwargs):
+        self._deferred = WeakKeyDictionary()
+        self._engine_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def _make_engine(self, bind_key, options, app):
+        self._deferred.setdefault(app, {})[bind_key] = options
+        return None
+
+    @property
+    def engines(self):
+        engines = super().engines
+        if None in engines.values():
+            app = current_app._get_current_object()
+            with self._engine_lock:
+                for key, engine in engines.items():
+                    if engine is None:
+                        engines[key] = super()._make_engine(key, self._deferred[app][key], app)
+        return engines
+
+
+def _wants_replica():
+    if not has_request_context() or not g.get('read_replica'):
+        return False
+    return session.get('rw_until', 0) <= time.time()
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends reads of flagged requests to the replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _wants_replica() \
+                and (clause is None or getattr(clause, 'is_select', False)):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_replica(f):
+    """Route this endpoint's reads to the replica (if one is configured)."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        g.read_replica = True
+        return f(*args, **kwargs)
+    return decorated
+
+
+@contextmanager
+def use_primary():
+    """
+    Read from the primary inside the block. Used when filling shared caches,
+    so a lagging replica never gets cached until the next invalidation.
+    """
+    if not has_request_context():
+        yield
+        return
+    previous = g.get('read_replica')
+    g.read_replica = False
+    try:
+        yield
+    finally:
+        g.read_replica = previous
+
+
+def mark_write():
+    """Keep the current user on the primary for a while after a write."""
+    seconds = current_app.config.get('READ_YOUR_WRITES_SECONDS', 10)
+    session['rw_until'] = time.time() + seconds
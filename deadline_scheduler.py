@@ -0,0 +1,138 @@
+"""
+In-process scheduler that acts when match deadlines pass.
+
+Enable with DEADLINE_SCHEDULER=1. Every worker runs a daemon thread that
+sleeps until the next deadline (or POLL_SECONDS, to notice new matches):
+
+  - close_due: closes matches whose deadline passed and precomputes their
+    post-deadline views. Runs in exactly one worker at a time, guarded by
+    a DB-backed lease, so it is safe with several gunicorn workers.
+  - warm: refills this worker's local caches right after a deadline,
+    before the post-kickoff traffic spike. Runs in every worker.
+"""
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+
+class DbLease:
+    """
+    Named lease stored in a table with (name, owner, expires_at) columns.
+    Acquire/renew is a single conditional UPDATE (or INSERT the first time),
+    which is atomic on both SQLite and Postgres.
+    """
+
+    def __init__(self, db, model, name, ttl_seconds=120):
+        self.db = db
+        self.model = model
+        self.name = name
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.owner = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+
+    def acquire(self):
+        model = self.model
+        now = datetime.utcnow()
+        try:
+            updated = model.query.filter(
+                model.name == self.name,
+                (model.owner == self.owner) | (model.expires_at < now)
+            ).update({model.owner: self.owner, model.expires_at: now + self.ttl},
+                     synchronize_session=False)
+            if not updated:
+                self.db.session.add(model(name=self.name, owner=self.owner, expires_at=now + self.ttl))
+            self.db.session.commit()
+            return True
+        except IntegrityError:
+            # Another worker holds it (or inserted it first)
+            self.db.session.rollback()
+            return False
+
+    def release(self):
+        model = self.model
+        model.query.filter_by(name=self.name, owner=self.owner)\
+            .update({model.expires_at: datetime.utcnow()}, synchronize_session=False)
+        self.db.session.commit()
+
+
+class DeadlineScheduler:
+    POLL_SECONDS = 60
+
+    def __init__(self, app=None, **kwargs):
+        self.app = None
+        self._thread = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, **kwargs)
+
+    def init_app(self, app, db, lease_model, next_deadline, close_due, warm):
+        """
+        next_deadline(after) -> datetime | None: next deadline later than ``after``
+        close_due(now) -> int: close matches due at ``now`` (leader only)
+        warm() -> None: refill this worker's caches
+        """
+        self.app = app
+        self.lease = DbLease(db, lease_model, 'deadline-scheduler')
+        self.next_deadline = next_deadline
+        self.close_due = close_due
+        self.warm = warm
+        app.config.setdefault('DEADLINE_SCHEDULER', os.environ.get('DEADLINE_SCHEDULER') == '1')
+        if app.config['DEADLINE_SCHEDULER']:
+            # Started lazily on the first request so it runs after gunicorn forks
+            app.before_request(self.start)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        with self._start_lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='deadline-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def wake(self):
+        """Re-read the next deadline now (e.g. after a match is created or edited)."""
+        self._wake.set()
+
+    def tick(self, now=None, warm_due=False):
+        """One scheduler pass; returns the next deadline, if any."""
+        now = now or datetime.now()
+        if self.lease.acquire():
+            closed = self.close_due(now)
+            if closed:
+                self.app.logger.info('Deadline scheduler: %d match(es) closed', closed)
+        if warm_due:
+            self.warm()
+        return self.next_deadline(now)
+
+    def _run(self):
+        upcoming = None
+        while not self._stop.is_set():
+            now = datetime.now()
+            try:
+                with self.app.app_context():
+                    upcoming = self.tick(now, warm_due=upcoming is not None and now >= upcoming)
+            except Exception as e:
+                self.app.logger.exception('Deadline scheduler error: %s', e)
+                upcoming = None
+
+            timeout = self.POLL_SECONDS
+            if upcoming is not None:
+                timeout = min(timeout, max((upcoming - datetime.now()).total_seconds(), 0) + 0.5)
+            self._wake.wait(timeout)
+            self._wake.clear()
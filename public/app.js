@@ -136,13 +136,24 @@ const tabContents = document.querySelectorAll('.tab-content');
 const authTabs = document.querySelectorAll('.auth-tab');
 
 // ==================== FETCH WITH RETRY (for cold starts) ====================
+function newIdempotencyKey() {
+  if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}${Math.random().toString(36).slice(2)}`;
+}
+
 async function fetchWithRetry(url, options = {}, retries = 3, delay = 1000) {
   // Get JWT token from sessionStorage
   const token = sessionStorage.getItem('bolilla_token') || '';
 
-  // Merge headers: Authorization + caller's headers
+  // Writes carry one Idempotency-Key for all their attempts: the server runs
+  // them once and answers retries with the stored first response
+  const method = (options.method || 'GET').toUpperCase();
+  const idempotencyKey = method !== 'GET' && method !== 'HEAD' ? newIdempotencyKey() : null;
+
+  // Merge headers: Authorization + Idempotency-Key + caller's headers
   const mergedHeaders = {
     ...(token ? { 'Authorization': `Bearer ${token}` } : {}),
+    ...(idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {}),
     ...(options.headers || {})
   };
   const mergedOptions = { ...options, headers: mergedHeaders };
@@ -181,18 +192,12 @@ async function fetchWithRetry(url, options = {}, retries = 3, delay = 1000) {
 
 // ==================== INIT ====================
 document.addEventListener('DOMContentLoaded', async () => {
-  // FORCE UNREGISTER OLD SERVICE WORKERS
+  // SERVICE WORKER: cached API data, revalidated against /api/version
   if ('serviceWorker' in navigator) {
     try {
-      const registrations = await navigator.serviceWorker.getRegistrations();
-      for (const registration of registrations) {
-        await registration.unregister();
-        console.log("🧹 Service Worker antiguo eliminado");
-      }
-
-      // Register NEW SW (Reset logic)
       await navigator.serviceWorker.register('/sw.js');
-      console.log('✅ Service Worker v4 (RESET) registered');
+      navigator.serviceWorker.addEventListener('message', onServiceWorkerMessage);
+      console.log('✅ Service Worker registered');
     } catch (err) {
       console.error('Service Worker error:', err);
     }
@@ -203,6 +208,20 @@ document.addEventListener('DOMContentLoaded', async () => {
   showIOSInstallBanner();
 });
 
+// The SW answered from its cache and then found newer data: redraw the open tab
+let swRefreshTimer = null;
+function onServiceWorkerMessage(event) {
+  if (!event.data || event.data.type !== 'api-updated' || !currentUser) return;
+  clearTimeout(swRefreshTimer);
+  swRefreshTimer = setTimeout(() => {
+    // Don't wipe a prediction being typed
+    const active = document.activeElement;
+    if (active && ['INPUT', 'SELECT', 'TEXTAREA'].includes(active.tagName)) return;
+    const tab = document.querySelector('.nav-tab.active');
+    loadTabContent(tab ? tab.dataset.tab : 'predictions');
+  }, 300);
+}
+
 function checkSavedUser() {
   const savedUser = sessionStorage.getItem('bolilla_user');
   if (savedUser) {
@@ -345,7 +364,8 @@ function setupEventListeners() {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         credentials: 'include',
-        body: JSON.stringify({ username, displayName, password })
+        // Peña to join: ?pena=<slug> in the invitation link (default peña otherwise)
+        body: JSON.stringify({ username, displayName, password, tenant: new URLSearchParams(location.search).get('pena') || undefined })
       });
 
       const data = await res.json();
@@ -1064,16 +1084,13 @@ async function saveAllPredictions(matchIds) {
 
   let saved = 0;
   let errors = 0;
-  const token = sessionStorage.getItem('bolilla_token') || '';
 
   for (const { matchId, homeGoals, awayGoals } of predictions) {
     try {
-      const res = await fetch('/api/predictions', {
+      // Retried safely: a retry after a lost response gets the first answer
+      const res = await fetchWithRetry('/api/predictions', {
         method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          ...(token ? { 'Authorization': `Bearer ${token}` } : {})
-        },
+        headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
           matchId: parseInt(matchId),
           homeGoals: parseInt(homeGoals),
@@ -1793,6 +1810,33 @@ async function printRankingOnly() {
   win.document.close();
 }
 
+// /api/leaderboard/detail may come back columnar (users x matches grids);
+// expand it to the one-row-per-prediction shape used by the export.
+function expandLeaderboardDetail(detail) {
+  if (Array.isArray(detail)) return detail;
+  const rows = [];
+  (detail.users || []).forEach((user, i) => {
+    detail.matches.forEach((match, j) => {
+      const pred = detail.predictions[i][j];
+      if (!pred) return;
+      rows.push({
+        player_name: user.username,
+        display_name: user.display_name,
+        team: match.team,
+        opponent: match.opponent,
+        is_home: match.is_home,
+        match_date: match.match_date,
+        pred_home: pred[0],
+        pred_away: pred[1],
+        real_home: match.home_goals,
+        real_away: match.away_goals,
+        points: detail.points[i][j]
+      });
+    });
+  });
+  return rows;
+}
+
 async function exportLeaderboardCSV() {
   showToast('Generando Excel...', 'info');
 
@@ -1803,7 +1847,7 @@ async function exportLeaderboardCSV() {
       fetchWithRetry('/api/leaderboard/detail')
     ]);
     leaderboard = await r1.json();
-    detail = await r2.json();
+    detail = expandLeaderboardDetail(await r2.json());
   } catch (err) {
     showToast('Error al cargar datos', 'error');
     return;
@@ -1,16 +1,49 @@
 const CACHE_NAME = 'bolilla-garras-cache-RESET-V5';
+const API_CACHE = 'bolilla-garras-api-v1';
+
+// API GETs served stale-while-revalidate, and the server data versions
+// (GET /api/version) each one depends on
+const API_RESOURCES = {
+    '/api/matches/upcoming': ['matches', 'predictions'],
+    '/api/matches': ['matches'],
+    '/api/leaderboard': ['leaderboard'],
+    '/api/leaderboard/detail': ['leaderboard'],
+    '/api/leaderboard/history': ['leaderboard'],
+    '/api/predictions': ['predictions']
+};
+// Resources a write may change, by path prefix (first match wins). null:
+// everything, e.g. another user logs in. Other writes change none of them.
+const WRITE_EFFECTS = [
+    ['/api/login', null],
+    ['/api/logout', null],
+    ['/api/register', null],
+    ['/api/admin/seasons/', null],
+    ['/api/admin/reset-', null],
+    ['/api/admin/predictions/', ['predictions', 'leaderboard']],
+    ['/api/admin/users/', ['leaderboard']],
+    ['/api/predictions', ['predictions']],
+    ['/api/matches', ['matches', 'predictions', 'leaderboard']],
+    ['/api/jornadas', ['matches', 'predictions', 'leaderboard']]
+];
+const VERSION_URL = '/api/version';
+const VERSION_TTL_MS = 5000; // One version check shared by the requests of an app open
+const VERSION_HEADER = 'X-SW-Data-Version';
+
+let versions = null;
+let versionsAt = 0;
+let pendingClear = Promise.resolve();
 
 // INSTALACIÓN: Forzar limpieza inmediata
 self.addEventListener('install', (event) => {
     self.skipWaiting(); // Activar inmediatamente
 });
 
-// ACTIVACIÓN: Borrar TODAS las cachés antiguas
+// ACTIVACIÓN: Borrar las cachés antiguas (se conservan los datos de la API)
 self.addEventListener('activate', (event) => {
     event.waitUntil(
         caches.keys().then((cacheNames) => {
             return Promise.all(
-                cacheNames.map((cacheName) => {
+                cacheNames.filter((cacheName) => cacheName !== API_CACHE).map((cacheName) => {
                     console.log('Borrando caché antigua:', cacheName);
                     return caches.delete(cacheName);
                 })
@@ -21,12 +54,140 @@ self.addEventListener('activate', (event) => {
     );
 });
 
-// FETCH: NO USAR CACHÉ, SIEMPRE RED
+// FETCH: API con stale-while-revalidate, el resto siempre red
 self.addEventListener('fetch', (event) => {
-    // Ignorar peticiones que no sean GET
-    if (event.request.method !== 'GET') return;
+    const url = new URL(event.request.url);
+    const isApi = url.origin === self.location.origin && url.pathname.startsWith('/api/');
+
+    if (event.request.method !== 'GET') {
+        // Drop what the write may have changed, so this user sees it at once
+        if (isApi) {
+            versions = null;
+            pendingClear = invalidate(url.pathname);
+            event.waitUntil(pendingClear);
+        }
+        return;
+    }
 
-    // Responder siempre desde la red, NUNCA desde caché del SW.
-    // Si falla, deja fallar (mejor que texto "desconectado" que rompe JS).
-    event.respondWith(fetch(event.request));
+    const deps = isApi ? API_RESOURCES[url.pathname] : null;
+    if (!deps) {
+        // Responder siempre desde la red, NUNCA desde caché del SW.
+        // Si falla, deja fallar (mejor que texto "desconectado" que rompe JS).
+        event.respondWith(fetch(event.request));
+        return;
+    }
+
+    event.respondWith(serveApi(event, deps));
 });
+
+function writeEffects(pathname) {
+    const entry = WRITE_EFFECTS.find(([prefix]) => pathname.startsWith(prefix));
+    return entry ? entry[1] : [];
+}
+
+async function invalidate(pathname) {
+    const changed = writeEffects(pathname);
+    if (changed === null) return caches.delete(API_CACHE);
+    if (!changed.length) return;
+
+    const cache = await caches.open(API_CACHE);
+    const requests = await cache.keys();
+    await Promise.all(requests
+        .filter((request) => (API_RESOURCES[new URL(request.url).pathname] || []).some((dep) => changed.includes(dep)))
+        .map((request) => cache.delete(request)));
+}
+
+// Cache key without the client's cache-busting parameter
+function cacheKey(request) {
+    const url = new URL(request.url);
+    url.searchParams.delete('_cb');
+    return url.toString();
+}
+
+function getVersions(request) {
+    if (!versions || Date.now() - versionsAt > VERSION_TTL_MS) {
+        versionsAt = Date.now();
+        const auth = request.headers.get('Authorization');
+        versions = fetch(VERSION_URL, { headers: auth ? { 'Authorization': auth } : {}, cache: 'no-store' })
+            .then((res) => (res.ok ? res.json() : null))
+            .catch(() => null);
+    }
+    return versions;
+}
+
+function versionTag(current, deps) {
+    if (!current || deps.some((dep) => current[dep] == null)) return null;
+    return deps.map((dep) => current[dep]).join('|');
+}
+
+async function serveApi(event, deps) {
+    await pendingClear;
+    // Backends without GET /api/version (server.js) can't tell when a copy
+    // is stale: network first, the cached copy only when offline
+    if (!(await getVersions(event.request))) return networkFirst(event.request);
+    return staleWhileRevalidate(event, deps);
+}
+
+async function networkFirst(request) {
+    const key = cacheKey(request);
+    const cache = await caches.open(API_CACHE);
+    try {
+        const response = await fetch(request);
+        if (response.ok) await cache.put(key, await storable(response, null));
+        return response;
+    } catch (err) {
+        const cached = await cache.match(key);
+        if (cached) return cached;
+        throw err;
+    }
+}
+
+// Copy of a response that can be stored, tagged with its data version
+async function storable(response, tag) {
+    const headers = new Headers(response.headers);
+    headers.delete('Content-Encoding');
+    headers.delete('Content-Length');
+    if (tag) headers.set(VERSION_HEADER, tag);
+    const body = await response.clone().arrayBuffer();
+    return new Response(body, { status: response.status, statusText: response.statusText, headers });
+}
+
+async function staleWhileRevalidate(event, deps) {
+    const key = cacheKey(event.request);
+    const cache = await caches.open(API_CACHE);
+    const cached = await cache.match(key);
+
+    if (cached) {
+        event.waitUntil(revalidate(event.request, key, deps, cached.headers.get(VERSION_HEADER)));
+        return cached;
+    }
+    return fetchAndStore(event.request, key, deps);
+}
+
+async function fetchAndStore(request, key, deps) {
+    // Versions are read before the data: if it changes meanwhile, the stored
+    // tag is the older one and the next check refetches
+    const tag = versionTag(await getVersions(request), deps);
+    const response = await fetch(request);
+
+    if (response.ok && tag) {
+        const cache = await caches.open(API_CACHE);
+        await cache.put(key, await storable(response, tag));
+    }
+    return response;
+}
+
+async function revalidate(request, key, deps, cachedTag) {
+    try {
+        const tag = versionTag(await getVersions(request), deps);
+        if (!tag || tag === cachedTag) return;
+
+        const response = await fetchAndStore(request, key, deps);
+        if (!response.ok) return;
+
+        const clients = await self.clients.matchAll({ type: 'window' });
+        clients.forEach((client) => client.postMessage({ type: 'api-updated', url: key }));
+    } catch (err) {
+        // Offline: keep serving the cached copy
+    }
+}
@@ -0,0 +1,197 @@
+"""
+Optional SQL instrumentation for development and tests.
+
+Enable it with SQL_INSPECT=1. Every statement executed during a request is
+grouped by its normalized shape (literals and parameters replaced by ``?``);
+shapes repeated more than SQL_REPEAT_THRESHOLD times are logged as probable
+N+1 patterns, and statements slower than SQL_SLOW_MS are logged with their
+parameters. When disabled no listener is installed, so it costs nothing.
+
+Tests can use ``assert_max_queries`` / ``assert_endpoint_queries`` to make
+an endpoint fail when its query count grows.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('bolilla.sql')
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_RE = re.compile(r"%\(\w+\)s|%s|:\w+|\?")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WS_RE = re.compile(r"\s+")
+
+_sinks = []
+_sinks_lock = threading.Lock()
+_installed = False
+
+
+def normalize_sql(statement):
+    """Collapse a SQL statement to its shape so repeated queries group together."""
+    sql = _STRING_RE.sub('?', statement)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _PARAM_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (?)', sql)
+    return _WS_RE.sub(' ', sql).strip()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_qi_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('_qi_start')
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+    for sink in list(_sinks):
+        sink(statement, parameters, elapsed_ms)
+
+
+def _install_listeners():
+    global _installed
+    with _sinks_lock:
+        if _installed:
+            return
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _installed = True
+
+
+def _add_sink(sink):
+    _install_listeners()
+    with _sinks_lock:
+        _sinks.append(sink)
+
+
+def _remove_sink(sink):
+    with _sinks_lock:
+        if sink in _sinks:
+            _sinks.remove(sink)
+
+
+class QueryLog:
+    """Statements recorded during a request or a ``capture_queries`` block."""
+
+    def __init__(self):
+        self.statements = []
+
+    def record(self, statement, parameters, elapsed_ms):
+        self.statements.append((statement, parameters, elapsed_ms))
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    @property
+    def total_ms(self):
+        return sum(s[2] for s in self.statements)
+
+    def by_shape(self):
+        """Map normalized SQL -> (count, total ms), in first-seen order."""
+        shapes = OrderedDict()
+        for statement, _, elapsed_ms in self.statements:
+            shape = normalize_sql(statement)
+            count, total = shapes.get(shape, (0, 0.0))
+            shapes[shape] = (count + 1, total + elapsed_ms)
+        return shapes
+
+    def repeated(self, threshold):
+        """Shapes executed more than ``threshold`` times."""
+        return [(shape, count, total) for shape, (count, total) in self.by_shape().items()
+                if count > threshold]
+
+    def report(self):
+        lines = [f'{self.count} queries, {self.total_ms:.1f} ms']
+        for shape, (count, total) in self.by_shape().items():
+            lines.append(f'  {count:>4}x {total:8.1f} ms  {shape}')
+        return '\n'.join(lines)
+
+
+class QueryInspector:
+    """Per-request statement grouping, N+1 detection and slow query logging."""
+
+    def __init__(self, app=None):
+        self.repeat_threshold = 5
+        self.slow_ms = 100.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SQL_INSPECT', os.environ.get('SQL_INSPECT') == '1')
+        app.config.setdefault('SQL_REPEAT_THRESHOLD', int(os.environ.get('SQL_REPEAT_THRESHOLD', 5)))
+        app.config.setdefault('SQL_SLOW_MS', float(os.environ.get('SQL_SLOW_MS', 100)))
+        if not app.config['SQL_INSPECT']:
+            return
+
+        self.repeat_threshold = app.config['SQL_REPEAT_THRESHOLD']
+        self.slow_ms = app.config['SQL_SLOW_MS']
+        if not logger.handlers and not logging.getLogger().handlers:
+            logging.basicConfig(level=logging.INFO)
+        logger.setLevel(logging.INFO)
+
+        _add_sink(self._on_statement)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    def _on_statement(self, statement, parameters, elapsed_ms):
+        if elapsed_ms >= self.slow_ms:
+            logger.warning('Slow query (%.1f ms): %s -- params=%r', elapsed_ms,
+                           _WS_RE.sub(' ', statement).strip(), parameters)
+        if has_request_context():
+            log = g.get('_query_log')
+            if log is not None:
+                log.record(statement, parameters, elapsed_ms)
+
+    def _start_request(self):
+        g._query_log = QueryLog()
+
+    def _finish_request(self, response):
+        from flask import request
+        log = g.pop('_query_log', None)
+        if log is None:
+            return response
+        for shape, count, total in log.repeated(self.repeat_threshold):
+            logger.warning('Possible N+1 in %s %s: %dx (%.1f ms) %s',
+                           request.method, request.path, count, total, shape)
+        response.headers['X-SQL-Queries'] = str(log.count)
+        response.headers['X-SQL-Time'] = f'{log.total_ms:.1f}'
+        return response
+
+
+# ==================== TEST HELPERS ====================
+
+@contextmanager
+def capture_queries():
+    """Record every statement executed inside the block into a QueryLog."""
+    log = QueryLog()
+    _add_sink(log.record)
+    try:
+        yield log
+    finally:
+        _remove_sink(log.record)
+
+
+@contextmanager
+def assert_max_queries(limit, label='block'):
+    """Fail with a grouped report if the block runs more than ``limit`` queries."""
+    with capture_queries() as log:
+        yield log
+    if log.count > limit:
+        raise AssertionError(f'{label}: {log.count} queries, expected at most {limit}\n{log.report()}')
+
+
+def assert_endpoint_queries(client, method, path, limit, **kwargs):
+    """Call ``path`` with a Flask test client and enforce a query budget."""
+    with assert_max_queries(limit, label=f'{method.upper()} {path}'):
+        response = client.open(path, method=method.upper(), **kwargs)
+    return response
@@ -0,0 +1,209 @@
+"""
+Reminder fan-out for users who have not predicted before a deadline.
+
+  - enqueue: app.enqueue_reminders() adds one pending job per missing
+    (user, match) pair with a deadline within REMINDER_WINDOW_HOURS, in a
+    single INSERT ... SELECT. Pairs already queued are skipped.
+  - deliver: a pool of REMINDER_WORKERS threads claims batches of
+    REMINDER_BATCH due jobs and hands each batch to the sender. Sent jobs
+    are marked sent. Failed ones are retried with exponential backoff and
+    marked failed after REMINDER_MAX_ATTEMPTS.
+
+Claims are a conditional UPDATE tagged with a per-claim token, so several
+workers (threads or processes) never deliver the same job twice. Delivery
+never runs inside a web request:
+
+    flask --app app reminders          # enqueue + deliver what is due, then exit
+    flask --app app reminders --loop   # keep polling (dedicated worker process)
+
+Senders (REMINDER_SENDER):
+  - stdout (default)
+  - file:/path/reminders.jsonl (one JSON line per reminder)
+  - package.module:ClassName (built with the app config)
+
+A sender implements ``send(batch) -> {job_id: error}``, returning only the
+failed items. Raising fails the whole batch.
+"""
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+PENDING, SENDING, SENT, FAILED, SKIPPED = 'pending', 'sending', 'sent', 'failed', 'skipped'
+
+
+class StdoutSender:
+    """Prints each reminder (local testing)."""
+
+    def __init__(self, config=None, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def send(self, batch):
+        with self._lock:
+            for reminder in batch:
+                print(f"🔔 {reminder['display_name']}: falta tu pronóstico de {reminder['team']} - "
+                      f"{reminder['opponent']} (cierra {reminder['deadline']})", file=self.stream)
+            self.stream.flush()
+        return {}
+
+
+class FileSender:
+    """Appends each reminder as a JSON line (local testing, or a sink for another process)."""
+
+    def __init__(self, path, config=None):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, batch):
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            for reminder in batch:
+                f.write(json.dumps(reminder, ensure_ascii=False, default=str) + '\n')
+        return {}
+
+
+def load_sender(spec, config=None):
+    """Sender from a REMINDER_SENDER spec."""
+    if not spec or spec == 'stdout':
+        return StdoutSender(config)
+    if spec.startswith('file:'):
+        return FileSender(spec[len('file:'):], config)
+    module_name, _, class_name = spec.partition(':')
+    if not class_name:
+        raise ValueError(f'Unknown reminder sender: {spec}')
+    return getattr(importlib.import_module(module_name), class_name)(config)
+
+
+class ReminderQueue:
+    def __init__(self, app=None, **kwargs):
+        self.app = None
+        self.sender = None
+        if app is not None:
+            self.init_app(app, **kwargs)
+
+    def init_app(self, app, db, job_model, describe):
+        """
+        describe(job_ids) -> list of reminder dicts (with 'job_id') for the
+        jobs that still apply; jobs left out are marked skipped (the user
+        predicted meanwhile or the match closed).
+        """
+        self.app = app
+        self.db = db
+        self.model = job_model
+        self.describe = describe
+        app.config.setdefault('REMINDER_WINDOW_HOURS', int(os.environ.get('REMINDER_WINDOW_HOURS', 24)))
+        app.config.setdefault('REMINDER_SENDER', os.environ.get('REMINDER_SENDER', 'stdout'))
+        app.config.setdefault('REMINDER_BATCH', int(os.environ.get('REMINDER_BATCH', 100)))
+        app.config.setdefault('REMINDER_WORKERS', int(os.environ.get('REMINDER_WORKERS', 4)))
+        app.config.setdefault('REMINDER_MAX_ATTEMPTS', int(os.environ.get('REMINDER_MAX_ATTEMPTS', 5)))
+        app.config.setdefault('REMINDER_RETRY_SECONDS', int(os.environ.get('REMINDER_RETRY_SECONDS', 60)))
+        app.config.setdefault('REMINDER_LOCK_SECONDS', int(os.environ.get('REMINDER_LOCK_SECONDS', 300)))
+
+    def get_sender(self):
+        if self.sender is None:
+            self.sender = load_sender(self.app.config['REMINDER_SENDER'], self.app.config)
+        return self.sender
+
+    # ---------- queue operations (need an app context) ----------
+
+    def _due(self, now):
+        model = self.model
+        return ((model.status == PENDING) & (model.next_attempt_at <= now)) | \
+               ((model.status == SENDING) & (model.locked_until < now))  # Worker died mid-batch
+
+    def claim(self, limit):
+        """Atomically takes up to ``limit`` due jobs; returns (token, job ids)."""
+        model = self.model
+        session = self.db.session
+        now = datetime.utcnow()
+        ids = [i for (i,) in session.query(model.id).filter(self._due(now))
+               .order_by(model.next_attempt_at.asc(), model.id.asc()).limit(limit)]
+        if not ids:
+            return None, []
+
+        token = uuid.uuid4().hex
+        lock_until = now + timedelta(seconds=self.app.config['REMINDER_LOCK_SECONDS'])
+        model.query.filter(model.id.in_(ids), self._due(now)).update(
+            {model.status: SENDING, model.locked_by: token, model.locked_until: lock_until},
+            synchronize_session=False)
+        session.commit()
+        claimed = [i for (i,) in session.query(model.id).filter(model.locked_by == token, model.status == SENDING)]
+        return token, claimed
+
+    def _finish(self, token, ids, values):
+        if ids:
+            model = self.model
+            model.query.filter(model.id.in_(ids), model.locked_by == token)\
+                .update(values, synchronize_session=False)
+
+    def process_batch(self, limit):
+        """Claims, describes, sends and records one batch; returns how many jobs it took."""
+        token, ids = self.claim(limit)
+        if not ids:
+            return 0
+
+        model = self.model
+        session = self.db.session
+        reminders = self.describe(ids)
+        live = {r['job_id'] for r in reminders}
+        try:
+            failures = self.get_sender().send(reminders) if reminders else {}
+        except Exception as e:
+            failures = {job_id: str(e) for job_id in live}
+
+        now = datetime.utcnow()
+        self._finish(token, [i for i in ids if i not in live], {model.status: SKIPPED, model.locked_by: None})
+        self._finish(token, [i for i in live if i not in failures],
+                     {model.status: SENT, model.sent_at: now, model.locked_by: None})
+
+        max_attempts = self.app.config['REMINDER_MAX_ATTEMPTS']
+        base = self.app.config['REMINDER_RETRY_SECONDS']
+        if failures:
+            for job in model.query.filter(model.id.in_(list(failures)), model.locked_by == token).all():
+                job.attempts += 1
+                job.last_error = str(failures[job.id])[:500]
+                job.locked_by = None
+                if job.attempts >= max_attempts:
+                    job.status = FAILED
+                else:
+                    job.status = PENDING
+                    job.next_attempt_at = now + timedelta(seconds=base * 2 ** (job.attempts - 1))
+        session.commit()
+        return len(ids)
+
+    def _worker(self, limit):
+        handled = 0
+        with self.app.app_context():
+            while True:
+                try:
+                    taken = self.process_batch(limit)
+                except Exception as e:
+                    self.db.session.rollback()
+                    self.app.logger.exception('Reminder worker error: %s', e)
+                    break
+                if not taken:
+                    break
+                handled += taken
+        return handled
+
+    def deliver(self, workers=None, batch=None):
+        """Drains everything due with a pool of worker threads; returns jobs handled."""
+        workers = workers or self.app.config['REMINDER_WORKERS']
+        batch = batch or self.app.config['REMINDER_BATCH']
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reminders') as pool:
+            return sum(pool.map(self._worker, [batch] * workers))
+
+    def run_forever(self, enqueue, poll_seconds=30, workers=None, batch=None):
+        """Worker process loop: enqueue(now) then deliver, every poll_seconds."""
+        while True:
+            with self.app.app_context():
+                queued = enqueue(datetime.now())
+            handled = self.deliver(workers, batch)
+            if queued or handled:
+                self.app.logger.info('Reminders: %d queued, %d handled', queued, handled)
+            time.sleep(poll_seconds)
@@ -0,0 +1,206 @@
+"""
+On-demand profiling of single requests, triggered by admins.
+
+With PROFILING_ENABLED=1, an allowed user can send ``X-Profile: cprofile``
+(or ``sample``) or add ``?_profile=cprofile`` to any request. The request
+runs under cProfile or a stack sampler and the result is written to
+PROFILE_DIR, a ring buffer that keeps the newest PROFILE_KEEP files. When
+profiling is disabled no hooks are registered at all.
+
+Who is allowed is up to the caller: app.py lets only instance admins
+profile, the same users who can list the stored profiles.
+
+Outputs:
+  - ``*.prof``   cProfile stats (pstats / snakeviz)
+  - ``*.folded`` collapsed stacks (flamegraph.pl / speedscope)
+"""
+import io
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request, session
+
+MODES = ('cprofile', 'sample')
+_EXTENSIONS = {'cprofile': '.prof', 'sample': '.folded'}
+_NAME_RE = re.compile(r'^[\w.-]+\.(prof|folded)$')
+
+
+def _is_admin(user):
+    return bool(user.get('isAdmin'))
+
+
+class StackSampler:
+    """Samples the stack of one thread at a fixed interval into folded stacks."""
+
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    """Flask extension that profiles admin-flagged requests."""
+
+    def __init__(self, app=None, **kwargs):
+        self.directory = None
+        self.keep = 20
+        self.enabled = False
+        self.is_allowed = _is_admin
+        if app is not None:
+            self.init_app(app, **kwargs)
+
+    def init_app(self, app, is_allowed=None):
+        """is_allowed(user) -> bool: whether a session user may profile (default: any admin)"""
+        self.is_allowed = is_allowed or _is_admin
+        app.config.setdefault('PROFILING_ENABLED', os.environ.get('PROFILING_ENABLED') == '1')
+        app.config.setdefault('PROFILE_DIR', os.environ.get(
+            'PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'bolilla-profiles')))
+        app.config.setdefault('PROFILE_KEEP', int(os.environ.get('PROFILE_KEEP', 20)))
+        self.directory = app.config['PROFILE_DIR']
+        self.keep = app.config['PROFILE_KEEP']
+        self.enabled = app.config['PROFILING_ENABLED']
+        if not self.enabled:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+
+    # ---------- request hooks ----------
+
+    def _requested_mode(self):
+        mode = request.headers.get('X-Profile') or request.args.get('_profile')
+        if mode not in MODES:
+            return None
+        user = session.get('user')
+        if not user or not self.is_allowed(user):
+            return None
+        return mode
+
+    def _start(self):
+        mode = self._requested_mode()
+        if mode is None:
+            return
+        g._profile_mode = mode
+        g._profile_started = time.perf_counter()
+        if mode == 'cprofile':
+            import cProfile  # Only loaded when someone actually profiles
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = StackSampler(threading.get_ident())
+            profiler.start()
+        g._profiler = profiler
+
+    def _stop(self):
+        profiler = g.pop('_profiler', None)
+        if profiler is None:
+            return None
+        if isinstance(profiler, StackSampler):
+            profiler.stop()
+        else:
+            profiler.disable()
+        return profiler
+
+    def _finish(self, response):
+        profiler = self._stop()
+        if profiler is None:
+            return response
+        elapsed_ms = (time.perf_counter() - g.pop('_profile_started')) * 1000
+        name = self._save(g.pop('_profile_mode'), profiler, elapsed_ms)
+        response.headers['X-Profile-Id'] = name
+        return response
+
+    def _teardown(self, exc):
+        self._stop()
+
+    # ---------- ring buffer ----------
+
+    def _save(self, mode, profiler, elapsed_ms):
+        slug = re.sub(r'[^\w]+', '_', request.path).strip('_') or 'root'
+        stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+        name = f'{stamp}-{request.method}-{slug}-{elapsed_ms:.0f}ms{_EXTENSIONS[mode]}'
+        path = os.path.join(self.directory, name)
+        if mode == 'cprofile':
+            profiler.dump_stats(path)
+        else:
+            with open(path, 'w') as f:
+                f.write(profiler.dump())
+        self._prune()
+        return name
+
+    def _prune(self):
+        files = sorted(f for f in os.listdir(self.directory) if _NAME_RE.match(f))
+        for old in files[:-self.keep] if self.keep > 0 else files:
+            try:
+                os.remove(os.path.join(self.directory, old))
+            except OSError:
+                pass
+
+    def list_profiles(self):
+        """Stored profiles, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not _NAME_RE.match(name):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            profiles.append({
+                'name': name,
+                'mode': 'cprofile' if name.endswith('.prof') else 'sample',
+                'size': stat.st_size,
+                'created_at': datetime.utcfromtimestamp(stat.st_mtime).isoformat()
+            })
+        return profiles
+
+    def resolve(self, name):
+        """Absolute path of a stored profile, or None if the name is unknown."""
+        if not _NAME_RE.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def render_text(self, name, limit=60):
+        """Human readable summary of a cProfile dump (cumulative time)."""
+        path = self.resolve(name)
+        if path is None or not name.endswith('.prof'):
+            return None
+        import pstats
+        out = io.StringIO()
+        stats = pstats.Stats(path, stream=out)
+        stats.sort_stats('cumulative').print_stats(limit)
+        stats.print_callees(limit)
+        return out.getvalue()
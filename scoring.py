@@ -0,0 +1,143 @@
+"""
+Scoring rule sets for Bolilla predictions.
+
+A rule set is a plain function (pred_home, pred_away, real_home, real_away)
+-> points, registered under a name with ``@rule_set('name')``. Each match
+stores the name of the rule set it is scored with (``Match.rule_set``), so
+past seasons keep their own rules.
+
+Rule sets are compiled into a lookup table indexed by
+(pred_home, pred_away, real_home, real_away) over 0..TABLE_GOALS goals.
+Scores outside that range fall back to the rule function.
+
+Benchmark (table lookup vs branch evaluation):
+    python scoring.py
+"""
+from array import array
+
+TABLE_GOALS = 9           # 0..9 goals per side -> 10^4 entries per rule set
+CURRENT_RULE_SET = '25-26'
+
+_RULE_SETS = {}
+_TABLES = {}
+
+
+def rule_set(name):
+    """Register a scoring function under ``name``."""
+    def register(fn):
+        _RULE_SETS[name] = fn
+        _TABLES.pop(name, None)
+        return fn
+    return register
+
+
+def available_rule_sets():
+    return sorted(_RULE_SETS)
+
+
+@rule_set('25-26')
+def rules_25_26(pred_home, pred_away, real_home, real_away):
+    """
+    Official Rules 25/26:
+    1. Exact Score: 5 pts
+    2. Partial (Max 3 pts):
+       - Correct Sign: 1 pt
+       - Correct Goal Diff: 1 pt
+       - Correct Goals (Home OR Away): 2 pts
+    """
+    # 1. EXACT SCORE (PLENO) -> 5 PTS
+    if pred_home == real_home and pred_away == real_away:
+        return 5
+
+    puntos = 0
+
+    # b. Correct Sign (+1)
+    real_sign = (real_home > real_away) - (real_home < real_away)
+    pred_sign = (pred_home > pred_away) - (pred_home < pred_away)
+    if pred_sign == real_sign:
+        puntos += 1
+
+    # c. Correct Difference (+1)
+    if pred_home - pred_away == real_home - real_away:
+        puntos += 1
+
+    # a. Correct Goals (Home OR Away) (+2)
+    if pred_home == real_home or pred_away == real_away:
+        puntos += 2
+
+    # CAP AT 3 POINTS (Max partial score)
+    return min(puntos, 3)
+
+
+class ScoringTable:
+    """A rule set compiled to a flat lookup table, with fallback for outliers."""
+
+    def __init__(self, name, max_goals=TABLE_GOALS):
+        self.name = name
+        self.fn = _RULE_SETS[name]
+        self.size = max_goals + 1
+        n = self.size
+        fn = self.fn
+        self.table = array('b', (
+            fn(ph, pa, rh, ra)
+            for ph in range(n) for pa in range(n)
+            for rh in range(n) for ra in range(n)
+        ))
+
+    def points(self, pred_home, pred_away, real_home, real_away):
+        n = self.size
+        if 0 <= pred_home < n and 0 <= pred_away < n and 0 <= real_home < n and 0 <= real_away < n:
+            return self.table[((pred_home * n + pred_away) * n + real_home) * n + real_away]
+        return self.fn(pred_home, pred_away, real_home, real_away)
+
+
+def get_table(name=CURRENT_RULE_SET):
+    """Compiled table for a rule set (built once per process)."""
+    table = _TABLES.get(name)
+    if table is None:
+        if name not in _RULE_SETS:
+            raise KeyError(f'Unknown rule set: {name}')
+        table = _TABLES[name] = ScoringTable(name)
+    return table
+
+
+def score_prediction(pred_home, pred_away, real_home, real_away, rule_set_name=CURRENT_RULE_SET):
+    """Points for one prediction under the given rule set."""
+    return get_table(rule_set_name or CURRENT_RULE_SET).points(pred_home, pred_away, real_home, real_away)
+
+
+def benchmark(rounds=200_000):
+    """Time table lookups against branch evaluation on random in-range scores."""
+    import random
+    import time
+
+    rng = random.Random(42)
+    cases = [(rng.randint(0, 4), rng.randint(0, 4), rng.randint(0, 4), rng.randint(0, 4))
+             for _ in range(rounds)]
+    table = get_table(CURRENT_RULE_SET)
+    fn = table.fn
+
+    start = time.perf_counter()
+    branch = [fn(*c) for c in cases]
+    branch_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    lookup = [table.points(*c) for c in cases]
+    lookup_s = time.perf_counter() - start
+
+    flat = table.table
+    n = table.size
+    start = time.perf_counter()
+    raw = [flat[((ph * n + pa) * n + rh) * n + ra] for ph, pa, rh, ra in cases]
+    raw_s = time.perf_counter() - start
+
+    assert branch == lookup == raw
+    return {'rounds': rounds, 'branch_s': branch_s, 'lookup_s': lookup_s, 'raw_index_s': raw_s}
+
+
+if __name__ == '__main__':
+    result = benchmark()
+    print(f"🎯 Scoring benchmark ({result['rounds']} predicciones, reglas {CURRENT_RULE_SET})")
+    print(f"   Ramas (if/else):      {result['branch_s'] * 1000:8.1f} ms")
+    print(f"   Tabla (con límites):  {result['lookup_s'] * 1000:8.1f} ms")
+    print(f"   Tabla (índice plano): {result['raw_index_s'] * 1000:8.1f} ms")
@@ -0,0 +1,110 @@
+"""
+Cold start benchmark (serverless invocation / fresh gunicorn worker).
+
+Every run is a new Python process that measures:
+  - import:         `import app` (models and routes only)
+  - create_app:     building the Flask app (config and extensions, no DB)
+  - first request:  first request of the new app; it creates the engine and
+                    opens the first DB connection (POST /api/login with an
+                    unknown user: one query, 401)
+
+Without DATABASE_URL the runs use a scratch copy of bolilla.db (or an empty
+database) brought up to date with init_db first, so the tracked file is not
+touched and an old schema cannot turn the first request into a 500. With
+DATABASE_URL the runs use that database as is; it is migrated on deploy.
+A run whose first request does not answer 401 aborts the benchmark.
+
+Usage:
+    python startup_benchmark.py [--runs 10]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STEPS = ('import', 'create_app', 'first_request')
+EXPECTED_STATUS = 401
+
+
+def measure_once():
+    """Runs inside the child process; returns milliseconds per step."""
+    sys.path.insert(0, HERE)
+    timings = {}
+
+    start = time.perf_counter()
+    import app as bolilla
+    timings['import'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    flask_app = bolilla.create_app()
+    timings['create_app'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    response = flask_app.test_client().post('/api/login', json={'username': '__startup_benchmark__', 'password': 'x'})
+    timings['first_request'] = (time.perf_counter() - start) * 1000
+    timings['status'] = response.status_code
+    return timings
+
+
+def prepare_database():
+    """Runs inside a child process: brings the schema of DATABASE_URL up to date."""
+    sys.path.insert(0, HERE)
+    import app as bolilla
+    with bolilla.create_app().app_context():
+        bolilla.init_db()
+
+
+def child(flag, env):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), flag],
+                         capture_output=True, text=True, env=env)
+    if out.returncode != 0:
+        sys.exit(f'❌ {flag} falló:\n{out.stderr}')
+    return out.stdout
+
+
+def run(runs, env):
+    results = []
+    for _ in range(runs):
+        result = json.loads(child('--child', env).strip().splitlines()[-1])
+        if result['status'] != EXPECTED_STATUS:
+            sys.exit(f'❌ La primera petición devolvió HTTP {result["status"]} (se esperaba {EXPECTED_STATUS}); '
+                     'los tiempos no son válidos')
+        results.append(result)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tiempo de arranque en frío de la app')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--prepare', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_once()))
+        sys.exit(0)
+    if args.prepare:
+        prepare_database()
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory(prefix='bolilla-startup-') as scratch:
+        env = dict(os.environ)
+        if not env.get('DATABASE_URL'):
+            db_path = os.path.join(scratch, 'bolilla.db')
+            if os.path.exists(os.path.join(HERE, 'bolilla.db')):
+                shutil.copyfile(os.path.join(HERE, 'bolilla.db'), db_path)
+            env['DATABASE_URL'] = f'sqlite:///{db_path}'
+            child('--prepare', env)
+        results = run(args.runs, env)
+
+    print(f'🚀 Arranque en frío ({args.runs} procesos, primera petición -> HTTP {EXPECTED_STATUS})')
+    print(f'   {"":16} {"mediana":>9} {"mín":>9} {"máx":>9}')
+    for step in STEPS + ('total',):
+        values = [sum(r[s] for s in STEPS) if step == 'total' else r[step] for r in results]
+        print(f'   {step:16} {statistics.median(values):7.1f}ms {min(values):7.1f}ms {max(values):7.1f}ms')
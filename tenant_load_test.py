@@ -0,0 +1,161 @@
+"""
+Per-peña latency as the number of peñas on one instance grows.
+
+Seeds a scratch database with peñas of the same size (users, finished and
+pending matches, a prediction of every user for every match), growing
+the tenant count step by step. After each step it times the main
+endpoints of a random sample of peñas, in-process, in three states:
+
+  - first:   first read after a change (materialized standings dropped,
+             worker cache empty): aggregates and stores
+  - worker:  another worker's first read (its cache empty, materialized
+             rows present)
+  - warm:    served from this worker's cache
+
+Per-peña latency should stay flat as peñas are added: every query is
+scoped by tenant_id and every cache entry is keyed by it. Usage:
+    python tenant_load_test.py [--tenants 10,100,1000] [--users 15] [--matches 20] [--sample 20]
+    python tenant_load_test.py --database-url postgresql://...   # scratch DB, its data is replaced
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ENDPOINTS = (
+    '/api/leaderboard',
+    '/api/leaderboard/detail',
+    '/api/matches/upcoming',
+    '/api/predictions',
+    '/api/version',
+)
+STATES = ('first', 'worker', 'warm')
+
+
+def seed_tenants(A, start, stop, users, matches):
+    """Adds peñas start+1..stop, each with its users, matches and predictions (bulk inserts)."""
+    from werkzeug.security import generate_password_hash
+
+    password_hash = generate_password_hash('load')
+    now = datetime.now()
+    finished = matches // 2
+    db = A.db
+    for tenant_id in range(start + 1, stop + 1):
+        db.session.execute(A.Tenant.__table__.insert(), [{'id': tenant_id, 'slug': f'pena-{tenant_id}',
+                                                          'name': f'Peña {tenant_id}', 'created_at': now}])
+        user_rows = [{'username': f't{tenant_id}u{i}', 'password_hash': password_hash, 'display_name': f'U{i}',
+                      'is_admin': 1 if i == 0 else 0, 'tenant_id': tenant_id, 'created_at': now}
+                     for i in range(users)]
+        db.session.execute(A.User.__table__.insert(), user_rows)
+        match_rows = []
+        for j in range(matches):
+            date = now + timedelta(days=j - finished)
+            match_rows.append({'team': 'Athletic Club', 'opponent': f'R{j}', 'is_home': j % 2,
+                               'match_date': date, 'deadline': date - timedelta(hours=1),
+                               'home_goals': 1 if j < finished else None, 'away_goals': 0 if j < finished else None,
+                               'is_finished': 1 if j < finished else 0, 'predictions_closed': 1 if j < finished else 0,
+                               'rule_set': A.CURRENT_RULE_SET, 'season': A.season_for(now),
+                               'tenant_id': tenant_id, 'created_at': now})
+        db.session.execute(A.Match.__table__.insert(), match_rows)
+        user_ids = [i for (i,) in db.session.query(A.User.id).filter_by(tenant_id=tenant_id)]
+        match_ids = [(m.id, m.is_finished) for m in db.session.query(A.Match.id, A.Match.is_finished)
+                     .filter_by(tenant_id=tenant_id)]
+        db.session.execute(A.Prediction.__table__.insert(), [
+            {'user_id': u, 'match_id': m, 'home_goals': (u + m) % 3, 'away_goals': u % 2,
+             'points': ((u + m) % 3 == 1 and u % 2 == 0) * 5 if done else None,
+             'season': A.season_for(now), 'tenant_id': tenant_id, 'created_at': now}
+            for u in user_ids for m, done in match_ids
+        ])
+        db.session.commit()
+
+
+def time_tenant(A, tenant_id):
+    """Milliseconds per (state, endpoint) for one peña, as one of its users."""
+    user = A.User.query.filter_by(tenant_id=tenant_id, is_admin=0).first()
+    client = A.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user'] = {'id': user.id, 'username': user.username, 'displayName': user.display_name,
+                        'isAdmin': False, 'tenantId': tenant_id}
+
+    timings = {}
+    for state in STATES:
+        if state == 'first':
+            A.invalidate_standings(tenant_id)
+            A.LeaderboardMatrix.query.filter_by(tenant_id=tenant_id).delete()
+            A.db.session.commit()
+        if state in ('first', 'worker'):
+            A.cache.clear()
+        for endpoint in ENDPOINTS:
+            start = time.perf_counter()
+            response = client.get(endpoint)
+            timings[(state, endpoint)] = (time.perf_counter() - start) * 1000
+            if response.status_code != 200:
+                raise RuntimeError(f'{endpoint} -> HTTP {response.status_code}')
+    return timings
+
+
+def run(steps, users, matches, sample, seed):
+    import app as A
+
+    rng = random.Random(seed)
+    results = {}
+    with A.app.app_context():
+        A.db.drop_all()
+        A.init_db()
+        seeded = A.DEFAULT_TENANT_ID  # The default peña exists and stays empty
+        for count in steps:
+            start = time.perf_counter()
+            seed_tenants(A, seeded, count, users, matches)
+            seeded = max(seeded, count)
+            print(f'   {count} peñas sembradas ({time.perf_counter() - start:.1f}s)', file=sys.stderr)
+
+            tenants = rng.sample(range(A.DEFAULT_TENANT_ID + 1, count + 1), min(sample, count - 1))
+            per_tenant = [time_tenant(A, t) for t in tenants]
+            results[count] = {key: [t[key] for t in per_tenant] for key in per_tenant[0]}
+    return results
+
+
+def report(results, users, matches):
+    counts = sorted(results)
+    print(f'🏟️  Latencia por peña ({users} usuarios, {matches} partidos cada una) — mediana / p95 en ms')
+    print(f'   {"":10} {"":26}' + ''.join(f'{f"{c} peñas":>18}' for c in counts))
+    for state in STATES:
+        for endpoint in ENDPOINTS:
+            cells = []
+            for c in counts:
+                values = sorted(results[c][(state, endpoint)])
+                p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+                cells.append(f'{statistics.median(values):8.1f} /{p95:7.1f}')
+            print(f'   {state:10} {endpoint:26}' + ''.join(f'{cell:>18}' for cell in cells))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Latencia por peña según el número de peñas')
+    parser.add_argument('--tenants', default='10,100,1000', help='Número de peñas de cada paso')
+    parser.add_argument('--users', type=int, default=15)
+    parser.add_argument('--matches', type=int, default=20)
+    parser.add_argument('--sample', type=int, default=20, help='Peñas medidas en cada paso')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database-url', default=None, help='Base de datos desechable (por defecto SQLite temporal)')
+    args = parser.parse_args()
+
+    scratch = None
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        scratch = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        os.environ['DATABASE_URL'] = f'sqlite:///{scratch.name}'
+    os.environ.pop('DATABASE_READ_URL', None)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    steps = sorted({int(c) for c in args.tenants.split(',')})
+    try:
+        results = run(steps, args.users, args.matches, args.sample, args.seed)
+        report(results, args.users, args.matches)
+    finally:
+        if scratch is not None:
+            os.unlink(scratch.name)
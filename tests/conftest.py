@@ -0,0 +1,108 @@
+"""
+Shared fixtures: a fresh app on a scratch SQLite database per test, an
+admin client and helpers to create users and matches through the API.
+
+Run from the repository root:
+    python -m pytest -q tests
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.pop('DATABASE_READ_URL', None)
+
+import app as bolilla  # noqa: E402
+
+
+@pytest.fixture
+def app_config():
+    """Extra app config; override in a test module."""
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, app_config):
+    application = bolilla.create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "test.db"}',
+        'AUDIT_SPOOL': str(tmp_path / 'audit-spool.jsonl'),
+        'CACHE_URL': 'memory',
+        'DEADLINE_SCHEDULER': False,
+        **app_config,
+    })
+    with application.app_context():
+        bolilla.init_db()
+    yield application
+    with application.app_context():
+        bolilla.db.session.remove()
+        for engine in bolilla.db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def admin(app):
+    client = app.test_client()
+    assert client.post('/api/login', json={'username': 'GARRAS', 'password': 'GARRAS123'}).status_code == 200
+    return client
+
+
+@pytest.fixture
+def make_user(app):
+    """make_user('ana') -> logged-in client; its user id is client.user_id."""
+    def make(username, tenant=None):
+        client = app.test_client()
+        response = client.post('/api/register', json={
+            'username': username, 'password': 'pass1', 'displayName': username.upper(), 'tenant': tenant})
+        assert response.status_code == 200, response.get_json()
+        client.post('/api/login', json={'username': username, 'password': 'pass1'})
+        with client.session_transaction() as sess:
+            client.user_id = sess['user']['id']
+        return client
+    return make
+
+
+@pytest.fixture
+def make_match(admin):
+    """make_match('Osasuna', days=2) -> id of a match whose deadline is a day before kickoff."""
+    def make(opponent, days=2, team='Athletic Club', client=None, **fields):
+        kickoff = datetime.now() + timedelta(days=days)
+        response = (client or admin).post('/api/matches', json={
+            'team': team, 'opponent': opponent, 'matchDate': kickoff.isoformat(),
+            'deadline': (kickoff - timedelta(days=1)).isoformat(), **fields})
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()['id']
+    return make
+
+
+def create_tenant(admin, app, slug):
+    """New peña through the API; returns a client logged in as its admin."""
+    response = admin.post('/api/admin/tenants', json={
+        'slug': slug, 'name': slug.title(), 'adminUsername': f'admin-{slug}', 'adminPassword': 'pass1'})
+    assert response.status_code == 200, response.get_json()
+    client = app.test_client()
+    assert client.post('/api/login', json={'username': f'admin-{slug}', 'password': 'pass1'}).status_code == 200
+    return client
+
+
+def predict(client, match_id, home, away, **kwargs):
+    return client.post('/api/predictions', json={'matchId': match_id, 'homeGoals': home, 'awayGoals': away},
+                       **kwargs)
+
+
+def update_match(app, match_id, **fields):
+    """Set columns the API does not expose, e.g. a past deadline or another season."""
+    with app.app_context():
+        match = bolilla.Match.query.get(match_id)
+        for name, value in fields.items():
+            setattr(match, name, value)
+        bolilla.db.session.commit()
+
+
+def set_result(admin, match_id, home, away):
+    response = admin.put(f'/api/matches/{match_id}/result', json={'homeGoals': home, 'awayGoals': away})
+    assert response.status_code == 200, response.get_json()
+    return response
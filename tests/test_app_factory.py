@@ -0,0 +1,17 @@
+import app as bolilla
+
+
+def test_create_app_touches_no_database(tmp_path):
+    path = tmp_path / 'cold.db'
+    application = bolilla.create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+                                      'AUDIT_SPOOL': str(tmp_path / 'spool.jsonl')})
+    assert not path.exists()
+    assert 'app' not in vars(bolilla)  # The default app is built on first access only
+
+    result = application.test_cli_runner().invoke(args=['init-db'])
+    assert result.exit_code == 0, result.output
+    assert path.exists()
+    with application.app_context():
+        assert bolilla.User.query.filter_by(username='GARRAS').one().is_admin == 1
+        for engine in bolilla.db.engines.values():
+            engine.dispose()
@@ -0,0 +1,48 @@
+import pytest
+from conftest import predict, set_result
+
+import app as bolilla
+
+
+@pytest.fixture
+def app_config():
+    return {'AUDIT_FLUSH_SECONDS': 3600}
+
+
+@pytest.fixture(autouse=True)
+def empty_buffer(app):
+    bolilla.audit_log._take()  # Events left over by earlier tests
+
+
+def actions(client, **params):
+    response = client.get('/api/admin/audit', query_string=params)
+    assert response.status_code == 200
+    return [e['action'] for e in response.get_json()]
+
+
+def test_events_are_written_behind(app, admin, make_user, make_match):
+    match_id = make_match('Osasuna')
+    predict(make_user('ana'), match_id, 1, 0)
+    set_result(admin, match_id, 1, 0)
+    # Reading the log does not write the buffer: nothing persisted yet
+    assert actions(admin) == []
+    assert bolilla.audit_log.pending == 3
+
+    assert bolilla.audit_log.flush() == 3
+    assert actions(admin) == ['match.result', 'prediction.create', 'match.create']
+    assert actions(admin, action='prediction.create') == ['prediction.create']
+
+
+def test_failed_flush_keeps_events(app, admin, make_match, monkeypatch):
+    make_match('Osasuna')
+
+    def down(events):
+        raise RuntimeError('database unavailable')
+    monkeypatch.setattr(bolilla.audit_log, '_insert', down)
+    with pytest.raises(RuntimeError):
+        bolilla.audit_log.flush()
+    assert bolilla.audit_log.pending == 1
+
+    monkeypatch.undo()
+    assert bolilla.audit_log.flush() == 1
+    assert actions(admin) == ['match.create']
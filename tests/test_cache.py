@@ -0,0 +1,127 @@
+"""
+Cache backends. The Redis one runs against fakeredis: several RedisCache
+instances on one fake server stand for the workers of a deployment.
+"""
+import threading
+import time
+
+import pytest
+from conftest import predict
+
+import app as bolilla
+from cache import LocalCache, RedisCache
+
+fakeredis = pytest.importorskip('fakeredis')
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def worker(server):
+    def make(**kwargs):
+        return RedisCache(client=fakeredis.FakeRedis(server=server), poll_seconds=0.01, **kwargs)
+    return make
+
+
+def wait_for(condition, timeout=2):
+    give_up = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < give_up, 'timed out'
+        time.sleep(0.01)
+
+
+def test_local_cache_skips_values_computed_before_an_invalidation():
+    cache = LocalCache()
+
+    def compute():
+        cache.delete('leaderboard:1:2025-26')
+        return 'stale'
+    assert cache.get_or_set('leaderboard:1:2025-26', compute) == 'stale'
+    assert cache.get('leaderboard:1:2025-26') is None
+
+
+def test_local_cache_entries_expire_after_the_ttl():
+    cache = LocalCache(ttl=0.05)
+    cache.set('upcoming_matches:1', ['stale'])
+    assert cache.get_or_set('title_odds:1', lambda: 'stale') == 'stale'
+    time.sleep(0.1)
+    assert cache.get('upcoming_matches:1') is None
+    assert cache.get_or_set('title_odds:1', lambda: 'fresh') == 'fresh'
+
+
+def test_prefix_invalidation_bumps_the_generation(worker):
+    a, b = worker(local=False), worker(local=False)
+    a.set('leaderboard:1:2025-26', [1])
+    a.set('leaderboard:2:2025-26', [2])
+    assert b.get('leaderboard:1:2025-26') == [1]
+
+    b.delete_prefix('leaderboard:1:')
+    assert a.get('leaderboard:1:2025-26') is None
+    assert a.get('leaderboard:2:2025-26') == [2]
+    with pytest.raises(ValueError):
+        b.delete_prefix('leaderboard')
+
+
+def test_value_computed_across_an_invalidation_is_not_current(worker):
+    a, b = worker(local=False), worker(local=False)
+
+    def compute():
+        b.delete('upcoming_matches:1')  # Another worker writes meanwhile
+        return 'stale'
+    assert a.get_or_set('upcoming_matches:1', compute) == 'stale'
+    assert b.get('upcoming_matches:1') is None
+
+
+def test_invalidation_drops_other_workers_local_copies(worker):
+    a, b = worker(), worker()
+    assert a.get_or_set('title_odds:1', lambda: 'v1') == 'v1'
+    wait_for(lambda: a.client.pubsub_numsub(a.channel)[0][1] > 0)
+    assert a.local.get('title_odds:1') == 'v1'
+
+    b.delete('title_odds:1')
+    wait_for(lambda: a.local.get('title_odds:1') is None)
+    assert a.get_or_set('title_odds:1', lambda: 'v2') == 'v2'
+
+
+def test_single_flight_computes_once(worker):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'value'
+    results = []
+    threads = [threading.Thread(target=lambda c=worker(local=False): results.append(c.get_or_set('k', compute)))
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ['value'] * 4
+    assert len(calls) == 1
+
+
+def test_redis_outage_does_not_fail_the_caller(server, worker):
+    cache = worker()
+    cache.set('k', 'v')
+    server.connected = False
+    assert cache.get('missing', 'default') == 'default'
+    cache.set('other', 'v')
+    cache.delete('k')
+    cache.delete_prefix('leaderboard:')
+    cache.clear()
+    assert cache.local.get('k') is None
+    assert cache.get_or_set('k', lambda: 'computed') == 'computed'
+
+
+def test_writes_commit_while_redis_is_down(app, server, worker, make_user, make_match, monkeypatch):
+    monkeypatch.setattr(bolilla.cache, 'backend', worker())
+    client = make_user('ana')
+    match_id = make_match('Osasuna')
+    assert client.get('/api/matches/upcoming').status_code == 200
+    server.connected = False
+    assert predict(client, match_id, 1, 0).status_code == 200
+    assert client.get('/api/matches/upcoming').status_code == 200
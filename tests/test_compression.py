@@ -0,0 +1,32 @@
+import gzip
+
+import pytest
+
+import app as bolilla
+
+
+@pytest.fixture
+def app_config():
+    return {'COMPRESS_MIN_SIZE': 50}
+
+
+def test_json_is_compressed_once_per_payload(app, make_user, make_match):
+    client = make_user('ana')
+    for i in range(3):
+        make_match(f'R{i}', days=2 + i)
+    plain = client.get('/api/matches')
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    hits = bolilla.compressor.hits
+    for _ in range(2):
+        response = client.get('/api/matches', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(response.get_data()) == plain.get_data()
+    assert bolilla.compressor.hits == hits + 1
+
+
+def test_small_and_streamed_responses_are_left_alone(app, admin):
+    export = admin.get('/api/admin/export/standings', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in export.headers
+    assert 'Content-Encoding' not in admin.post('/api/logout', headers={'Accept-Encoding': 'gzip'}).headers
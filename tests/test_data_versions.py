@@ -0,0 +1,25 @@
+from conftest import predict, set_result
+
+
+def test_versions_move_with_the_data_they_cover(app, admin, make_user, make_match):
+    ana, bob = make_user('ana'), make_user('bob')
+    match_id = make_match('Osasuna')
+    start = ana.get('/api/version').get_json()
+
+    # Someone else's prediction changes nothing ana has cached
+    predict(bob, match_id, 1, 0)
+    assert ana.get('/api/version').get_json() == start
+
+    predict(ana, match_id, 2, 0)
+    after_prediction = ana.get('/api/version').get_json()
+    assert after_prediction['predictions'] != start['predictions']
+    assert after_prediction['matches'] == start['matches']
+
+    set_result(admin, match_id, 2, 0)
+    after_result = ana.get('/api/version').get_json()
+    assert after_result['matches'] != after_prediction['matches']
+    assert after_result['leaderboard'] != after_prediction['leaderboard']
+
+
+def test_versions_need_a_session(app):
+    assert app.test_client().get('/api/version').status_code == 401
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+
+from conftest import predict, update_match
+
+import app as bolilla
+from deadline_scheduler import DbLease
+
+
+def test_tick_closes_due_matches_and_stores_their_view(app, make_user, make_match):
+    ana = make_user('ana')
+    due, later = make_match('Osasuna'), make_match('Sevilla', days=4)
+    predict(ana, due, 2, 1)
+    assert ana.get(f'/api/matches/{due}/all-predictions').status_code == 403
+
+    update_match(app, due, deadline=datetime.now() - timedelta(minutes=1))
+    with app.app_context():
+        upcoming = bolilla.deadline_scheduler.tick(datetime.now())
+        assert upcoming == bolilla.Match.query.get(later).deadline
+        assert bolilla.Match.query.get(due).predictions_closed == 1
+        assert bolilla.MatchView.query.get((due, 'predictions')) is not None
+
+    view = ana.get(f'/api/matches/{due}/all-predictions').get_json()
+    assert [(p['home_goals'], p['away_goals']) for p in view['predictions']] == [(2, 1)]
+    assert predict(ana, due, 0, 0).status_code == 400
+
+
+def test_one_leader_at_a_time(app):
+    with app.app_context():
+        first = DbLease(bolilla.db, bolilla.SchedulerLease, 'deadline-scheduler')
+        second = DbLease(bolilla.db, bolilla.SchedulerLease, 'deadline-scheduler')
+        assert first.acquire()
+        assert not second.acquire()
+        assert first.acquire()  # Renewal
+        first.release()
+        assert second.acquire()
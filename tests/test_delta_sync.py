@@ -0,0 +1,68 @@
+from conftest import predict, set_result
+
+import app as bolilla
+
+
+def sync(client, path, cursor):
+    response = client.get(path, query_string={'since': cursor})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_since_returns_only_what_changed(app, admin, make_user, make_match, monkeypatch):
+    monkeypatch.setattr(bolilla, 'SYNC_SETTLE_SECONDS', 0)
+    ana, bob = make_user('ana'), make_user('bob')
+    first, second = make_match('Osasuna'), make_match('Sevilla', days=3)
+    predict(ana, first, 1, 0)
+    predict(bob, first, 2, 0)
+
+    matches = sync(ana, '/api/matches', 0)
+    assert matches['full'] and {m['id'] for m in matches['changed']} == {first, second}
+    predictions = sync(ana, '/api/predictions', 0)
+    assert predictions['full'] and len(predictions['changed']) == 1
+    assert sync(ana, '/api/matches', matches['cursor'])['changed'] == []
+
+    # A result changes the match and the points of ana's prediction, not bob's
+    set_result(admin, first, 1, 0)
+    changed = sync(ana, '/api/matches', matches['cursor'])
+    assert not changed['full'] and [m['id'] for m in changed['changed']] == [first]
+    own = sync(ana, '/api/predictions', predictions['cursor'])
+    assert [p['points'] for p in own['changed']] == [5]
+    prediction_id = own['changed'][0]['id']
+
+    admin.delete(f'/api/matches/{first}')
+    gone = sync(ana, '/api/matches', changed['cursor'])
+    assert gone['changed'] == [] and gone['deleted'] == [first]
+    assert sync(ana, '/api/predictions', own['cursor'])['deleted'] == [prediction_id]
+
+
+def test_pruned_cursor_gets_a_full_list(app, make_user, make_match, monkeypatch):
+    monkeypatch.setattr(bolilla, 'SYNC_SETTLE_SECONDS', 0)
+    ana = make_user('ana')
+    make_match('Osasuna')
+    cursor = sync(ana, '/api/matches', 0)['cursor']
+    make_match('Sevilla', days=3)
+    make_match('Betis', days=4)
+    with app.app_context():
+        assert bolilla.prune_change_log(days=-1) == 2  # Keeps the newest entry
+    assert sync(ana, '/api/matches', cursor)['full']
+
+
+def test_changes_outside_the_season_are_not_deletions(app, admin, make_user, make_match, monkeypatch):
+    monkeypatch.setattr(bolilla, 'SYNC_SETTLE_SECONDS', 0)
+    ana = make_user('ana')
+    current, past = make_match('Osasuna'), make_match('Sevilla', days=3)
+    predict(ana, current, 1, 0)
+    predict(ana, past, 2, 0)
+    with app.app_context():
+        bolilla.Match.query.get(past).season = '2019-20'
+        bolilla.Prediction.query.filter_by(match_id=past).update({'season': '2019-20'})
+        bolilla.db.session.commit()
+    matches = sync(ana, '/api/matches', 0)
+    predictions = sync(ana, '/api/predictions', 0)
+    assert [p['match_id'] for p in predictions['changed']] == [current]
+
+    # A result in 2019-20 changes that season's match and prediction, which are not in this list
+    set_result(admin, past, 2, 0)
+    assert sync(ana, '/api/matches', matches['cursor'])['deleted'] == []
+    assert sync(ana, '/api/predictions', predictions['cursor'])['deleted'] == []
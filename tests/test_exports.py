@@ -0,0 +1,39 @@
+import csv
+import io
+import zipfile
+
+from conftest import predict, set_result
+
+import app as bolilla
+import exports
+
+
+def test_csv_streams_in_chunks():
+    rows = ((i, None) for i in range(exports.CHUNK_ROWS * 2 + 1))
+    chunks = list(exports.csv_stream(['n', 'empty'], rows))
+    assert len(chunks) == 3
+    parsed = list(csv.reader(io.StringIO(b''.join(chunks).decode('utf-8-sig'))))
+    assert parsed[0] == ['n', 'empty'] and parsed[-1] == [str(exports.CHUNK_ROWS * 2), '']
+
+
+def test_exports_of_the_own_pena(app, admin, make_user, make_match):
+    ana, bob = make_user('ana'), make_user('bob')
+    match_id = make_match('Osasuna')
+    predict(ana, match_id, 2, 0)
+    predict(bob, match_id, 0, 0)
+    set_result(admin, match_id, 2, 0)
+    assert ana.get('/api/admin/export/standings').status_code == 403
+
+    response = admin.get('/api/admin/export/standings')
+    assert response.mimetype == 'text/csv'
+    assert 'attachment; filename="bolilla-garras-clasificacion-' in response.headers['Content-Disposition']
+    rows = list(csv.reader(io.StringIO(response.get_data().decode('utf-8-sig'))))
+    assert rows[0][:4] == ['Pos', 'Nombre', 'Usuario', 'Puntos']
+    assert rows[1][:5] == ['1', 'ANA', 'ana', '5', '1']
+    assert rows[2][:4] == ['2', 'BOB', 'bob', str(bolilla.score_prediction(0, 0, 2, 0))]
+
+    response = admin.get('/api/admin/export/predictions?format=xlsx')
+    with zipfile.ZipFile(io.BytesIO(response.get_data())) as archive:
+        assert archive.testzip() is None
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+    assert 'Osasuna' in sheet and 'ANA' in sheet and 'BOB' in sheet
@@ -0,0 +1,31 @@
+import itertools
+
+from conftest import predict, set_result
+
+
+def test_pair_and_matrix_agree(app, admin, make_user, make_match):
+    ana, bob, cai = make_user('ana'), make_user('bob'), make_user('cai')
+    matches = [make_match(f'R{i}', days=2 + i) for i in range(3)]
+    for match_id in matches:
+        predict(ana, match_id, 1, 0)
+        predict(bob, match_id, 0, 1)
+    predict(cai, matches[0], 1, 0)
+    for match_id, result in zip(matches, [(1, 0), (0, 1), (1, 0)]):
+        set_result(admin, match_id, *result)
+
+    assert ana.get('/api/head-to-head').status_code == 400
+    pair = ana.get('/api/head-to-head', query_string={'user_id': bob.user_id}).get_json()
+    assert pair['matches'] == matches
+    assert [u['display_name'] for u in pair['users']] == ['ANA', 'BOB']
+    assert (pair['wins'], pair['ties']) == ([2, 1], 0)
+    assert pair['diff'] == list(itertools.accumulate(a - b for a, b in zip(*pair['points'])))
+
+    assert ana.get('/api/admin/head-to-head').status_code == 403
+    matrix = admin.get('/api/admin/head-to-head').get_json()
+    index = {u['id']: i for i, u in enumerate(matrix['users'])}
+    for first, second in itertools.permutations([ana, bob, cai], 2):
+        i, j = index[first.user_id], index[second.user_id]
+        expected = first.get('/api/head-to-head', query_string={'user_id': second.user_id}).get_json()
+        assert matrix['wins'][i][j] == expected['wins'][0]
+        assert matrix['ties'][i][j] == expected['ties']
+        assert matrix['common'][i][j] == len(expected['matches'])
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+from conftest import predict
+
+import app as bolilla
+
+
+def keyed(key):
+    return {'headers': {'Idempotency-Key': key}}
+
+
+def stored_keys(app):
+    with app.app_context():
+        return bolilla.IdempotencyKey.query.count()
+
+
+def test_retries_replay_the_first_response(app, make_user, make_match):
+    ana, bob = make_user('ana'), make_user('bob')
+    match_id, other = make_match('Osasuna'), make_match('Sevilla', days=3)
+    first = predict(ana, match_id, 1, 0, **keyed('k1'))
+    retry = predict(ana, match_id, 1, 0, **keyed('k1'))
+    assert first.status_code == retry.status_code == 200
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    # Same key with another body, and the same key from another user
+    assert predict(ana, other, 1, 0, **keyed('k1')).status_code == 422
+    response = predict(bob, match_id, 1, 0, **keyed('k1'))
+    assert response.status_code == 200 and 'Idempotent-Replayed' not in response.headers
+
+
+def test_anonymous_keys_are_ignored(app, make_match):
+    match_id = make_match('Osasuna')
+    anonymous = app.test_client()
+    assert predict(anonymous, match_id, 1, 0, **keyed('shared')).status_code == 401
+    assert stored_keys(app) == 0
+
+
+def test_expired_keys_are_reused_and_pruned_off_the_request_path(app, make_user, make_match):
+    ana = make_user('ana')
+    match_id, other = make_match('Osasuna'), make_match('Sevilla', days=3)
+    predict(ana, match_id, 1, 0, **keyed('k1'))
+    predict(ana, match_id, 2, 2, **keyed('k2'))
+    with app.app_context():
+        bolilla.IdempotencyKey.query.update({bolilla.IdempotencyKey.expires_at: datetime.utcnow() - timedelta(seconds=1)})
+        bolilla.db.session.commit()
+
+    # A keyed write prunes nothing, but takes over its own expired key
+    response = predict(ana, other, 1, 0, **keyed('k1'))
+    assert response.status_code == 200 and 'Idempotent-Replayed' not in response.headers
+    assert stored_keys(app) == 2
+
+    with app.app_context():
+        assert bolilla.close_due_matches(datetime.now()) == 0
+    assert stored_keys(app) == 1
+
+
+def test_storing_the_response_does_not_commit_a_failed_write(app, make_user, make_match, monkeypatch):
+    ana = make_user('ana')
+    match_id = make_match('Osasuna')
+
+    def half_done():
+        bolilla.User.query.get(ana.user_id).display_name = 'HALF DONE'
+        return bolilla.jsonify({'error': 'Datos inválidos'}), 400
+    monkeypatch.setitem(app.view_functions, 'bolilla.save_prediction', half_done)
+    assert predict(ana, match_id, 1, 0, **keyed('k1')).status_code == 400
+    with app.app_context():
+        assert bolilla.User.query.get(ana.user_id).display_name == 'ANA'
+    assert predict(ana, match_id, 1, 0, **keyed('k1')).headers['Idempotent-Replayed'] == 'true'
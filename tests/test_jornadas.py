@@ -0,0 +1,42 @@
+from conftest import predict
+
+import app as bolilla
+
+
+def finished(app, match_ids):
+    with app.app_context():
+        return [bolilla.Match.query.get(i).is_finished for i in match_ids]
+
+
+def test_bulk_results_are_all_or_nothing(app, admin, make_user, make_match):
+    clients = [make_user(name) for name in ('ana', 'bob')]
+    matches = [make_match(f'R{i}', days=2 + i) for i in range(4)]
+    for client in clients:
+        for match_id in matches:
+            predict(client, match_id, 1, 0)
+
+    created = admin.post('/api/jornadas', json={'number': 1, 'matchIds': matches[:3]})
+    assert created.status_code == 200
+    jornada_id = created.get_json()['id']
+    assert admin.post('/api/jornadas', json={'number': 1}).status_code == 400
+    listed = admin.get('/api/jornadas').get_json()
+    assert [m['id'] for m in listed[0]['matches']] == matches[:3]
+
+    url = f'/api/jornadas/{jornada_id}/results'
+    # A match outside the jornada, or missing goals: nothing is saved
+    outside = [{'matchId': matches[0], 'homeGoals': 1, 'awayGoals': 0},
+               {'matchId': matches[3], 'homeGoals': 1, 'awayGoals': 0}]
+    assert admin.put(url, json={'results': outside}).status_code == 400
+    assert admin.put(url, json={'results': [{'matchId': matches[0], 'homeGoals': 1}]}).status_code == 400
+    assert finished(app, matches) == [0, 0, 0, 0]
+
+    results = [{'matchId': m, 'homeGoals': 1, 'awayGoals': i} for i, m in enumerate(matches[:3])]
+    response = admin.put(url, json={'results': results})
+    assert response.get_json() == {'success': True, 'updated': 3}
+    assert finished(app, matches) == [1, 1, 1, 0]
+
+    expected = sum(bolilla.score_prediction(1, 0, 1, i) for i in range(3))
+    standings = {r['name']: r['total_points'] for r in admin.get('/api/leaderboard').get_json()}
+    assert standings['ana'] == standings['bob'] == expected
+    # One snapshot for the whole jornada, at its last match
+    assert [m['id'] for m in admin.get('/api/leaderboard/history').get_json()['matches']] == [matches[2]]
@@ -0,0 +1,37 @@
+from conftest import predict, set_result
+
+import app as bolilla
+
+
+def test_matrix_follows_results(app, admin, make_user, make_match):
+    ana, bob = make_user('ana'), make_user('bob')
+    filial = make_match('Eibar', days=2, team='Bilbao Athletic')
+    first = make_match('Osasuna', days=3)
+    later = make_match('Sevilla', days=6)
+    for match_id in (filial, first, later):
+        predict(ana, match_id, 1, 0)
+    predict(bob, filial, 0, 1)
+    assert ana.get('/api/leaderboard/detail').get_json()['matches'] == []
+
+    set_result(admin, filial, 1, 0)
+    set_result(admin, first, 2, 1)
+    data = ana.get('/api/leaderboard/detail').get_json()
+    # Users by name; first team before the filial
+    assert [u['display_name'] for u in data['users']] == ['ANA', 'BOB']
+    assert [m['id'] for m in data['matches']] == [first, filial]
+    assert data['predictions'] == [[[1, 0], [1, 0]], [None, [0, 1]]]
+    assert data['points'] == [[bolilla.score_prediction(1, 0, 2, 1), bolilla.score_prediction(1, 0, 1, 0)],
+                              [None, bolilla.score_prediction(0, 1, 1, 0)]]
+
+    set_result(admin, later, 0, 0)
+    recent = ana.get('/api/leaderboard/detail?last_jornada=1').get_json()
+    assert [m['id'] for m in recent['matches']] == [later]
+    assert recent['points'] == [[bolilla.score_prediction(1, 0, 0, 0)], [None]]
+
+
+def test_matrix_is_per_season(app, admin, make_user, make_match):
+    ana = make_user('ana')
+    match_id = make_match('Osasuna')
+    predict(ana, match_id, 1, 0)
+    set_result(admin, match_id, 1, 0)
+    assert ana.get('/api/leaderboard/detail?season=2019-20').get_json()['users'] == []
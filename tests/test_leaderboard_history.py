@@ -0,0 +1,36 @@
+from conftest import predict, set_result
+
+
+def history(client):
+    data = client.get('/api/leaderboard/history').get_json()
+    return [m['id'] for m in data['matches']], {s['display_name']: s for s in data['series']}
+
+
+def test_snapshots_hold_standings_as_of_their_match(app, admin, make_user, make_match):
+    ana, bob = make_user('ana'), make_user('bob')
+    m1, m2, m3 = (make_match(f'R{i}', days=2 + i) for i in range(3))
+    for match_id in (m1, m2, m3):
+        predict(ana, match_id, 2, 0)
+        predict(bob, match_id, 0, 3)
+
+    # Results entered out of order: the earlier match comes last
+    set_result(admin, m2, 2, 0)
+    set_result(admin, m3, 2, 0)
+    set_result(admin, m1, 0, 3)
+    matches, series = history(ana)
+    assert matches == [m1, m2, m3]
+    assert series['ANA']['points'] == [0, 5, 10]
+    assert series['BOB']['points'] == [5, 5, 5]
+    assert series['ANA']['rank'] == [2, 1, 1]
+
+    # Correcting the first result rebuilds every later snapshot
+    set_result(admin, m1, 2, 0)
+    _, series = history(ana)
+    assert series['ANA']['points'] == [5, 10, 15]
+    assert series['BOB']['points'] == [0, 0, 0]
+
+    # Deleting it removes its points from the later ones
+    admin.delete(f'/api/matches/{m1}')
+    matches, series = history(ana)
+    assert matches == [m2, m3]
+    assert series['ANA']['points'] == [5, 10]
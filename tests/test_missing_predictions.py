@@ -0,0 +1,20 @@
+from datetime import datetime, timedelta
+
+from conftest import create_tenant, predict, update_match
+
+
+def test_report_lists_who_is_missing_per_open_match(app, admin, make_user, make_match):
+    ana, bob, _ = make_user('ana'), make_user('bob'), make_user('cai')
+    create_tenant(admin, app, 'otra')
+    make_user('outsider', tenant='otra')
+    soon, later, closed = make_match('Osasuna'), make_match('Sevilla', days=3), make_match('Betis', days=4)
+    predict(ana, soon, 1, 0)
+    predict(bob, soon, 1, 0)
+    predict(bob, later, 1, 0)
+    update_match(app, closed, deadline=datetime.now() - timedelta(minutes=1))
+
+    assert ana.get('/api/admin/missing-predictions').status_code == 403
+    report = admin.get('/api/admin/missing-predictions').get_json()
+    assert report['total_users'] == 3
+    summary = [(m['id'], m['submitted'], [u['display_name'] for u in m['missing']]) for m in report['matches']]
+    assert summary == [(soon, 2, ['CAI']), (later, 1, ['ANA', 'CAI'])]
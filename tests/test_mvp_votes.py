@@ -0,0 +1,68 @@
+import app as bolilla
+
+
+def add_players(app, *names):
+    with app.app_context():
+        players = [bolilla.GarrasPlayer(name=name, category='masculino', dorsal=i + 1, active=1)
+                   for i, name in enumerate(names)]
+        bolilla.db.session.add_all(players)
+        bolilla.db.session.commit()
+        return [p.id for p in players]
+
+
+def vote_counts(app, match_id):
+    with app.app_context():
+        return {c.player_id: c.votes for c in bolilla.MvpVoteCount.query.filter_by(match_id=match_id)}
+
+
+def test_counts_follow_votes_and_ranking_on_close(app, admin, make_user, make_match):
+    p1, p2 = add_players(app, 'P1', 'P2')
+    match_id = make_match('Osasuna', days=-3)
+    assert admin.put(f'/api/mvp/admin/{match_id}/open').status_code == 200
+    voters = [make_user(name) for name in 'abc']
+    for client, player in zip(voters, [p1, p1, p2]):
+        assert client.post(f'/api/mvp/{match_id}/vote', json={'player_id': player}).status_code == 200
+    # Changing a vote moves it between counters
+    voters[2].post(f'/api/mvp/{match_id}/vote', json={'player_id': p1})
+    assert vote_counts(app, match_id) == {p1: 3, p2: 0}
+
+    admin.put(f'/api/mvp/admin/{match_id}/close')
+    ranking = voters[0].get('/api/mvp/ranking').get_json()
+    assert [(p['name'], p['partidos_ganados'], p['total_votes']) for p in ranking['masculino']] == [('P1', 1, 3)]
+
+
+def test_first_bumps_from_separate_sessions_add_up(app, make_match):
+    player, = add_players(app, 'P1')
+    match_id = make_match('Osasuna', days=-3)
+    # Each app context has its own session: both find no counter row yet
+    for _ in range(2):
+        with app.app_context():
+            bolilla._bump_vote_count(match_id, player, 1)
+            bolilla.db.session.commit()
+    assert vote_counts(app, match_id) == {player: 2}
+
+
+def test_init_db_imports_server_js_polls(app, admin, make_user, make_match):
+    p1, p2 = add_players(app, 'P1', 'P2')
+    closed, still_open = make_match('Osasuna', days=-3), make_match('Sevilla', days=-1)
+    for name in ('ana', 'bob'):
+        make_user(name)
+    with app.app_context():
+        for ddl in ('CREATE TABLE match_mvp_votes (id INTEGER PRIMARY KEY, match_id INTEGER NOT NULL, '
+                    'username TEXT NOT NULL, player_id INTEGER NOT NULL, '
+                    'created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, UNIQUE(match_id, username))',
+                    'ALTER TABLE matches ADD COLUMN mvp_voting_open INTEGER DEFAULT 0'):
+            bolilla.db.session.execute(bolilla.text(ddl))
+        bolilla.db.session.execute(bolilla.text(
+            'INSERT INTO match_mvp_votes (match_id, username, player_id) VALUES '
+            f"({closed}, 'ana', {p1}), ({closed}, 'bob', {p1}), ({closed}, 'gone', {p2}), ({still_open}, 'ana', {p2})"))
+        bolilla.db.session.execute(bolilla.text(f'UPDATE matches SET mvp_voting_open = 1 WHERE id = {still_open}'))
+        bolilla.db.session.commit()
+        bolilla.init_db()
+        bolilla.init_db()
+        polls = {p.match_id: (p.is_open, p.total_votes, p.winner_votes) for p in bolilla.MvpPoll.query}
+
+    assert polls == {closed: (0, 2, 2), still_open: (1, 1, None)}
+    assert vote_counts(app, closed) == {p1: 2}
+    ranking = admin.get('/api/mvp/ranking').get_json()
+    assert [(p['name'], p['partidos_ganados'], p['total_votes']) for p in ranking['masculino']] == [('P1', 1, 2)]
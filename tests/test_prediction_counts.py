@@ -0,0 +1,36 @@
+from conftest import predict
+
+import app as bolilla
+
+
+def distribution(app, match_id):
+    with app.app_context():
+        return bolilla.prediction_distribution(match_id)
+
+
+def test_counters_follow_predictions(app, admin, make_user, make_match):
+    match_id = make_match('Osasuna')
+    for name, goals in [('ana', (2, 0)), ('bob', (2, 0)), ('cai', (1, 1))]:
+        assert predict(make_user(name), match_id, *goals).status_code == 200
+    result = distribution(app, match_id)
+    assert result['split'] == {'home': 2, 'draw': 1, 'away': 0}
+    assert result['scorelines'][0] == {'home_goals': 2, 'away_goals': 0, 'count': 2}
+
+    with app.app_context():
+        pred_id = bolilla.Prediction.query.filter_by(match_id=match_id, home_goals=1).one().id
+    assert admin.delete(f'/api/admin/predictions/{pred_id}').status_code == 200
+    assert distribution(app, match_id)['total'] == 2
+
+
+def test_save_errors_do_not_leak_details(app, make_user, make_match, monkeypatch):
+    client = make_user('ana')
+    match_id = make_match('Osasuna')
+
+    def broken(*args):
+        raise RuntimeError('connection to 10.0.0.5 refused')
+    monkeypatch.setattr(bolilla, '_bump_scoreline', broken)
+    response = predict(client, match_id, 1, 0)
+    assert response.status_code == 500
+    assert '10.0.0.5' not in response.get_data(as_text=True)
+    with app.app_context():
+        assert bolilla.Prediction.query.count() == 0
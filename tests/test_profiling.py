@@ -0,0 +1,23 @@
+import os
+
+import pytest
+
+from conftest import create_tenant
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {'PROFILING_ENABLED': True, 'PROFILE_DIR': str(tmp_path / 'profiles')}
+
+
+def test_only_instance_admins_write_profiles(app, admin):
+    directory = app.config['PROFILE_DIR']
+    pena_admin = create_tenant(admin, app, 'pena-lezama')
+
+    assert pena_admin.get('/api/leaderboard', headers={'X-Profile': 'cprofile'}).status_code == 200
+    assert os.listdir(directory) == []
+    assert pena_admin.get('/api/admin/profiles').status_code == 403
+
+    assert admin.get('/api/leaderboard', headers={'X-Profile': 'cprofile'}).status_code == 200
+    profiles = admin.get('/api/admin/profiles').get_json()['profiles']
+    assert len(profiles) == 1 == len(os.listdir(directory))
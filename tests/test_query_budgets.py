@@ -0,0 +1,61 @@
+"""
+Query budgets of the hot endpoints: a fixed number of statements whatever
+the number of users, matches and predictions, so an N+1 fails here.
+"""
+from conftest import predict
+from query_inspector import assert_endpoint_queries, capture_queries
+
+import app as bolilla
+
+
+def seed(make_user, make_match, users, matches, offset=0):
+    clients = [make_user(f'u{offset + i}') for i in range(users)]
+    match_ids = [make_match(f'R{offset + j}', days=2 + j) for j in range(matches)]
+    for client in clients:
+        for match_id in match_ids:
+            predict(client, match_id, 1, 0)
+    return clients
+
+
+def queries(client, path, status=200):
+    bolilla.cache.clear()
+    with capture_queries() as log:
+        assert client.get(path).status_code == status
+    return log.count
+
+
+def test_upcoming_matches_budget(app, make_user, make_match):
+    client = seed(make_user, make_match, users=2, matches=2)[0]
+    small = queries(client, '/api/matches/upcoming')
+    seed(make_user, make_match, users=4, matches=6, offset=10)
+    assert queries(client, '/api/matches/upcoming') == small
+    bolilla.cache.clear()
+    assert_endpoint_queries(client, 'GET', '/api/matches/upcoming', 6)
+
+
+def test_admin_stats_budget(app, admin, make_user, make_match):
+    seed(make_user, make_match, users=2, matches=2)
+    small = queries(admin, '/api/admin/stats')
+    seed(make_user, make_match, users=4, matches=6, offset=10)
+    assert queries(admin, '/api/admin/stats') == small
+    response = assert_endpoint_queries(admin, 'GET', '/api/admin/stats', 5)
+    counts = [m['predictions_count'] for m in response.get_json()['upcomingMatches']]
+    assert sorted(counts) == [2, 2] + [4] * 6
+
+
+def test_require_admin_budget(app, admin, make_user):
+    for i in range(5):
+        make_user(f'u{i}')
+    # Admin flag in the session: the decorator itself runs no query
+    assert queries(admin, '/api/admin/users') == 1
+
+    # Promoted after logging in: one lookup, then the session is updated
+    promoted = make_user('promoted')
+    with app.app_context():
+        bolilla.User.query.get(promoted.user_id).is_admin = 1
+        bolilla.db.session.commit()
+    assert queries(promoted, '/api/admin/users') == 2
+    assert queries(promoted, '/api/admin/users') == 1
+
+    denied = make_user('plain')
+    assert queries(denied, '/api/admin/users', status=403) == 1
@@ -0,0 +1,55 @@
+"""
+Endpoints on a lagging replica: a scratch copy of the primary taken before
+the data they need was written.
+"""
+import shutil
+
+import pytest
+from conftest import predict, set_result
+
+import app as bolilla
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {'SQLALCHEMY_BINDS': {bolilla.REPLICA_BIND: f'sqlite:///{tmp_path / "replica.db"}'},
+            'READ_YOUR_WRITES_SECONDS': 0}
+
+
+@pytest.fixture(autouse=True)
+def forget_replica_metadata(app):
+    """init_app registers a metadata per bind on the shared db; later apps have no replica"""
+    yield
+    bolilla.db.metadatas.pop(bolilla.REPLICA_BIND, None)
+
+
+def snapshot_replica(app, tmp_path):
+    with app.app_context():
+        for engine in bolilla.db.engines.values():
+            engine.dispose()
+    shutil.copy(tmp_path / 'test.db', tmp_path / 'replica.db')
+
+
+def test_reads_go_to_the_replica(app, tmp_path, make_user, make_match):
+    client = make_user('ana')
+    make_match('Osasuna')
+    snapshot_replica(app, tmp_path)
+    make_match('Sevilla', days=3)
+    assert len(client.get('/api/matches').get_json()) == 1
+
+
+def test_leaderboard_detail_built_on_a_miss_despite_lag(app, tmp_path, admin, make_user, make_match):
+    client = make_user('ana')
+    match_id = make_match('Osasuna')
+    predict(client, match_id, 2, 0)
+    set_result(admin, match_id, 2, 0)
+    with app.app_context():
+        bolilla.LeaderboardMatrix.query.delete()
+        bolilla.db.session.commit()
+    snapshot_replica(app, tmp_path)
+
+    response = client.get('/api/leaderboard/detail')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [u['username'] for u in data['users']] == ['ana']
+    assert data['points'] == [[bolilla.score_prediction(2, 0, 2, 0)]]
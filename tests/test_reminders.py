@@ -0,0 +1,55 @@
+import json
+
+from conftest import predict
+
+import app as bolilla
+from reminders import FileSender
+
+
+class BrokenSender:
+    def send(self, batch):
+        raise ConnectionError('smtp down')
+
+
+def statuses(app):
+    with app.app_context():
+        return sorted(j.status for j in bolilla.ReminderJob.query.all())
+
+
+def enqueue(admin):
+    response = admin.post('/api/admin/reminders/enqueue', json={'windowHours': 48})
+    assert response.status_code == 200
+    return response.get_json()['queued']
+
+
+def test_fan_out_sends_only_what_still_applies(app, admin, make_user, make_match, tmp_path, monkeypatch):
+    outbox = tmp_path / 'reminders.jsonl'
+    monkeypatch.setattr(bolilla.reminder_queue, 'sender', FileSender(str(outbox)))
+    ana, _, cai = make_user('ana'), make_user('bob'), make_user('cai')
+    match_id = make_match('Osasuna')
+    make_match('Sevilla', days=10)  # Outside the window
+    predict(ana, match_id, 1, 0)
+
+    assert enqueue(admin) == 2
+    assert enqueue(admin) == 0  # Already queued
+    predict(cai, match_id, 1, 0)  # Predicted before delivery: skipped
+
+    with app.app_context():
+        assert bolilla.reminder_queue.deliver(workers=2, batch=1) == 2
+    sent = [json.loads(line) for line in outbox.read_text().splitlines()]
+    assert [(r['username'], r['match_id']) for r in sent] == [('bob', match_id)]
+    assert statuses(app) == ['sent', 'skipped']
+    assert admin.get('/api/admin/reminders').get_json()['sent'] == 1
+
+
+def test_failed_batches_are_retried_later(app, admin, make_user, make_match, monkeypatch):
+    monkeypatch.setattr(bolilla.reminder_queue, 'sender', BrokenSender())
+    make_user('bob')
+    make_match('Osasuna')
+    assert enqueue(admin) == 1
+    with app.app_context():
+        assert bolilla.reminder_queue.deliver(workers=1) == 1
+        job = bolilla.ReminderJob.query.one()
+        assert (job.status, job.attempts, job.last_error) == ('pending', 1, 'smtp down')
+        # Backing off: not due again yet
+        assert bolilla.reminder_queue.deliver(workers=1) == 0
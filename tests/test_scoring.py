@@ -0,0 +1,46 @@
+import itertools
+
+import pytest
+from conftest import predict, set_result
+
+import app as bolilla
+import scoring
+
+
+def test_table_matches_the_rule_function():
+    table = scoring.get_table('25-26')
+    goals = range(scoring.TABLE_GOALS + 1)
+    for case in itertools.product(goals, repeat=4):
+        assert table.points(*case) == scoring.rules_25_26(*case)
+    assert scoring.score_prediction(2, 1, 2, 1) == 5
+    assert scoring.score_prediction(12, 0, 12, 0) == 5  # Outside the table: rule function
+    with pytest.raises(KeyError):
+        scoring.get_table('no-such-rules')
+
+
+def test_rescore_applies_each_match_rule_set(app, admin, make_user, make_match, monkeypatch):
+    monkeypatch.setitem(scoring._RULE_SETS, 'flat', lambda ph, pa, rh, ra: 1)
+    monkeypatch.delitem(scoring._TABLES, 'flat', raising=False)
+    ana = make_user('ana')
+    matches = [make_match(f'R{i}', days=2 + i) for i in range(2)]
+    for match_id in matches:
+        predict(ana, match_id, 0, 3)
+        set_result(admin, match_id, 1, 0)
+    assert admin.get('/api/leaderboard').get_json()[0]['total_points'] == 0
+
+    with app.app_context():
+        match = bolilla.Match.query.get(matches[0])
+        match.rule_set = 'flat'
+        season = match.season
+        bolilla.db.session.commit()
+    response = admin.post(f'/api/admin/seasons/{season}/rescore')
+    assert response.status_code == 200
+    standings = {r['name']: r['total_points'] for r in admin.get('/api/leaderboard').get_json()}
+    assert standings['ana'] == 1
+
+
+def test_unknown_rule_set_is_rejected(app, admin):
+    response = admin.post('/api/matches', json={
+        'team': 'Athletic Club', 'opponent': 'Osasuna', 'matchDate': '2026-01-01T10:00',
+        'deadline': '2026-01-01T09:00', 'ruleSet': 'no-such-rules'})
+    assert response.status_code == 400
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+from conftest import predict, set_result
+
+import app as bolilla
+
+
+def move_to_past_season(app, match_id, days=600):
+    with app.app_context():
+        match = bolilla.Match.query.get(match_id)
+        match.match_date -= timedelta(days=days)
+        match.deadline -= timedelta(days=days)
+        match.season = bolilla.season_for(match.match_date)
+        bolilla.Prediction.query.filter_by(match_id=match_id).update({'season': match.season})
+        bolilla.db.session.commit()
+        return match.season
+
+
+def test_archived_season_stays_readable(app, admin, make_user, make_match):
+    ana = make_user('ana')
+    old, current = make_match('Osasuna'), make_match('Sevilla', days=3)
+    predict(ana, old, 1, 0)
+    predict(ana, current, 1, 0)
+    past = move_to_past_season(app, old)
+    set_result(admin, old, 1, 0)
+    active = bolilla.season_for(datetime.now() + timedelta(days=3))
+
+    seasons = {s['season']: s for s in ana.get('/api/seasons').get_json()}
+    assert seasons[active]['active'] and not seasons[past]['active']
+    assert [m['id'] for m in ana.get('/api/matches').get_json()] == [current]
+    assert [m['id'] for m in ana.get(f'/api/matches?season={past}').get_json()] == [old]
+
+    assert admin.post(f'/api/admin/seasons/{active}/archive').status_code == 400
+    response = admin.post(f'/api/admin/seasons/{past}/archive')
+    assert response.get_json() == {'success': True, 'season': past, 'matches': 1}
+    with app.app_context():
+        assert bolilla.Match.query.filter_by(season=past).count() == 0
+        assert bolilla.ArchivedPrediction.query.count() == 1
+
+    assert {s['season']: s['archived'] for s in ana.get('/api/seasons').get_json()}[past]
+    standings = {r['name']: r['total_points'] for r in ana.get(f'/api/leaderboard?season={past}').get_json()}
+    assert standings['ana'] == 5
+    detail = ana.get(f'/api/leaderboard/detail?season={past}').get_json()
+    assert [m['id'] for m in detail['matches']] == [old]
+    assert admin.post(f'/api/admin/seasons/{past}/archive').status_code == 400
+
+
+def test_activate_season_changes_the_default_scope(app, admin, make_user, make_match):
+    ana = make_user('ana')
+    old, current = make_match('Osasuna'), make_match('Sevilla', days=3)
+    past = move_to_past_season(app, old)
+    # Default: the season of the latest match
+    assert [m['id'] for m in ana.get('/api/matches').get_json()] == [current]
+    assert admin.put(f'/api/admin/seasons/{past}/activate').status_code == 200
+    assert [m['id'] for m in ana.get('/api/matches').get_json()] == [old]
+    assert admin.put('/api/admin/seasons/2025/activate').status_code == 400
@@ -0,0 +1,31 @@
+from conftest import create_tenant, predict, set_result
+
+
+def names(response):
+    return [r['name'] for r in response.get_json()]
+
+
+def test_penas_are_isolated(app, admin, make_user, make_match):
+    lezama = create_tenant(admin, app, 'lezama')
+    assert lezama.get('/api/admin/tenants').status_code == 403  # Peña admin, not instance admin
+    ana, bob = make_user('ana'), make_user('bob', tenant='lezama')
+    assert app.test_client().post('/api/register', json={
+        'username': 'cai', 'password': 'pass1', 'displayName': 'CAI', 'tenant': 'nope'}).status_code == 404
+
+    home = make_match('Osasuna')
+    away = make_match('Eibar', client=lezama)
+    assert [m['id'] for m in ana.get('/api/matches/upcoming').get_json()] == [home]
+    assert [m['id'] for m in bob.get('/api/matches/upcoming').get_json()] == [away]
+
+    # Another peña's match can't be predicted or scored
+    assert predict(bob, home, 1, 0).status_code == 404
+    assert lezama.put(f'/api/matches/{home}/result', json={'homeGoals': 1, 'awayGoals': 0}).status_code == 404
+
+    predict(ana, home, 1, 0)
+    predict(bob, away, 2, 0)
+    set_result(admin, home, 1, 0)
+    set_result(lezama, away, 2, 0)
+    assert 'bob' not in names(ana.get('/api/leaderboard'))
+    assert 'ana' not in names(bob.get('/api/leaderboard'))
+    assert [u['username'] for u in bob.get('/api/leaderboard/detail').get_json()['users']] == ['bob']
+    assert {u['username'] for u in lezama.get('/api/admin/users').get_json()} == {'admin-lezama', 'bob'}
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from conftest import predict, update_match
+
+import app as bolilla
+import scoring
+import title_odds
+
+
+def test_odds_cover_current_season_and_score_unclipped(app, make_user, make_match, monkeypatch):
+    ana, bob = make_user('ana'), make_user('bob')
+    pending = make_match('Osasuna')
+    stale = make_match('Sevilla', days=3)
+    update_match(app, stale, season='2019-20')
+    predict(ana, pending, 7, 0)
+    predict(bob, pending, 1, 0)
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError('process pool started inside a request')
+    monkeypatch.setattr(title_odds, 'ProcessPoolExecutor', no_pool)
+    response = ana.get('/api/title-odds')
+    assert response.status_code == 200
+    odds = response.get_json()
+    assert [m['id'] for m in odds['pending_matches']] == [pending]
+    assert odds['method'] == 'exact'
+
+    users = {u['display_name']: u for u in odds['users']}
+    goals = range(title_odds.MAX_GOALS + 1)
+    # 7-0 is never exact; clipped to 5-0 it would have been on a 5-0 result
+    assert users['ANA']['max_points'] == max(bolilla.score_prediction(7, 0, h, a) for h in goals for a in goals)
+    assert users['ANA']['max_points'] < bolilla.score_prediction(5, 0, 5, 0)
+    assert abs(sum(u['win'] for u in odds['users']) - 1) < 1e-3
+
+
+def test_each_match_scored_with_its_rule_set(app, make_user, make_match, monkeypatch):
+    monkeypatch.setitem(scoring._RULE_SETS, 'flat', lambda ph, pa, rh, ra: 10)
+    monkeypatch.delitem(scoring._TABLES, 'flat', raising=False)
+    ana = make_user('ana')
+    current, flat = make_match('Osasuna'), make_match('Sevilla', days=3)
+    update_match(app, flat, rule_set='flat')
+    predict(ana, current, 1, 0)
+    predict(ana, flat, 1, 0)
+
+    odds = ana.get('/api/title-odds').get_json()
+    assert odds['users'][0]['max_points'] == bolilla.score_prediction(1, 0, 1, 0) + 10
+
+
+def test_web_path_runs_fewer_samples(app, make_user, make_match):
+    ana = make_user('ana')
+    for i in range(4):
+        predict(ana, make_match(f'R{i}', days=2 + i), 1, 0)
+    app.config['TITLE_ODDS_SAMPLES'] = 500
+
+    odds = ana.get('/api/title-odds').get_json()
+    assert (odds['method'], odds['outcomes']) == ('monte_carlo', 500)
+
+
+def test_simulate_rejects_no_samples():
+    with pytest.raises(ValueError):
+        title_odds.simulate([0], [0], np.zeros((1, 1)), np.zeros((1, 1)), np.ones((1, 1), dtype=bool),
+                            [scoring.score_prediction], samples=0)
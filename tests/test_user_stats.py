@@ -0,0 +1,33 @@
+from conftest import create_tenant, predict, set_result
+
+import app as bolilla
+
+
+def test_stats_follow_results(app, admin, make_user, make_match):
+    ana, bob = make_user('ana'), make_user('bob')
+    teams = ['Athletic Club', 'Athletic Club', 'Bilbao Athletic', 'Athletic Club']
+    matches = [make_match(f'R{i}', days=2 + i, team=team) for i, team in enumerate(teams)]
+    for match_id in matches:
+        predict(ana, match_id, 1, 0)
+    for match_id, result in zip(matches, [(1, 0), (0, 1), (2, 0), (1, 0)]):
+        set_result(admin, match_id, *result)
+
+    stats = ana.get('/api/stats').get_json()
+    assert (stats['predictions'], stats['hits'], stats['exact']) == (4, 3, 2)
+    assert stats['points'] == 10 + bolilla.score_prediction(1, 0, 2, 0)
+    assert (stats['current_streak'], stats['best_streak']) == (2, 2)
+    assert [(t['team'], t['predictions']) for t in stats['teams']] == [('Athletic Club', 3), ('Bilbao Athletic', 1)]
+    # Another user of the peña
+    assert bob.get('/api/stats', query_string={'user_id': ana.user_id}).get_json()['display_name'] == 'ANA'
+
+    # A corrected result invalidates the cached stats
+    set_result(admin, matches[1], 1, 0)
+    stats = ana.get('/api/stats').get_json()
+    assert (stats['hits'], stats['exact'], stats['best_streak']) == (4, 3, 4)
+
+
+def test_stats_of_other_penas_are_hidden(app, admin, make_user):
+    create_tenant(admin, app, 'lezama')
+    outsider = make_user('outsider', tenant='lezama')
+    ana = make_user('ana')
+    assert ana.get('/api/stats', query_string={'user_id': outsider.user_id}).status_code == 404
@@ -0,0 +1,212 @@
+"""
+Title odds simulator: "¿todavía puedo ganar la Bolilla?"
+
+Projects the leaderboard over every plausible scoreline of the pending
+matches. Each user's points for every scoreline of every pending match are
+precomputed once into a tensor of shape (matches, scorelines, users); outcome
+combinations are then either enumerated exactly (small problems) or sampled
+Monte-Carlo style, split in chunks across a process pool (the CLI; the
+/api/title-odds endpoint runs fewer samples in-process with workers=1).
+
+Scorelines are weighted with independent Poisson goal models, so 1-0 counts
+more than 5-5. Ties on points are broken by exact hits, as in the leaderboard;
+users still tied share the win.
+
+CLI:
+    python title_odds.py [--samples 200000] [--workers 4]
+"""
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+MAX_GOALS = 5             # Scorelines 0-0 .. 5-5 (36 per match)
+HOME_RATE = 1.5           # Poisson mean goals for the home side
+AWAY_RATE = 1.1           # Poisson mean goals for the away side
+ENUMERATION_LIMIT = 250_000
+CHUNK_SIZE = 50_000
+TIE_SCALE = 1000          # points * TIE_SCALE + exact hits orders like the leaderboard
+
+
+def scorelines(max_goals=MAX_GOALS):
+    """All (home, away) scorelines in the bounded goal range."""
+    goals = np.arange(max_goals + 1)
+    home, away = np.meshgrid(goals, goals, indexing='ij')
+    return home.ravel(), away.ravel()
+
+
+def scoreline_weights(max_goals=MAX_GOALS, home_rate=HOME_RATE, away_rate=AWAY_RATE):
+    """Probability of each scoreline under independent Poisson goals (renormalized)."""
+    goals = np.arange(max_goals + 1)
+    fact = np.array([math.factorial(g) for g in goals], dtype=float)
+    p_home = np.exp(-home_rate) * home_rate ** goals / fact
+    p_away = np.exp(-away_rate) * away_rate ** goals / fact
+    weights = np.outer(p_home, p_away).ravel()
+    return weights / weights.sum()
+
+
+def points_tensor(pred_home, pred_away, has_pred, score_fns, max_goals=MAX_GOALS):
+    """
+    Points and exact hits of every user for every scoreline of every match.
+
+    pred_home / pred_away / has_pred: arrays of shape (matches, users).
+    Predictions outside the simulated goal range are scored as they are
+    (a 7-0 can never be exact here).
+    score_fns: one score_fn(pred_home, pred_away, real_home, real_away) per
+    match, the rule set that match is scored with.
+    For the matches sharing a rule set, every (prediction, scoreline) pair is
+    scored once through a lookup over the distinct predicted scores, then
+    gathered with NumPy indexing.
+    Returns (points, exact) with shape (matches, scorelines, users), int16.
+    """
+    real_home, real_away = scorelines(max_goals)
+    n_matches, n_users = pred_home.shape
+    points = np.zeros((n_matches, real_home.size, n_users), dtype=np.int16)
+    exact = np.zeros_like(points)
+
+    by_rule_set = {}
+    for j, score_fn in enumerate(score_fns):
+        by_rule_set.setdefault(score_fn, []).append(j)
+    for score_fn, rows in by_rule_set.items():
+        predicted = np.stack([pred_home[rows], pred_away[rows]], axis=-1).reshape(-1, 2)
+        distinct, inverse = np.unique(predicted, axis=0, return_inverse=True)
+        table = np.array([[score_fn(int(ph), int(pa), int(rh), int(ra))
+                           for rh, ra in zip(real_home, real_away)]
+                          for ph, pa in distinct], dtype=np.int16)
+        exact_table = ((distinct[:, 0:1] == real_home) & (distinct[:, 1:2] == real_away)).astype(np.int16)
+
+        inverse = inverse.reshape(len(rows), n_users)
+        points[rows] = table[inverse].transpose(0, 2, 1)    # (matches, scorelines, users)
+        exact[rows] = exact_table[inverse].transpose(0, 2, 1)
+    mask = has_pred[:, None, :]
+    return np.where(mask, points, 0).astype(np.int16), np.where(mask, exact, 0).astype(np.int16)
+
+
+def _tally(key_base, points, exact, outcomes, weights):
+    """
+    Weighted win/podium mass for a batch of outcomes.
+
+    outcomes: (batch, matches) scoreline indices; weights: (batch,).
+    """
+    n_matches = points.shape[0]
+    keys = np.broadcast_to(key_base, (outcomes.shape[0], key_base.size)).astype(np.int64)
+    for m in range(n_matches):
+        keys = keys + points[m, outcomes[:, m], :].astype(np.int64) * TIE_SCALE + exact[m, outcomes[:, m], :]
+
+    best = keys.max(axis=1, keepdims=True)
+    winners = keys == best
+    win = (winners / winners.sum(axis=1, keepdims=True) * weights[:, None]).sum(axis=0)
+
+    # Competition rank: users strictly ahead < 3 means podium
+    if keys.shape[1] <= 3:
+        podium = np.full(keys.shape[1], weights.sum())
+    else:
+        third = np.partition(keys, -3, axis=1)[:, -3:-2]
+        podium = ((keys >= third) * weights[:, None]).sum(axis=0)
+    return win, podium
+
+
+def _enumerate_chunk(args):
+    key_base, points, exact, weights, start, stop = args
+    n_matches, n_scores = points.shape[0], points.shape[1]
+    index = np.arange(start, stop, dtype=np.int64)
+    outcomes = np.empty((index.size, n_matches), dtype=np.int64)
+    for m in range(n_matches - 1, -1, -1):
+        outcomes[:, m] = index % n_scores
+        index //= n_scores
+    outcome_weights = np.prod(weights[outcomes], axis=1)
+    return _tally(key_base, points, exact, outcomes, outcome_weights)
+
+
+def _sample_chunk(args):
+    key_base, points, exact, weights, size, total, seed = args
+    rng = np.random.default_rng(seed)
+    outcomes = rng.choice(weights.size, size=(size, points.shape[0]), p=weights)
+    return _tally(key_base, points, exact, outcomes, np.full(size, 1.0 / total))
+
+
+def simulate(base_points, base_exact, pred_home, pred_away, has_pred, score_fns,
+             samples=200_000, workers=None, seed=None, max_goals=MAX_GOALS):
+    """
+    Win and podium probability of each user over the pending matches.
+
+    base_points / base_exact: current totals, shape (users,).
+    pred_* / has_pred: shape (matches, users) for the pending matches.
+    score_fns: one scoring function per pending match (see points_tensor).
+    Returns dict with 'win', 'podium', 'max_points' arrays and the method used.
+    """
+    if samples <= 0:
+        raise ValueError(f'samples must be positive, got {samples}')
+    base_points = np.asarray(base_points, dtype=np.int64)
+    base_exact = np.asarray(base_exact, dtype=np.int64)
+    key_base = base_points * TIE_SCALE + base_exact
+    n_users = base_points.size
+    n_matches = pred_home.shape[0] if n_users else 0
+
+    if n_users == 0:
+        return {'win': np.zeros(0), 'podium': np.zeros(0), 'max_points': np.zeros(0, dtype=np.int64),
+                'method': 'none', 'outcomes': 0}
+
+    if n_matches == 0:
+        win, podium = _tally(key_base, np.zeros((0, 1, n_users), dtype=np.int16),
+                             np.zeros((0, 1, n_users), dtype=np.int16),
+                             np.zeros((1, 0), dtype=np.int64), np.ones(1))
+        return {'win': win, 'podium': podium, 'max_points': base_points,
+                'method': 'final', 'outcomes': 1}
+
+    points, exact = points_tensor(np.asarray(pred_home), np.asarray(pred_away),
+                                  np.asarray(has_pred, dtype=bool), score_fns, max_goals)
+    weights = scoreline_weights(max_goals)
+    max_points = base_points + points.max(axis=1).sum(axis=0)
+
+    n_scores = weights.size
+    total = n_scores ** n_matches
+    if total <= ENUMERATION_LIMIT:
+        method = 'exact'
+        bounds = list(range(0, total, CHUNK_SIZE)) + [total]
+        tasks = [(key_base, points, exact, weights, a, b) for a, b in zip(bounds, bounds[1:])]
+        worker_fn = _enumerate_chunk
+        outcomes = total
+    else:
+        method = 'monte_carlo'
+        seeds = np.random.SeedSequence(seed).spawn(max(1, math.ceil(samples / CHUNK_SIZE)))
+        sizes = [CHUNK_SIZE] * (len(seeds) - 1) + [samples - CHUNK_SIZE * (len(seeds) - 1)]
+        tasks = [(key_base, points, exact, weights, size, samples, s) for size, s in zip(sizes, seeds)]
+        worker_fn = _sample_chunk
+        outcomes = samples
+
+    win = np.zeros(n_users)
+    podium = np.zeros(n_users)
+    workers = workers if workers is not None else min(len(tasks), os.cpu_count() or 1)
+    if workers <= 1 or len(tasks) == 1:
+        for w, p in map(worker_fn, tasks):
+            win += w
+            podium += p
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for w, p in pool.map(worker_fn, tasks):
+                win += w
+                podium += p
+
+    return {'win': win, 'podium': podium, 'max_points': max_points,
+            'method': method, 'outcomes': outcomes}
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Probabilidades de título de la Bolilla')
+    parser.add_argument('--samples', type=int, default=200_000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--tenant', type=int, default=None, help='Id de la peña (por defecto, la principal)')
+    args = parser.parse_args()
+
+    from app import app, compute_title_odds, DEFAULT_TENANT_ID
+
+    with app.app_context():
+        odds = compute_title_odds(samples=args.samples, workers=args.workers, seed=args.seed,
+                                  tenant_id=args.tenant or DEFAULT_TENANT_ID)
+    print(json.dumps(odds, indent=2, ensure_ascii=False))